@@ -3,22 +3,59 @@
 import re
 import bpy
 import mathutils
+from mathutils.bvhtree import BVHTree
+import gpu
 import json
 import threading
 import socket
+import asyncio
 import time
 import requests
 import tempfile
 import traceback
 import os
 import shutil
+import stat
 import zipfile
-from bpy.props import IntProperty, BoolProperty
+from bpy.props import IntProperty, BoolProperty, StringProperty
+from bpy.app.handlers import persistent
 import io
 from datetime import datetime
 import hashlib, hmac, base64
+import inspect
+import ast
+import zlib
+import bisect
+import cProfile
+import pstats
+import tracemalloc
+import fnmatch
+import itertools
+import gc
+import sys
+import numpy as np
 import os.path as osp
 from contextlib import redirect_stdout, suppress
+from collections import deque, OrderedDict
+
+# Optional faster encoders and compressors; plain JSON and zlib are always available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+# Encodes JPEG and WebP captures in memory when installed; PNG never needs it
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
 
 bl_info = {
     "name": "Blender MCP",
@@ -36,13 +73,2809 @@ RODIN_FREE_TRIAL_KEY = "k9TcfFoEhNd9cCPP2guHAHHHkctZHIRhZDywZ1euGUXwihbYLpOjQhof
 REQ_HEADERS = requests.utils.default_headers()
 REQ_HEADERS.update({"User-Agent": "blender-mcp"})
 
+#region Wire protocol
+# Framing modes. Every connection starts in FRAMING_JSON (bare JSON documents
+# back to back, as sent by older clients) and may switch to one of the framed
+# modes by sending a "negotiate_protocol" command as its first message.
+FRAMING_JSON = "json"
+FRAMING_NDJSON = "ndjson"
+FRAMING_LENGTH = "length"
+FRAMING_MODES = (FRAMING_JSON, FRAMING_NDJSON, FRAMING_LENGTH)
+
+# Length-prefixed frames carry a 4-byte big-endian payload size. The top bit
+# of the header is set when the payload is compressed.
+FRAME_HEADER_SIZE = 4
+FRAME_COMPRESSED_FLAG = 0x80000000
+FRAME_SIZE_MASK = 0x7FFFFFFF
+DEFAULT_MAX_FRAME_SIZE = 64 * 1024 * 1024
+DEFAULT_COMPRESS_THRESHOLD = 16 * 1024
+# One command may bring at most this many attachments, together no larger than
+# the connection's max frame size, so a manifest cannot make the server buffer
+# more than one maximal frame's worth before the handler runs
+MAX_ATTACHMENTS = 64
+# Unread response bytes a client may leave queued before it is disconnected
+DEFAULT_MAX_WRITE_BACKLOG = 256 * 1024 * 1024
+
+_JSON_STRUCTURAL_RE = re.compile(rb'["{}\[\]]')
+_JSON_STRING_END_RE = re.compile(rb'["\\]')
+_JSON_WHITESPACE = b" \t\r\n"
+
+
+class FrameError(ValueError):
+    """Raised when the incoming byte stream cannot be split into valid frames"""
+
+
+class Codec:
+    """Serializer used for message bodies on a connection"""
+
+    def __init__(self, name, dumps, loads, binary=False):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+        # Whether bytes can be embedded natively instead of as base64 text
+        self.binary = binary
+
+
+def _json_dumps(obj, default):
+    return json.dumps(obj, default=default).encode('utf-8')
+
+
+JSON_CODEC = Codec("json", _json_dumps, json.loads)
+CODECS = {"json": JSON_CODEC}
+if orjson is not None:
+    CODECS["orjson"] = Codec("orjson", lambda obj, default: orjson.dumps(obj, default=default), orjson.loads)
+if msgpack is not None:
+    CODECS["msgpack"] = Codec(
+        "msgpack",
+        lambda obj, default: msgpack.packb(obj, default=default, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+        binary=True,
+    )
+
+
+class Compression:
+    """Per-frame compressor; decompress() refuses output larger than limit"""
+
+    def __init__(self, name, compress, decompress):
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+
+
+def _zlib_decompress(data, limit):
+    decompressor = zlib.decompressobj()
+    out = decompressor.decompress(data, limit + 1)
+    if len(out) > limit or decompressor.unconsumed_tail:
+        raise FrameError(f"Decompressed frame exceeds the maximum of {limit} bytes")
+    return out
+
+
+COMPRESSIONS = {"zlib": Compression("zlib", lambda data: zlib.compress(data, 1), _zlib_decompress)}
+if zstandard is not None:
+    def _zstd_decompress(data, limit):
+        with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+            out = reader.read(limit + 1)
+        if len(out) > limit:
+            raise FrameError(f"Decompressed frame exceeds the maximum of {limit} bytes")
+        return out
+
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    COMPRESSIONS["zstd"] = Compression("zstd", _zstd_compressor.compress, _zstd_decompress)
+
+# Content types not worth compressing again
+_PRECOMPRESSED_TYPES = ("image/png", "image/jpeg", "image/webp", "application/zip")
+
+
+class FrameDecoder:
+    """Incrementally split a client byte stream into complete message payloads.
+
+    Bytes are appended with feed() and whole payloads are taken out with
+    next_frame(), so each message is scanned once and decoded once no matter
+    how many recv() calls it arrived in.
+    """
+
+    def __init__(self, framing=FRAMING_JSON, max_frame_size=DEFAULT_MAX_FRAME_SIZE):
+        if framing not in FRAMING_MODES:
+            raise ValueError(f"Unknown framing mode: {framing}")
+        self.framing = framing
+        self.max_frame_size = max_frame_size
+        # Compression negotiated for length-prefixed frames, if any
+        self.compression = None
+        self._buffer = bytearray()
+        self._reset_scan()
+
+    def _reset_scan(self):
+        # Scanner state for the legacy bare-JSON mode
+        self._scan_pos = 0
+        self._depth = 0
+        self._in_string = False
+
+    def set_framing(self, framing):
+        """Switch framing mode; bytes already buffered are parsed in the new mode"""
+        if framing not in FRAMING_MODES:
+            raise ValueError(f"Unknown framing mode: {framing}")
+        self.framing = framing
+        self._reset_scan()
+
+    @property
+    def pending(self):
+        return len(self._buffer)
+
+    def feed(self, data):
+        self._buffer += data
+
+    def next_frame(self):
+        """Return the next complete payload as bytes, or None if more data is needed"""
+        if self.framing == FRAMING_LENGTH:
+            return self._next_length_frame()
+        if self.framing == FRAMING_NDJSON:
+            return self._next_line_frame()
+        return self._next_json_frame()
+
+    def _take(self, end, skip=0):
+        frame = bytes(self._buffer[:end])
+        del self._buffer[:end + skip]
+        self._reset_scan()
+        return frame
+
+    def _check_size(self, size):
+        if size > self.max_frame_size:
+            raise FrameError(f"Frame of {size} bytes exceeds the maximum of {self.max_frame_size} bytes")
+
+    def _next_length_frame(self):
+        if len(self._buffer) < FRAME_HEADER_SIZE:
+            return None
+        header = int.from_bytes(self._buffer[:FRAME_HEADER_SIZE], "big")
+        size = header & FRAME_SIZE_MASK
+        self._check_size(size)
+        if len(self._buffer) < FRAME_HEADER_SIZE + size:
+            return None
+        del self._buffer[:FRAME_HEADER_SIZE]
+        frame = self._take(size)
+        if header & FRAME_COMPRESSED_FLAG:
+            if self.compression is None:
+                raise FrameError("Received a compressed frame but no compression was negotiated")
+            frame = self.compression.decompress(frame, self.max_frame_size)
+        return frame
+
+    def _next_line_frame(self):
+        while True:
+            newline = self._buffer.find(b"\n", self._scan_pos)
+            if newline < 0:
+                self._scan_pos = len(self._buffer)
+                self._check_size(len(self._buffer))
+                return None
+            self._check_size(newline)
+            frame = self._take(newline, skip=1)
+            if frame.strip():
+                return frame
+
+    def _next_json_frame(self):
+        buffer = self._buffer
+
+        # Drop whitespace between documents
+        if self._depth == 0:
+            start = 0
+            while start < len(buffer) and buffer[start] in _JSON_WHITESPACE:
+                start += 1
+            if start:
+                del buffer[:start]
+                self._scan_pos = 0
+            if not buffer:
+                return None
+            if buffer[0] not in b"{[":
+                raise FrameError("Expected a JSON object at the start of a message")
+
+        # Only jump between structural characters, so long strings such as
+        # base64 payloads or code bodies are skipped by the regex engine.
+        pos = self._scan_pos
+        while True:
+            if self._in_string:
+                match = _JSON_STRING_END_RE.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                if buffer[match.start()] == 0x5C:  # backslash escapes the next byte
+                    if match.start() + 1 >= len(buffer):
+                        pos = match.start()
+                        break
+                    pos = match.start() + 2
+                    continue
+                self._in_string = False
+                pos = match.end()
+                continue
+
+            match = _JSON_STRUCTURAL_RE.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            char = buffer[match.start()]
+            pos = match.end()
+            if char == 0x22:  # opening quote
+                self._in_string = True
+            elif char in b"{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._check_size(pos)
+                    return self._take(pos)
+
+        self._scan_pos = pos
+        self._check_size(len(buffer))
+        return None
+
+
+def encode_frame(payload, framing, compressed=False):
+    """Wrap an encoded payload for sending in the given framing mode"""
+    if framing == FRAMING_LENGTH:
+        header = len(payload) | (FRAME_COMPRESSED_FLAG if compressed else 0)
+        return header.to_bytes(FRAME_HEADER_SIZE, "big") + payload
+    if framing == FRAMING_NDJSON:
+        return payload + b"\n"
+    return payload
+
+
+def _maybe_compress(payload, compression, threshold):
+    """Compress a payload when it is large enough and actually shrinks"""
+    if compression is None or memoryview(payload).nbytes < threshold:
+        return payload, False
+    packed = compression.compress(payload)
+    if len(packed) >= memoryview(payload).nbytes:
+        return payload, False
+    return packed, True
+
+
+class Attachment:
+    """Binary payload sent next to a JSON message instead of inside it.
+
+    Handlers may put Attachment objects (or plain bytes) anywhere in their
+    result. Clients that negotiated attachments get the raw bytes as extra
+    length-prefixed frames referenced by {"$attachment": id}; all other
+    clients get a base64 string in the same place.
+    """
+
+    __slots__ = ("data", "content_type")
+
+    def __init__(self, data, content_type="application/octet-stream"):
+        self.data = data
+        self.content_type = content_type
+
+    @property
+    def size(self):
+        return memoryview(self.data).nbytes
+
+    def to_base64(self):
+        return base64.b64encode(self.data).decode('ascii')
+
+
+def encode_message(message, framing, binary_attachments=False, codec=JSON_CODEC,
+                   compression=None, compress_threshold=DEFAULT_COMPRESS_THRESHOLD):
+    """Serialize a message dict into the list of byte chunks to write.
+
+    With binary_attachments, each Attachment becomes a reference in the body,
+    the body gets an "attachments" manifest, and the raw bytes follow as one
+    frame per attachment in manifest order. Frames of at least
+    compress_threshold bytes are compressed when a compression is given.
+    """
+    blobs = []
+    refs = {}
+
+    def default(obj):
+        if isinstance(obj, (bytes, bytearray, memoryview)):
+            blob = Attachment(obj)
+        elif isinstance(obj, Attachment):
+            blob = obj
+        else:
+            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+        if not binary_attachments:
+            return bytes(blob.data) if codec.binary else blob.to_base64()
+        # Keyed by the object in the message, not the wrapper, so the second
+        # pass below finds plain bytes under the same reference
+        if id(obj) not in refs:
+            refs[id(obj)] = {"$attachment": f"a{len(blobs)}", "size": blob.size, "content_type": blob.content_type}
+            blobs.append(blob)
+        return refs[id(obj)]
+
+    payload = codec.dumps(message, default)
+    if blobs:
+        # The manifest is only known once the body has been walked; bodies
+        # with attachments are small, so serializing twice is cheap
+        manifest = [
+            {"id": f"a{i}", "size": blob.size, "content_type": blob.content_type}
+            for i, blob in enumerate(blobs)
+        ]
+        payload = codec.dumps({**message, "attachments": manifest}, default)
+
+    payload, compressed = _maybe_compress(payload, compression, compress_threshold)
+    chunks = [encode_frame(payload, framing, compressed)]
+    for blob in blobs:
+        data = blob.data
+        compressed = False
+        if blob.content_type not in _PRECOMPRESSED_TYPES:
+            data, compressed = _maybe_compress(data, compression, compress_threshold)
+        header = memoryview(data).nbytes | (FRAME_COMPRESSED_FLAG if compressed else 0)
+        chunks.append(header.to_bytes(FRAME_HEADER_SIZE, "big"))
+        chunks.append(data)
+    return chunks
+
+
+def resolve_attachments(value, blobs):
+    """Replace {"$attachment": id} references in a decoded command with bytes"""
+    if isinstance(value, dict):
+        if len(value) <= 3 and "$attachment" in value:
+            ref = value["$attachment"]
+            if ref not in blobs:
+                raise ValueError(f"Unknown attachment: {ref}")
+            return blobs[ref]
+        return {key: resolve_attachments(item, blobs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_attachments(item, blobs) for item in value]
+    return value
+
+
+class MCPConnection:
+    """A connected client: its stream writer, frame decoder and negotiated protocol.
+
+    Connections are created on the server's event loop thread. send() may be
+    called from any thread; serialization and writing always happen on the
+    loop thread so Blender's main thread never blocks on a slow client.
+    """
+
+    def __init__(self, writer, loop, address=None, max_frame_size=DEFAULT_MAX_FRAME_SIZE, metrics=None):
+        self.writer = writer
+        self.loop = loop
+        self.address = address
+        self.metrics = metrics
+        self.decoder = FrameDecoder(FRAMING_JSON, max_frame_size)
+        self.closed = False
+        self.task = None
+        # Negotiated protocol; see negotiate()
+        self.codec = JSON_CODEC
+        self.compression = None
+        self.compress_threshold = DEFAULT_COMPRESS_THRESHOLD
+        self.binary_attachments = False
+        # Command waiting for the binary frames listed in its manifest
+        self._pending_command = None
+        self._pending_manifest = []
+        self._pending_blobs = {}
+        self._pending_size = 0
+        # Frames of a rejected manifest still to be read past
+        self._discard = 0
+        # Cancel tokens of this client's requests that have not been answered, by id
+        self.requests = {}
+        self.max_write_backlog = DEFAULT_MAX_WRITE_BACKLOG
+        self._loop_thread = threading.get_ident()
+
+    @property
+    def framing(self):
+        return self.decoder.framing
+
+    @property
+    def write_backlog(self):
+        """Bytes written to the transport that the socket has not taken yet"""
+        transport = self.writer.transport
+        return transport.get_write_buffer_size() if transport is not None else 0
+
+    def send(self, message, command_type=None):
+        """Queue one message for sending, with the protocol in effect right now.
+
+        When command_type is given, serialization time and wire size are
+        recorded against that command in the server metrics.
+        """
+        if self.closed:
+            raise ConnectionError("Client disconnected")
+        protocol = (self.framing, self.codec, self.compression, self.binary_attachments)
+        if threading.get_ident() == self._loop_thread:
+            self._write_message(message, protocol, command_type)
+        else:
+            self.loop.call_soon_threadsafe(self._write_message, message, protocol, command_type)
+
+    def _write_message(self, message, protocol, command_type=None):
+        if self.closed or self.writer.is_closing():
+            return
+        # Messages sent from other threads are written without awaiting drain();
+        # a client that stopped reading would otherwise grow the buffer forever.
+        # One large response is fine, so only what is still queued counts.
+        backlog = self.write_backlog
+        if backlog > self.max_write_backlog:
+            print(f"Disconnecting client {self.address}: {backlog} bytes of responses left unread")
+            self.closed = True
+            # close() would wait for the buffer to flush, which this client never lets happen
+            self.writer.transport.abort()
+            return
+        framing, codec, compression, binary = protocol
+        options = {
+            "binary_attachments": binary,
+            "codec": codec,
+            "compression": compression,
+            "compress_threshold": self.compress_threshold,
+        }
+        started = time.perf_counter()
+        try:
+            chunks = encode_message(message, framing, **options)
+        except Exception as e:
+            print(f"Failed to serialize response: {str(e)}")
+            error = {"status": "error", "message": f"Failed to serialize response: {str(e)}"}
+            if "id" in message:
+                error["id"] = message["id"]
+            chunks = encode_message(error, framing, **options)
+        if self.metrics is not None and command_type is not None:
+            size = sum(memoryview(chunk).nbytes for chunk in chunks)
+            self.metrics.record_response(command_type, time.perf_counter() - started, size)
+        self.writer.writelines(chunks)
+
+    def decode(self, frame):
+        """Decode one message body with the negotiated codec"""
+        return self.codec.loads(frame)
+
+    @property
+    def awaiting_attachments(self):
+        return self._pending_command is not None or self._discard > 0
+
+    def expect_attachments(self, command, frame_size=0):
+        """Hold a command until the binary frames in its manifest have arrived"""
+        if not self.binary_attachments:
+            raise ValueError("Attachments were not negotiated on this connection")
+        manifest = command.pop("attachments")
+        if not isinstance(manifest, list) or not all(
+            isinstance(item, dict) and "id" in item and isinstance(item.get("size"), int) and item["size"] >= 0
+            for item in manifest
+        ):
+            raise ValueError("attachments must be a list of {id, size} objects")
+        total = sum(item["size"] for item in manifest)
+        if len(manifest) > MAX_ATTACHMENTS or total > self.decoder.max_frame_size:
+            # The frames are already on their way; read past them without keeping them
+            self._discard = len(manifest)
+            raise ValueError(
+                f"{len(manifest)} attachments of {total} bytes exceed the limit of "
+                f"{MAX_ATTACHMENTS} attachments and {self.decoder.max_frame_size} bytes per command"
+            )
+        self._pending_command = command
+        self._pending_manifest = manifest
+        self._pending_blobs = {}
+        self._pending_size = frame_size
+
+    def add_attachment(self, frame):
+        """Store one binary frame; returns the command once all have arrived"""
+        if self._discard:
+            self._discard -= 1
+            return None
+        spec = self._pending_manifest[len(self._pending_blobs)]
+        if spec["size"] != len(frame):
+            self._pending_command = None
+            raise FrameError(f"Attachment {spec['id']} is {len(frame)} bytes, expected {spec['size']}")
+        self._pending_blobs[spec["id"]] = frame
+        self._pending_size += len(frame)
+        if len(self._pending_blobs) < len(self._pending_manifest):
+            return None
+        command = self._pending_command
+        self._pending_command = None
+        command["params"] = resolve_attachments(command.get("params", {}), self._pending_blobs)
+        self._pending_blobs = {}
+        return command
+
+    @property
+    def request_size(self):
+        """Wire size of the command last completed by add_attachment(), manifest included"""
+        return self._pending_size
+
+    def close(self):
+        self.closed = True
+        with suppress(Exception):
+            self.writer.close()
+
+    def negotiate(self, params):
+        """Work out the protocol for a negotiate_protocol request.
+
+        Unsupported encodings fall back to plain JSON and unsupported
+        compression to none; the caller replies and then calls apply().
+        """
+        framing = params.get("framing", FRAMING_JSON)
+        if framing not in FRAMING_MODES:
+            raise ValueError(f"Unsupported framing: {framing}. Must be one of: {', '.join(FRAMING_MODES)}")
+
+        max_frame_size = self.decoder.max_frame_size
+        requested_max = params.get("max_frame_size")
+        if requested_max:
+            max_frame_size = min(int(requested_max), max_frame_size)
+
+        # Binary bodies, binary attachments and compression flags all need
+        # the length header to delimit frames
+        encoding = params.get("encoding", "json")
+        codec = CODECS.get(encoding, JSON_CODEC)
+        if codec.binary and framing != FRAMING_LENGTH:
+            codec = JSON_CODEC
+        compression = COMPRESSIONS.get(params.get("compression"))
+        if framing != FRAMING_LENGTH:
+            compression = None
+        threshold = int(params.get("compress_threshold", self.compress_threshold))
+
+        return {
+            "framing": framing,
+            "max_frame_size": max_frame_size,
+            "attachments": bool(params.get("attachments")) and framing == FRAMING_LENGTH,
+            "encoding": codec.name,
+            "compression": compression.name if compression else None,
+            "compress_threshold": threshold,
+            "available_encodings": sorted(CODECS),
+            "available_compression": sorted(COMPRESSIONS),
+        }
+
+    def apply(self, agreed):
+        """Switch to the settings returned by negotiate()"""
+        self.decoder.set_framing(agreed["framing"])
+        self.decoder.max_frame_size = agreed["max_frame_size"]
+        self.binary_attachments = agreed["attachments"]
+        self.codec = CODECS[agreed["encoding"]]
+        self.compression = COMPRESSIONS.get(agreed["compression"])
+        self.decoder.compression = self.compression
+        self.compress_threshold = agreed["compress_threshold"]
+#endregion
+
+#region Main-thread dispatcher
+DEFAULT_DISPATCH_BUDGET_MS = 8
+# Commands one client may have waiting for the main thread; 0 means unlimited
+DEFAULT_MAX_QUEUED_PER_CLIENT = 64
+# How often the dispatcher timer polls an empty queue, in seconds
+DISPATCH_IDLE_INTERVAL = 0.01
+# For this long after work was submitted the timer keeps polling on every pass
+# of Blender's event loop, so a client sending commands one after another never
+# waits for an idle poll. bpy.app.timers cannot be registered from the socket
+# threads, so this stands in for waking the timer on submit.
+DISPATCH_HOT_WINDOW = 0.25
+# Bounds of the retry hint sent with a busy response, in milliseconds
+MIN_RETRY_AFTER_MS = 10
+MAX_RETRY_AFTER_MS = 5000
+
+
+class QueueFull(Exception):
+    """Raised by submit() when a client already has its limit of queued work"""
+
+    def __init__(self, depth, retry_after_ms):
+        super().__init__(f"Server busy: {depth} commands already queued for this client")
+        self.depth = depth
+        self.retry_after_ms = retry_after_ms
+
+
+class MainThreadDispatcher:
+    """Run queued work on Blender's main thread from one persistent timer.
+
+    Socket threads submit callables on behalf of a client; each client has
+    its own bounded FIFO and a single bpy.app.timers callback serves the
+    clients round-robin until the per-tick time budget is spent, then yields
+    back to Blender so the UI stays responsive. One client flooding the
+    server only ever delays the others by one command per turn.
+    """
+
+    def __init__(self, budget_ms=DEFAULT_DISPATCH_BUDGET_MS, idle_interval=DISPATCH_IDLE_INTERVAL,
+                 max_queued_per_client=DEFAULT_MAX_QUEUED_PER_CLIENT):
+        self.budget = budget_ms / 1000.0
+        self.idle_interval = idle_interval
+        self.max_queued_per_client = max_queued_per_client
+        # client -> deque of (enqueued_at, fn); clients with work wait their turn in _ready
+        self._queues = {}
+        self._ready = deque()
+        self._depth = 0
+        self._last_submit = 0.0
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        with self._stats_lock:
+            self.processed = 0
+            self.rejected = 0
+            self.ticks = 0
+            self.overruns = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.last_wait = 0.0
+            # Moving average of how long one piece of work runs, for retry hints
+            self.avg_run = 0.0
+
+    def start(self):
+        """Register the dispatcher timer; must be called from the main thread"""
+        if not bpy.app.timers.is_registered(self._tick):
+            bpy.app.timers.register(self._tick, first_interval=0.0, persistent=True)
+
+    def stop(self):
+        """Unregister the timer and drop any work that has not started yet"""
+        if bpy.app.timers.is_registered(self._tick):
+            bpy.app.timers.unregister(self._tick)
+        with self._lock:
+            self._queues.clear()
+            self._ready.clear()
+            self._depth = 0
+
+    def submit(self, fn, client=None):
+        """Queue a callable to run on the main thread; safe to call from any thread.
+
+        Raises QueueFull when the client already has max_queued_per_client
+        callables waiting; the addon's own work (client None) is never refused.
+        """
+        with self._lock:
+            queue = self._queues.get(client)
+            if queue is None:
+                queue = self._queues[client] = deque()
+            limit = self.max_queued_per_client
+            if client is not None and limit and len(queue) >= limit:
+                depth = len(queue)
+                waiting = len(self._ready)
+            else:
+                if not queue:
+                    self._ready.append(client)
+                self._last_submit = time.perf_counter()
+                queue.append((self._last_submit, fn))
+                self._depth += 1
+                return
+        # This client's next slot frees up after one turn of every waiting client
+        with self._stats_lock:
+            self.rejected += 1
+            retry_after = self.avg_run * 1000.0 * waiting
+        raise QueueFull(depth, int(min(MAX_RETRY_AFTER_MS, max(MIN_RETRY_AFTER_MS, retry_after))))
+
+    @property
+    def queue_depth(self):
+        return self._depth
+
+    def client_depth(self, client):
+        queue = self._queues.get(client)
+        return len(queue) if queue else 0
+
+    def _next(self):
+        """Pop the next callable, taking clients in turn"""
+        with self._lock:
+            if not self._ready:
+                return None
+            client = self._ready.popleft()
+            queue = self._queues[client]
+            item = queue.popleft()
+            self._depth -= 1
+            if queue:
+                self._ready.append(client)
+            else:
+                del self._queues[client]
+            return item
+
+    def _tick(self):
+        tick_start = time.perf_counter()
+        deadline = tick_start + self.budget
+        while True:
+            item = self._next()
+            if item is None:
+                break
+            enqueued_at, fn = item
+            started = time.perf_counter()
+            wait = started - enqueued_at
+            try:
+                fn()
+            except BaseException as e:
+                # Blender unregisters a timer whose callback raises, and this
+                # one timer serves every client, so even SystemExit stops here
+                print(f"Error in dispatched work: {type(e).__name__}: {str(e)}")
+                traceback.print_exc()
+            finished = time.perf_counter()
+            with self._stats_lock:
+                self.processed += 1
+                self.total_wait += wait
+                self.last_wait = wait
+                self.max_wait = max(self.max_wait, wait)
+                self.avg_run += (finished - started - self.avg_run) * 0.1
+            if finished >= deadline:
+                break
+
+        with self._stats_lock:
+            self.ticks += 1
+            if time.perf_counter() - tick_start > self.budget:
+                self.overruns += 1
+
+        # Come straight back while work is pending or more is likely to
+        # follow soon, otherwise poll lazily
+        if self._depth or time.perf_counter() - self._last_submit < DISPATCH_HOT_WINDOW:
+            return 0.0
+        return self.idle_interval
+
+    def stats(self):
+        with self._stats_lock:
+            avg_wait = self.total_wait / self.processed if self.processed else 0.0
+            return {
+                "queue_depth": self._depth,
+                "clients_waiting": len(self._ready),
+                "max_queued_per_client": self.max_queued_per_client,
+                "processed": self.processed,
+                "rejected": self.rejected,
+                "ticks": self.ticks,
+                "budget_ms": self.budget * 1000.0,
+                "budget_overruns": self.overruns,
+                "avg_run_ms": self.avg_run * 1000.0,
+                "wait_ms": {
+                    "avg": avg_wait * 1000.0,
+                    "max": self.max_wait * 1000.0,
+                    "last": self.last_wait * 1000.0,
+                },
+            }
+#endregion
+
+#region Server metrics
+# Bucket upper edges on a 1-2-5 scale: 10us..50s for durations, 64B..256MB for payloads
+DURATION_BUCKETS = tuple(m * 10.0 ** e for e in range(-5, 2) for m in (1, 2, 5))
+SIZE_BUCKETS = tuple(64 * 4 ** i for i in range(12))
+# Command label used for requests naming no registered command, so clients
+# cannot grow the metric set without bound
+UNKNOWN_COMMAND = "unknown"
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and max; not thread-safe by itself"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # One bucket per upper edge plus an overflow bucket
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper edge of the bucket holding the q-th quantile, capped at the max seen"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self, scale=1.0):
+        return {
+            "count": self.count,
+            "avg": self.total / self.count * scale if self.count else 0.0,
+            "p50": self.quantile(0.5) * scale,
+            "p90": self.quantile(0.9) * scale,
+            "p99": self.quantile(0.99) * scale,
+            "max": self.max * scale,
+        }
+
+
+class CommandMetrics:
+    """Latency and payload histograms of one command type"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.queue_wait = Histogram(DURATION_BUCKETS)
+        self.handler = Histogram(DURATION_BUCKETS)
+        self.serialize = Histogram(DURATION_BUCKETS)
+        self.request_bytes = Histogram(SIZE_BUCKETS)
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+
+    # (attribute, Prometheus name, unit scale for summaries, summary key)
+    HISTOGRAMS = (
+        ("queue_wait", "queue_wait_seconds", 1000.0, "queue_wait_ms"),
+        ("handler", "handler_seconds", 1000.0, "handler_ms"),
+        ("serialize", "serialize_seconds", 1000.0, "serialize_ms"),
+        ("request_bytes", "request_bytes", 1.0, "request_bytes"),
+        ("response_bytes", "response_bytes", 1.0, "response_bytes"),
+    )
+
+    def summary(self):
+        result = {"requests": self.requests, "errors": self.errors, "cancelled": self.cancelled}
+        for attr, _, scale, key in self.HISTOGRAMS:
+            result[key] = getattr(self, attr).summary(scale)
+        return result
+
+
+class ServerMetrics:
+    """Per-command timings and sizes, recorded from the socket and main threads.
+
+    Durations are recorded in seconds and sizes in bytes; summary() reports
+    milliseconds, to_prometheus() the base units.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.commands = {}
+
+    def _command(self, name):
+        metrics = self.commands.get(name)
+        if metrics is None:
+            metrics = self.commands[name] = CommandMetrics()
+        return metrics
+
+    def record_request(self, name, size):
+        with self._lock:
+            metrics = self._command(name)
+            metrics.requests += 1
+            metrics.request_bytes.record(size)
+
+    def record_queue_wait(self, name, seconds):
+        with self._lock:
+            self._command(name).queue_wait.record(seconds)
+
+    def record_handler(self, name, seconds):
+        with self._lock:
+            self._command(name).handler.record(seconds)
+
+    def record_error(self, name):
+        with self._lock:
+            self._command(name).errors += 1
+
+    def record_cancelled(self, name):
+        with self._lock:
+            self._command(name).cancelled += 1
+
+    def record_response(self, name, seconds, size):
+        with self._lock:
+            metrics = self._command(name)
+            metrics.serialize.record(seconds)
+            metrics.response_bytes.record(size)
+
+    def summary(self):
+        with self._lock:
+            return {name: metrics.summary() for name, metrics in sorted(self.commands.items())}
+
+    def to_prometheus(self, gauges=None):
+        """Render every histogram in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            commands = sorted(self.commands.items())
+            for attr, metric, _, _ in CommandMetrics.HISTOGRAMS:
+                name = f"blendermcp_command_{metric}"
+                lines.append(f"# TYPE {name} histogram")
+                for command, metrics in commands:
+                    histogram = getattr(metrics, attr)
+                    cumulative = 0
+                    for bound, count in zip(histogram.bounds, histogram.buckets):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{command="{command}",le="{bound:g}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{command="{command}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{command="{command}"}} {histogram.total:g}')
+                    lines.append(f'{name}_count{{command="{command}"}} {histogram.count}')
+            for counter in ("requests", "errors", "cancelled"):
+                name = f"blendermcp_command_{counter}_total"
+                lines.append(f"# TYPE {name} counter")
+                for command, metrics in commands:
+                    lines.append(f'{name}{{command="{command}"}} {getattr(metrics, counter)}')
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE blendermcp_{name} gauge")
+            lines.append(f"blendermcp_{name} {value:g}")
+        return "\n".join(lines) + "\n"
+#endregion
+
+#region Profiling
+DEFAULT_PROFILE_TOP = 20
+PROFILE_SORT_KEYS = {
+    "cumulative": lambda row: row[3],
+    "tottime": lambda row: row[2],
+    "calls": lambda row: row[1],
+}
+
+
+def _profile_sort_key(sort):
+    if sort not in PROFILE_SORT_KEYS:
+        raise ValueError(f"Unsupported sort: {sort}. Must be one of: {', '.join(PROFILE_SORT_KEYS)}")
+    return PROFILE_SORT_KEYS[sort]
+
+
+# Only one cProfile may be active per interpreter, whichever thread it runs on
+_PROFILER_LOCK = threading.Lock()
+
+
+class HandlerProfiler:
+    """cProfile, and optionally tracemalloc, around one or more handler calls.
+
+    Used for a single command carrying a "profile" option, or for a whole
+    start_profiling / stop_profiling session; only the handler calls passed
+    to run() are profiled, not the rest of Blender.
+    """
+
+    def __init__(self, memory=False):
+        self.profile = cProfile.Profile()
+        self.memory = memory
+        self.commands = 0
+        self.elapsed = 0.0
+        self.peak = 0
+        self.started_at = time.time()
+        self._owns_tracemalloc = False
+        if memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+            tracemalloc.reset_peak()
+
+    def run(self, handler, params):
+        """Call handler(**params) under the profiler; runs unprofiled if another profile is active"""
+        if not _PROFILER_LOCK.acquire(blocking=False):
+            return handler(**params)
+        started = time.perf_counter()
+        try:
+            self.profile.enable()
+            try:
+                return handler(**params)
+            finally:
+                self.profile.disable()
+        finally:
+            _PROFILER_LOCK.release()
+            self.commands += 1
+            self.elapsed += time.perf_counter() - started
+            if self.memory:
+                self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+
+    def report(self, top=DEFAULT_PROFILE_TOP, sort="cumulative", output_path=None):
+        """Summarize the hot functions and allocation peak, and stop tracemalloc if we started it"""
+        sort_key = _profile_sort_key(sort)
+        report = {"commands": self.commands, "elapsed_ms": self.elapsed * 1000.0}
+        if self.commands:
+            stats = pstats.Stats(self.profile)
+            rows = [
+                (key, calls, tottime, cumtime, primitive)
+                for key, (primitive, calls, tottime, cumtime, _) in stats.stats.items()
+            ]
+            rows.sort(key=sort_key, reverse=True)
+            report["functions"] = [
+                {
+                    "function": f"{name} ({osp.basename(filename)}:{line})",
+                    "calls": calls,
+                    "primitive_calls": primitive,
+                    "tottime_ms": tottime * 1000.0,
+                    "cumtime_ms": cumtime * 1000.0,
+                }
+                for (filename, line, name), calls, tottime, cumtime, primitive in rows[:top]
+            ]
+            if output_path:
+                stats.dump_stats(output_path)
+                report["output_path"] = output_path
+
+        if self.memory:
+            report["peak_bytes"] = self.peak
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                report["top_allocations"] = [
+                    {"location": f"{osp.basename(entry.traceback[0].filename)}:{entry.traceback[0].lineno}",
+                     "size": entry.size, "count": entry.count}
+                    for entry in snapshot.statistics("lineno")[:top]
+                ]
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+        return report
+#endregion
+
+#region Request cancellation
+class CommandCancelled(BaseException):
+    """Raised inside a handler whose request was cancelled or ran past its deadline.
+
+    A BaseException so that the handlers' own `except Exception` blocks let
+    it through instead of turning it into an ordinary error result.
+    """
+
+
+class CancelToken:
+    """Cancellation state of one request.
+
+    Checked by the server before a queued command runs, and by long handlers
+    between steps through BlenderMCPServer.check_cancelled().
+    """
+
+    def __init__(self, request_id=None, deadline_ms=None):
+        self.request_id = request_id
+        self.deadline = time.perf_counter() + float(deadline_ms) / 1000.0 if deadline_ms else None
+        self.reason = None
+        self.started = False
+
+    def cancel(self, reason="cancelled by client"):
+        if self.reason is None:
+            self.reason = reason
+
+    @property
+    def cancelled(self):
+        if self.reason is None and self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.reason = "exceeded its deadline"
+        return self.reason is not None
+
+    def check(self):
+        if self.cancelled:
+            raise CommandCancelled(self.message)
+
+    @property
+    def message(self):
+        if self.request_id is None:
+            return f"Request {self.reason}"
+        return f"Request {self.request_id} {self.reason}"
+#endregion
+
+#region Command registry
+# Integrations whose commands are only exposed while their scene toggle is on
+PROVIDERS = ("polyhaven", "hyper3d", "sketchfab", "hunyuan3d")
+
+_JSON_TYPE_NAMES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    tuple: "array",
+    dict: "object",
+}
+
+
+def _json_type_name(annotation, default):
+    origin = getattr(annotation, "__origin__", annotation)
+    if origin in _JSON_TYPE_NAMES:
+        return _JSON_TYPE_NAMES[origin]
+    if default is not inspect.Parameter.empty and default is not None:
+        return _JSON_TYPE_NAMES.get(type(default), "any")
+    return "any"
+
+
+def _signature_params(fn):
+    """Derive a parameter schema from a handler's signature"""
+    schema = {}
+    for param in list(inspect.signature(fn).parameters.values())[1:]:
+        if param.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+            continue
+        entry = {
+            "type": _json_type_name(param.annotation, param.default),
+            "required": param.default is inspect.Parameter.empty,
+        }
+        if param.default is not inspect.Parameter.empty:
+            entry["default"] = param.default
+        schema[param.name] = entry
+    return schema
+
+
+class CommandSpec:
+    """Metadata attached to a socket command handler by @mcp_command"""
+
+    __slots__ = ("name", "attr", "provider", "main_thread", "blocking", "params", "description")
+
+    def __init__(self, name, attr, provider, main_thread, params, description, blocking=False):
+        self.name = name
+        self.attr = attr
+        self.provider = provider
+        self.main_thread = main_thread
+        self.blocking = blocking
+        self.params = params
+        self.description = description
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "provider": self.provider,
+            "main_thread": self.main_thread,
+            "params": self.params,
+            "description": self.description,
+        }
+
+
+def mcp_command(name=None, provider=None, main_thread=True, params=None, blocking=False):
+    """Declare a BlenderMCPServer method as a socket command.
+
+    Parameters:
+    - name: Command type clients send; defaults to the method name
+    - provider: Integration (one of PROVIDERS) that must be enabled, or None
+    - main_thread: False if the handler never touches bpy and can answer
+      directly on the socket thread
+    - blocking: With main_thread False, the handler may take long (disk,
+      hashing), so it runs on a worker thread instead of stalling every
+      connection's reads and writes on the socket thread
+    - params: Parameter schema; derived from the signature when omitted
+    """
+    if provider is not None and provider not in PROVIDERS:
+        raise ValueError(f"Unknown provider: {provider}")
+
+    def decorator(fn):
+        doc = inspect.getdoc(fn) or ""
+        fn.mcp_command = CommandSpec(
+            name=name or fn.__name__,
+            attr=fn.__name__,
+            provider=provider,
+            main_thread=main_thread,
+            params=params if params is not None else _signature_params(fn),
+            description=doc.split("\n", 1)[0],
+            blocking=blocking,
+        )
+        return fn
+    return decorator
+
+
+class CommandRegistry:
+    """Command name -> bound handler lookup, rebuilt only when providers change"""
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.specs = {}
+        for attr in dir(type(owner)):
+            spec = getattr(getattr(type(owner), attr), "mcp_command", None)
+            if isinstance(spec, CommandSpec):
+                self.specs[spec.name] = spec
+        self.enabled_providers = frozenset()
+        self._handlers = {}
+
+    def rebuild(self, enabled_providers):
+        """Rebind the handlers exposed for the given set of enabled providers"""
+        enabled_providers = frozenset(enabled_providers)
+        handlers = {}
+        for spec in self.specs.values():
+            if spec.provider is None or spec.provider in enabled_providers:
+                handlers[spec.name] = (getattr(self.owner, spec.attr), spec)
+        # Swap the whole dict so lookups from other threads never see a partial table
+        self._handlers = handlers
+        self.enabled_providers = enabled_providers
+
+    def lookup(self, name):
+        """Return (handler, spec) for an enabled command, or (None, None)"""
+        return self._handlers.get(name, (None, None))
+
+    def describe(self, include_disabled=False):
+        commands = []
+        for name in sorted(self.specs):
+            spec = self.specs[name]
+            enabled = name in self._handlers
+            if enabled or include_disabled:
+                commands.append({**spec.describe(), "enabled": enabled})
+        return commands
+
+
+def enabled_providers(scene):
+    """Providers switched on by the blendermcp_use_* toggles of a scene"""
+    return {provider for provider in PROVIDERS if getattr(scene, f"blendermcp_use_{provider}", False)}
+#endregion
+
+#region Scene queries
+DEFAULT_QUERY_LIMIT = 100
+MAX_QUERY_LIMIT = 1000
+DEFAULT_QUERY_FIELDS = ("name", "type", "location")
+QUERY_FIELDS = (
+    "name", "type", "location", "rotation", "scale", "dimensions", "bounds",
+    "materials", "polycount", "visible", "parent", "collections",
+)
+
+
+def _encode_cursor(index, name):
+    """Opaque page cursor: where the next page starts and the object just before it"""
+    payload = json.dumps({"i": index, "after": name}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def _resume_index(order, cursor):
+    """Index to continue a query from, still correct if objects were added or removed"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        index, after = int(state["i"]), state["after"]
+    except Exception:
+        raise ValueError("Invalid cursor") from None
+    if 0 < index <= len(order.names) and order.names[index - 1] == after:
+        return index
+    # The scene changed under the cursor; find the last object returned again
+    row = order.rows.get(after)
+    if row is not None:
+        return row + 1
+    # That object was removed as well; go on from the next one of the order it was paged from
+    if after in order.previous:
+        for name in order.previous[order.previous.index(after) + 1:]:
+            row = order.rows.get(name)
+            if row is not None:
+                return row
+        return len(order.names)
+    return min(index, len(order.names))
+
+
+class ObjectOrder:
+    """The scene's objects in iteration order, kept between pages of query_objects.
+
+    scene.objects has no random access, so starting every page at the
+    cursor meant walking from the first object again, and paging through
+    N objects cost O(N**2 / limit). The list and a name -> index map are
+    read once and reused until the change journal reports an object or
+    collection being added or removed; edits that leave membership alone,
+    like moving objects, keep them. The journal only hears of changes once
+    the main thread goes idle, so the scene's object names are compared
+    too: a batch that deletes one object and adds another in the same
+    slice must not be served the removed object.
+    """
+
+    def __init__(self, journal):
+        self.journal = journal
+        self.version = None
+        self.scene_name = None
+        self.objects = []
+        self.names = []
+        self.rows = {}
+        # Names before the last rebuild, to resume cursors whose object was removed
+        self.previous = []
+
+    def invalidate(self):
+        """Reread the objects on the next query, e.g. after undo replaced every datablock"""
+        self.version = None
+
+    def refresh(self, scene):
+        """Bring the order up to date with the scene; cheap when nothing structural changed"""
+        version = self.journal.version
+        names = scene.objects.keys()
+        if self.version is not None and scene.name == self.scene_name and names == self.names:
+            if version == self.version:
+                return
+            delta = self.journal.since(self.version)
+            if not delta["resync"] and not any(
+                change["id_type"] == "COLLECTION"
+                or (change["id_type"] == "OBJECT" and change["change"] != "modified")
+                for change in delta["changes"]
+            ):
+                self.version = delta["version"]
+                return
+        self.objects = list(scene.objects)
+        self.previous = self.names
+        self.names = names
+        self.rows = {name: i for i, name in enumerate(self.names)}
+        self.version = version
+        self.scene_name = scene.name
+
+#endregion
+
+#region World bounds
+# Below this many objects, reading each object's properties beats a bulk foreach_get
+BULK_BOUNDS_THRESHOLD = 64
+
+
+def _bulk_transforms(collection):
+    """matrix_world (n, 4, 4) and bound_box (n, 8, 3) of every item in a bpy collection"""
+    n = len(collection)
+    matrices = np.empty(n * 16, dtype=np.float32)
+    corners = np.empty(n * 24, dtype=np.float32)
+    collection.foreach_get("matrix_world", matrices)
+    collection.foreach_get("bound_box", corners)
+    # foreach_get yields Blender's column-major matrix storage
+    return matrices.reshape(n, 4, 4).transpose(0, 2, 1), corners.reshape(n, 8, 3)
+
+
+def _object_transforms(objects):
+    """matrix_world and bound_box read object by object"""
+    matrices = np.empty((len(objects), 4, 4))
+    corners = np.empty((len(objects), 8, 3))
+    for i, obj in enumerate(objects):
+        matrices[i] = obj.matrix_world
+        corners[i] = obj.bound_box
+    return matrices, corners
+
+
+def world_bounds(objects, source=None):
+    """World-space axis-aligned bounds of objects, as (mins, maxs) arrays of shape (n, 3).
+
+    source is a bpy collection holding all of `objects` (scene.objects or
+    bpy.data.objects); when enough of it is wanted, matrices and bound boxes
+    are read with one foreach_get each instead of per object. All corners
+    are then transformed with one batched matmul.
+    """
+    objects = list(objects)
+    if not objects:
+        return np.empty((0, 3)), np.empty((0, 3))
+    return _corner_bounds(*_read_transforms(objects, source))
+
+
+def _read_transforms(objects, source=None):
+    """matrix_world and bound_box of objects, in bulk from source when it pays off"""
+    matrices = None
+    if source is not None and len(objects) >= BULK_BOUNDS_THRESHOLD and len(objects) * 8 >= len(source):
+        try:
+            matrices, corners = _bulk_transforms(source)
+            if len(objects) != len(source) or any(a is not b for a, b in zip(objects, source)):
+                index = {name: i for i, name in enumerate(source.keys())}
+                rows = np.fromiter((index[obj.name] for obj in objects), dtype=np.intp, count=len(objects))
+                matrices, corners = matrices[rows], corners[rows]
+        except (AttributeError, TypeError, KeyError, RuntimeError):
+            matrices = None
+    if matrices is None:
+        matrices, corners = _object_transforms(objects)
+    return matrices, corners
+
+
+def _corner_bounds(matrices, corners):
+    world = corners @ matrices[:, :3, :3].transpose(0, 2, 1) + matrices[:, None, :3, 3]
+    return world.min(axis=1), world.max(axis=1)
+
+
+def combined_bounds(mins, maxs):
+    """One [[min], [max]] box around all of the boxes returned by world_bounds()"""
+    if not len(mins):
+        return None
+    return [mins.min(axis=0).tolist(), maxs.max(axis=0).tolist()]
+#endregion
+
+#region Spatial index
+# Per-object BVH trees kept between queries; least recently used are dropped first
+DEFAULT_BVH_CACHE_SIZE = 256
+# Object types that have surfaces to raycast against
+SPATIAL_SURFACE_TYPES = ("MESH",)
+
+
+# The box tests below take bounds per axis, as (3, n) arrays: NumPy is much
+# faster at a few whole-column operations than at reducing n rows of three.
+
+def _ray_box_entry(origin, direction, lows, highs):
+    """Distance along a normalized ray at which it enters each box, inf where it misses"""
+    enter = np.zeros(lows.shape[1])
+    leave = np.full(lows.shape[1], np.inf)
+    for axis in range(3):
+        o, d = origin[axis], direction[axis]
+        if d == 0:
+            # Parallel to this slab: the ray is either always inside it or never
+            outside = (lows[axis] > o) | (highs[axis] < o)
+            leave[outside] = -np.inf
+            continue
+        t1 = (lows[axis] - o) / d
+        t2 = (highs[axis] - o) / d
+        if d < 0:
+            t1, t2 = t2, t1
+        np.maximum(enter, t1, out=enter)
+        np.minimum(leave, t2, out=leave)
+    enter[enter > leave] = np.inf
+    return enter
+
+
+def _point_box_distance(point, lows, highs):
+    """Distance from a point to each box, 0 inside"""
+    total = np.zeros(lows.shape[1])
+    for axis in range(3):
+        gap = np.maximum(np.maximum(lows[axis] - point[axis], 0.0), point[axis] - highs[axis])
+        total += gap * gap
+    return np.sqrt(total)
+
+
+def _ascending(keys, limit, batch=16):
+    """(row, key) for keys up to limit, smallest first, sorting only the rows visited.
+
+    Callers usually stop after a handful of rows, so rows are selected a
+    growing batch at a time with argpartition instead of sorting all of them.
+    Overwrites keys; inf marks rows to skip.
+    """
+    limit = min(limit, np.finfo(float).max)
+    while True:
+        remaining = np.count_nonzero(keys <= limit)
+        if not remaining:
+            return
+        count = min(batch, remaining)
+        rows = np.argpartition(keys, count - 1)[:count]
+        rows = rows[np.argsort(keys[rows], kind="stable")]
+        values = keys[rows].tolist()
+        keys[rows] = np.inf
+        yield from zip(rows.tolist(), values)
+        batch *= 4
+
+
+class SpatialIndex:
+    """World AABBs of the scene's objects plus lazily built per-object BVH trees.
+
+    Box, ray and distance queries first narrow the scene down with vectorized
+    tests over the AABB arrays, then ask the BVH trees of the few candidates
+    left for exact hits. Trees are built in object space, so moving an object
+    only refreshes its row of the arrays; the change journal says which rows
+    and trees are stale, and anything structural rebuilds the arrays. Like
+    ObjectOrder, the scene's object names are checked too, for objects added
+    or removed before the journal has heard of it.
+    """
+
+    def __init__(self, journal, cache_size=DEFAULT_BVH_CACHE_SIZE):
+        self.journal = journal
+        self.cache_size = cache_size
+        self.version = None
+        self.scene_name = None
+        self.names = []
+        self.rows = {}
+        self.matrices = np.empty((0, 4, 4))
+        self.corners = np.empty((0, 8, 3))
+        # World AABBs per axis, shape (3, n)
+        self.lows = np.empty((3, 0))
+        self.highs = np.empty((3, 0))
+        self.surface = np.empty(0, dtype=bool)
+        self._trees = OrderedDict()
+
+    def invalidate(self):
+        """Rebuild everything on the next query, e.g. after undo replaced every datablock"""
+        self.version = None
+
+    def refresh(self):
+        """Bring the index up to date with the scene; cheap when nothing changed"""
+        scene = bpy.context.scene
+        version = self.journal.version
+        names = scene.objects.keys()
+        if self.version is not None and scene.name == self.scene_name and names == self.names:
+            if version == self.version:
+                return
+            delta = self.journal.since(self.version)
+            if not delta["resync"] and self._apply(delta["changes"]):
+                self.version = delta["version"]
+                return
+        self._rebuild(scene, version, names)
+
+    def _rebuild(self, scene, version, names):
+        objects = list(scene.objects)
+        self.names = names
+        self.rows = {name: i for i, name in enumerate(self.names)}
+        self.matrices, self.corners = _read_transforms(objects, scene.objects)
+        mins, maxs = _corner_bounds(self.matrices, self.corners)
+        self.lows = np.ascontiguousarray(mins.T, dtype=float)
+        self.highs = np.ascontiguousarray(maxs.T, dtype=float)
+        self.surface = np.fromiter(
+            (obj.type in SPATIAL_SURFACE_TYPES for obj in objects), dtype=bool, count=len(objects),
+        )
+        self._trees.clear()
+        self.version = version
+        self.scene_name = scene.name
+
+    def _apply(self, changes):
+        """Update moved objects and drop stale trees; False if a full rebuild is needed"""
+        moved = set()
+        meshes = set()
+        for change in changes:
+            if change["id_type"] == "COLLECTION":
+                return False
+            if change["id_type"] == "MESH":
+                meshes.add(change["name"])
+            elif change["id_type"] == "OBJECT":
+                if change["change"] != "modified":
+                    return False
+                if change["name"] in self.rows:
+                    moved.add(change["name"])
+                    if "geometry" in change["updates"]:
+                        self._trees.pop(change["name"], None)
+        if meshes:
+            for name in list(self._trees):
+                obj = bpy.data.objects.get(name)
+                if obj is None or getattr(obj.data, "name", None) in meshes:
+                    self._trees.pop(name, None)
+        if moved:
+            objects = [bpy.data.objects.get(name) for name in moved]
+            if any(obj is None for obj in objects):
+                return False
+            rows = np.fromiter((self.rows[obj.name] for obj in objects), dtype=np.intp, count=len(objects))
+            matrices, corners = _object_transforms(objects)
+            self.matrices[rows] = matrices
+            self.corners[rows] = corners
+            mins, maxs = _corner_bounds(matrices, corners)
+            self.lows[:, rows] = mins.T
+            self.highs[:, rows] = maxs.T
+        return True
+
+    def tree(self, row):
+        """The object-space BVH tree of the object at `row`, built on first use"""
+        name = self.names[row]
+        if name in self._trees:
+            self._trees.move_to_end(name)
+            return self._trees[name]
+        obj = bpy.data.objects.get(name)
+        tree = None
+        if obj is not None:
+            try:
+                tree = BVHTree.FromObject(obj, bpy.context.evaluated_depsgraph_get())
+            except (ValueError, RuntimeError, TypeError) as e:
+                print(f"Could not build BVH tree for {name}: {str(e)}")
+        self._trees[name] = tree
+        while len(self._trees) > self.cache_size:
+            self._trees.popitem(last=False)
+        return tree
+
+    def in_box(self, box_min, box_max, contained=False):
+        """Rows of the objects whose AABB overlaps (or lies inside) a world-space box"""
+        mask = np.ones(self.lows.shape[1], dtype=bool)
+        for axis in range(3):
+            lo, hi = float(box_min[axis]), float(box_max[axis])
+            if contained:
+                mask &= (self.lows[axis] >= lo) & (self.highs[axis] <= hi)
+            else:
+                mask &= (self.lows[axis] <= hi) & (self.highs[axis] >= lo)
+        return np.flatnonzero(mask)
+
+    def raycast(self, origin, direction, max_distance=np.inf):
+        """First surface hit along a ray: (row, location, normal, face index, distance) or None"""
+        origin = np.asarray(origin, dtype=float)
+        direction = np.asarray(direction, dtype=float)
+        length = np.linalg.norm(direction)
+        if not length:
+            raise ValueError("direction must not be a zero vector")
+        direction = direction / length
+
+        entry = _ray_box_entry(origin, direction, self.lows, self.highs)
+        entry[~self.surface] = np.inf
+        best = None
+        best_distance = max_distance
+        for row, enter in _ascending(entry, max_distance):
+            if enter > best_distance:
+                break  # every remaining box starts beyond the hit we have
+            tree = self.tree(row)
+            if tree is None:
+                continue
+            matrix = self.matrices[row]
+            try:
+                inverse = np.linalg.inv(matrix)
+            except np.linalg.LinAlgError:
+                continue  # scaled flat to zero
+            local_origin = inverse[:3, :3] @ origin + inverse[:3, 3]
+            local_direction = inverse[:3, :3] @ direction
+            local_direction /= np.linalg.norm(local_direction)
+            location, normal, face_index, _ = tree.ray_cast(local_origin.tolist(), local_direction.tolist())
+            if location is None:
+                continue
+            world = matrix[:3, :3] @ np.asarray(location, dtype=float) + matrix[:3, 3]
+            distance = float(np.linalg.norm(world - origin))
+            if distance <= best_distance:
+                world_normal = inverse[:3, :3].T @ np.asarray(normal, dtype=float)
+                world_normal /= np.linalg.norm(world_normal) or 1.0
+                best = (row, world, world_normal, face_index, distance)
+                best_distance = distance
+        return best
+
+    def nearest(self, point, max_distance=np.inf):
+        """Closest surface to a point: (row, location, distance) or None"""
+        point = np.asarray(point, dtype=float)
+        bound = _point_box_distance(point, self.lows, self.highs)
+        bound[~self.surface] = np.inf
+        best = None
+        best_distance = max_distance
+        for row, gap in _ascending(bound, max_distance):
+            if gap > best_distance:
+                break
+            tree = self.tree(row)
+            if tree is None:
+                continue
+            matrix = self.matrices[row]
+            try:
+                inverse = np.linalg.inv(matrix)
+            except np.linalg.LinAlgError:
+                continue  # scaled flat to zero
+            local_point = inverse[:3, :3] @ point + inverse[:3, 3]
+            # Nearest in object space; exact unless the object is scaled unevenly
+            location, _, _, _ = tree.find_nearest(local_point.tolist())
+            if location is None:
+                continue
+            world = matrix[:3, :3] @ np.asarray(location, dtype=float) + matrix[:3, 3]
+            distance = float(np.linalg.norm(world - point))
+            if distance <= best_distance:
+                best = (row, world, distance)
+                best_distance = distance
+        return best
+#endregion
+
+#region Mesh buffers
+MESH_BUFFERS = ("positions", "normals", "uvs", "triangles")
+
+
+def _buffer(array, shape):
+    """A NumPy array as a binary attachment plus what a client needs to view it"""
+    return {
+        "dtype": array.dtype.name,
+        "shape": list(shape),
+        "data": Attachment(memoryview(array).cast("B")),
+    }
+
+
+def mesh_buffers(mesh, attributes=MESH_BUFFERS, matrix=None):
+    """Geometry of a mesh read with foreach_get into flat float32/int32 arrays.
+
+    positions and normals are per vertex, uvs are per loop (face corner) of
+    the active UV map, and triangles index vertices, with triangle_loops
+    indexing loops for the UVs. With a matrix, positions and normals are
+    transformed to that space.
+    """
+    buffers = {}
+    vertex_count = len(mesh.vertices)
+    if "positions" in attributes:
+        positions = np.empty(vertex_count * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", positions)
+        if matrix is not None:
+            positions = positions.reshape(-1, 3) @ matrix[:3, :3].T.astype(np.float32) + matrix[:3, 3].astype(np.float32)
+        buffers["positions"] = _buffer(positions.ravel(), (vertex_count, 3))
+    if "normals" in attributes:
+        normals = np.empty(vertex_count * 3, dtype=np.float32)
+        if hasattr(mesh, "vertex_normals"):
+            mesh.vertex_normals.foreach_get("vector", normals)
+        else:
+            mesh.vertices.foreach_get("normal", normals)
+        if matrix is not None:
+            normals = normals.reshape(-1, 3) @ np.linalg.inv(matrix[:3, :3]).astype(np.float32)
+            normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+        buffers["normals"] = _buffer(normals.ravel(), (vertex_count, 3))
+    if "uvs" in attributes and mesh.uv_layers.active is not None:
+        loop_count = len(mesh.loops)
+        uvs = np.empty(loop_count * 2, dtype=np.float32)
+        mesh.uv_layers.active.data.foreach_get("uv", uvs)
+        buffers["uvs"] = _buffer(uvs, (loop_count, 2))
+    if "triangles" in attributes or "uvs" in attributes:
+        mesh.calc_loop_triangles()
+        triangle_count = len(mesh.loop_triangles)
+        if "triangles" in attributes:
+            triangles = np.empty(triangle_count * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get("vertices", triangles)
+            buffers["triangles"] = _buffer(triangles, (triangle_count, 3))
+        if "uvs" in buffers:
+            loops = np.empty(triangle_count * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get("loops", loops)
+            buffers["triangle_loops"] = _buffer(loops, (triangle_count, 3))
+    return buffers
+#endregion
+
+#region Viewport capture
+# zlib level for in-memory PNGs; higher levels cost far more time than they save bytes
+PNG_COMPRESS_LEVEL = 3
+DEFAULT_CAPTURE_QUALITY = 85
+CAPTURE_FORMATS = {"png": "PNG", "jpeg": "JPEG", "jpg": "JPEG", "webp": "WEBP"}
+
+
+def box_downscale(pixels, max_size):
+    """Shrink an (h, w, c) uint8 image so its longer side is max_size.
+
+    Averages whole blocks of pixels (a box filter) down to the smallest
+    size at or above the target, then picks the nearest of the remaining
+    less-than-2x step.
+    """
+    height, width = pixels.shape[:2]
+    if max(width, height) <= max_size:
+        return pixels
+    scale = max_size / max(width, height)
+    new_width, new_height = max(1, int(width * scale)), max(1, int(height * scale))
+    factor = max(width, height) // max_size
+    if factor > 1:
+        height, width = height // factor, width // factor
+        pixels = pixels[:height * factor, :width * factor]
+        # Sum strided slices rather than reduce tiny block axes, which NumPy does slowly
+        dtype = np.uint16 if factor <= 16 else np.uint32
+        rows = pixels[0::factor].astype(dtype)
+        for i in range(1, factor):
+            rows += pixels[i::factor]
+        total = rows[:, 0::factor].copy()
+        for j in range(1, factor):
+            total += rows[:, j::factor]
+        area = factor * factor
+        pixels = ((total + area // 2) // area).astype(np.uint8)
+    rows = ((np.arange(new_height) + 0.5) * height / new_height).astype(np.intp)
+    cols = ((np.arange(new_width) + 0.5) * width / new_width).astype(np.intp)
+    return pixels[rows][:, cols]
+
+
+def _png_chunk(tag, data):
+    return (
+        len(data).to_bytes(4, "big") + tag + data
+        + (zlib.crc32(data, zlib.crc32(tag)) & 0xFFFFFFFF).to_bytes(4, "big")
+    )
+
+
+def encode_png(pixels, level=PNG_COMPRESS_LEVEL):
+    """Encode an (h, w, 3 or 4) uint8 image as PNG bytes"""
+    height, width, channels = pixels.shape
+    rows = np.zeros((height, width * channels + 1), dtype=np.uint8)  # filter byte 0 per row
+    rows[:, 1:] = pixels.reshape(height, -1)
+    header = width.to_bytes(4, "big") + height.to_bytes(4, "big") + bytes((8, 6 if channels == 4 else 2, 0, 0, 0))
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", header),
+        _png_chunk(b"IDAT", zlib.compress(rows, level)),
+        _png_chunk(b"IEND", b""),
+    ))
+
+
+def _encode_with_blender(pixels, file_format):
+    """Fallback encoder for formats other than PNG when Pillow is missing"""
+    height, width, _ = pixels.shape
+    rgba = np.ones((height, width, 4), dtype=np.float32)
+    rgba[..., :3] = pixels[::-1, :, :3] / np.float32(255.0)  # Blender images are bottom-up
+    img = bpy.data.images.new("BlenderMCP Capture", width, height)
+    with tempfile.NamedTemporaryFile(suffix=f".{file_format.lower()}", delete=False) as tmp_file:
+        path = tmp_file.name
+    try:
+        img.pixels.foreach_set(rgba.ravel())
+        img.filepath_raw = path
+        img.file_format = file_format
+        img.save()
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        bpy.data.images.remove(img)
+        with suppress(OSError):
+            os.unlink(path)
+
+
+def encode_image(pixels, format="png", quality=DEFAULT_CAPTURE_QUALITY):
+    """Encode an (h, w, 3) uint8 image in memory; returns (bytes, content type)"""
+    file_format = CAPTURE_FORMATS.get(format.lower())
+    if file_format is None:
+        raise ValueError(f"Unsupported image format: {format}")
+    content_type = f"image/{file_format.lower()}"
+    if file_format == "PNG":
+        return encode_png(pixels), content_type
+    if PILImage is not None:
+        buffer = io.BytesIO()
+        PILImage.fromarray(pixels).save(buffer, format=file_format, quality=int(quality))
+        return buffer.getvalue(), content_type
+    return _encode_with_blender(pixels, file_format), content_type
+
+
+class ViewportCapture:
+    """Renders a 3D viewport into a reused offscreen buffer and reads it back"""
+
+    def __init__(self):
+        self._offscreen = None
+        self._size = None
+
+    def read(self, area, context):
+        """Pixels of the area's 3D view as an (h, w, 4) uint8 array, top row first"""
+        region = next((r for r in area.regions if r.type == 'WINDOW'), None)
+        if region is None:
+            raise ValueError("3D viewport has no window region")
+        space = area.spaces.active
+        size = (region.width, region.height)
+        if self._size != size:
+            self.free()
+            self._offscreen = gpu.types.GPUOffScreen(*size)
+            self._size = size
+        self._offscreen.draw_view3d(
+            context.scene, context.view_layer, space, region,
+            space.region_3d.view_matrix, space.region_3d.window_matrix,
+            do_color_management=True,
+        )
+        pixels = np.asarray(self._offscreen.texture_color.read())
+        if pixels.dtype != np.uint8:
+            pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+        width, height = size
+        # GPU rows start at the bottom
+        return pixels.reshape(height, width, 4)[::-1]
+
+    def free(self):
+        if self._offscreen is not None:
+            with suppress(Exception):
+                self._offscreen.free()
+        self._offscreen = None
+        self._size = None
+#endregion
+
+#region Viewport streaming
+DEFAULT_STREAM_FPS = 10
+MAX_STREAM_FPS = 60
+DEFAULT_STREAM_MAX_SIZE = 480
+DEFAULT_STREAM_TILE_SIZE = 64
+# Share of the main thread capturing may take; slower captures lower the frame rate
+STREAM_MAX_DUTY = 0.25
+# Frames are skipped while this many bytes still wait to be sent to the client
+STREAM_MAX_BACKLOG = 4 * 1024 * 1024
+# Above this share of changed tiles, one whole frame is cheaper to send
+STREAM_KEYFRAME_RATIO = 0.5
+# Seconds after which an unchanged-looking view is captured anyway and diffed,
+# for changes nothing tracks (viewport render samples, reloaded images, ...)
+STREAM_RECHECK_INTERVAL = 1.0
+
+
+def changed_tiles(previous, current, tile_size):
+    """(row, column) of every tile_size square where two equal-sized images differ"""
+    diff = (previous != current).any(axis=2)
+    height, width = diff.shape
+    rows, cols = -(-height // tile_size), -(-width // tile_size)
+    padded = np.zeros((rows * tile_size, cols * tile_size), dtype=bool)
+    padded[:height, :width] = diff
+    return np.argwhere(padded.reshape(rows, tile_size, cols, tile_size).any(axis=(1, 3)))
+
+
+def _view_state(area):
+    """What the 3D view looks from and at; a frame only changes when this or the scene does"""
+    region = next((r for r in area.regions if r.type == 'WINDOW'), None)
+    region_3d = area.spaces.active.region_3d
+    matrices = tuple(
+        value for matrix in (region_3d.view_matrix, region_3d.window_matrix) for row in matrix for value in row
+    )
+    return matrices, getattr(region, "width", 0), getattr(region, "height", 0)
+
+
+def _rna_values(struct):
+    """Values of a struct's plain RNA properties, so that an edit to any of them is noticed"""
+    rna = getattr(struct, "bl_rna", None)
+    if rna is None:
+        return ()
+    values = []
+    for prop in rna.properties:
+        if prop.type in ('POINTER', 'COLLECTION'):
+            continue
+        value = getattr(struct, prop.identifier, None)
+        if isinstance(value, set):
+            value = frozenset(value)
+        elif hasattr(value, "__len__") and not isinstance(value, str):
+            value = tuple(value)
+        values.append(value)
+    return tuple(values)
+
+
+def _display_state(area, scene):
+    """Shading, overlays and color management: they change the frame without a journal entry"""
+    space = area.spaces.active
+    return (
+        _rna_values(getattr(space, "shading", None)),
+        _rna_values(getattr(space, "overlay", None)),
+        _rna_values(getattr(scene, "view_settings", None)),
+        _rna_values(getattr(scene, "display", None)),
+        getattr(getattr(scene, "render", None), "engine", None),
+    )
+
+
+class ViewportSubscription:
+    __slots__ = (
+        "id", "conn", "interval", "max_size", "format", "quality", "tile_size",
+        "next_due", "frame", "state", "checked_at", "sequence", "skipped",
+    )
+
+    def __init__(self, sub_id, conn, fps, max_size, format, quality, tile_size):
+        self.id = sub_id
+        self.conn = conn
+        self.interval = 1.0 / fps
+        self.max_size = max_size
+        self.format = format
+        self.quality = quality
+        self.tile_size = tile_size
+        self.next_due = 0.0
+        # Last frame sent, the scene version and view it showed, and when the view was last captured
+        self.frame = None
+        self.state = None
+        self.checked_at = 0.0
+        self.sequence = 0
+        # Frames not sent since the last one, because nothing changed or the client lagged
+        self.skipped = 0
+
+
+class ViewportStreamer:
+    """Pushes viewport frames to subscribed connections.
+
+    A timer only keeps time; captures are submitted to the main-thread
+    dispatcher with the streamer as their client, so they share its
+    per-tick budget and take turns with client commands. Each subscription
+    gets at most `fps` frames a second, fewer when capturing would take
+    more than STREAM_MAX_DUTY of the main thread. A frame is only captured
+    when the scene (by change journal version), the view or its shading
+    has changed since the last one, or STREAM_RECHECK_INTERVAL has passed,
+    and only the tiles that differ from the last frame are encoded and sent.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.subscriptions = {}
+        self._ids = itertools.count(1)
+        # Whether a capture pass is waiting in the dispatcher
+        self._queued = False
+
+    def subscribe(self, conn, **options):
+        sub = ViewportSubscription(next(self._ids), conn, **options)
+        self.subscriptions[sub.id] = sub
+        if not bpy.app.timers.is_registered(self._tick):
+            bpy.app.timers.register(self._tick, first_interval=0.0)
+        return sub
+
+    def unsubscribe(self, sub_id, conn=None):
+        sub = self.subscriptions.get(sub_id)
+        if sub is None or (conn is not None and sub.conn is not conn):
+            return False
+        del self.subscriptions[sub_id]
+        return True
+
+    def stop(self):
+        self.subscriptions.clear()
+        self._queued = False
+        if bpy.app.timers.is_registered(self._tick):
+            bpy.app.timers.unregister(self._tick)
+
+    def _tick(self):
+        if not self.subscriptions:
+            return None
+        now = time.perf_counter()
+        due = min(sub.next_due for sub in self.subscriptions.values())
+        if due > now:
+            return max(0.001, due - now)
+        if not self._queued:
+            self._queued = True
+            self.server.dispatcher.submit(self._run_due, client=self)
+        return 1.0 / MAX_STREAM_FPS
+
+    def _run_due(self):
+        """Dispatcher work: capture and send a frame for every subscription that is due"""
+        self._queued = False
+        now = time.perf_counter()
+        for sub in list(self.subscriptions.values()):
+            if sub.conn.closed:
+                self.unsubscribe(sub.id)
+                continue
+            if now < sub.next_due:
+                continue
+            started = time.perf_counter()
+            try:
+                self._push(sub)
+            except ConnectionError:
+                self.unsubscribe(sub.id)
+                continue
+            except Exception as e:
+                print(f"Error streaming viewport: {str(e)}")
+                self.unsubscribe(sub.id)
+                with suppress(ConnectionError):
+                    sub.conn.send({"event": "viewport_stream_ended", "subscription": sub.id, "message": str(e)})
+                continue
+            elapsed = time.perf_counter() - started
+            sub.next_due = started + max(sub.interval, elapsed / STREAM_MAX_DUTY)
+
+    def _push(self, sub):
+        area = next((a for a in bpy.context.screen.areas if a.type == 'VIEW_3D'), None)
+        if area is None:
+            raise ValueError("No 3D viewport found")
+        state = (self.server.journal.version, _view_state(area), _display_state(area, bpy.context.scene))
+        now = time.perf_counter()
+        unchanged = state == sub.state and now - sub.checked_at < STREAM_RECHECK_INTERVAL
+        if unchanged or sub.conn.write_backlog > STREAM_MAX_BACKLOG:
+            sub.skipped += 1
+            return
+        sub.checked_at = now
+
+        pixels = box_downscale(self.server.capture.read(area, bpy.context)[..., :3], sub.max_size)
+        height, width = pixels.shape[:2]
+        size = sub.tile_size
+        keyframe = sub.frame is None or sub.frame.shape != pixels.shape
+        if not keyframe:
+            tiles = changed_tiles(sub.frame, pixels, size)
+            if not len(tiles):
+                sub.state = state
+                sub.skipped += 1
+                return
+            keyframe = len(tiles) > STREAM_KEYFRAME_RATIO * (-(-height // size)) * (-(-width // size))
+        if keyframe:
+            rects = [(0, 0, width, height)]
+        else:
+            rects = [
+                (col * size, row * size, min(size, width - col * size), min(size, height - row * size))
+                for row, col in tiles.tolist()
+            ]
+
+        encoded = []
+        for x, y, w, h in rects:
+            data, content_type = encode_image(pixels[y:y + h, x:x + w], sub.format, sub.quality)
+            encoded.append({"x": x, "y": y, "width": w, "height": h, "image": Attachment(data, content_type)})
+        sub.sequence += 1
+        sub.conn.send({
+            "event": "viewport_frame",
+            "subscription": sub.id,
+            "sequence": sub.sequence,
+            "width": width,
+            "height": height,
+            "keyframe": keyframe,
+            "skipped": sub.skipped,
+            "tiles": encoded,
+        })
+        sub.frame = pixels
+        sub.state = state
+        sub.skipped = 0
+#endregion
+
+#region Code execution
+DEFAULT_CODE_CACHE_SIZE = 256
+DEFAULT_MAX_SESSIONS = 16
+# Estimated size of all session namespaces together
+DEFAULT_SESSION_MEMORY_LIMIT = 256 * 1024 * 1024
+# Objects visited when estimating a namespace's size; the estimate stops growing there
+SESSION_SIZE_WALK_LIMIT = 200000
+# Sessions are re-measured when their variable names change, and otherwise at most this often (s)
+SESSION_SIZE_INTERVAL = 5.0
+# Main-thread time a generator-style script gets per dispatcher turn
+DEFAULT_SCRIPT_SLICE_MS = 8
+# Progress messages of a running script are sent at most this often (s)
+SCRIPT_PROGRESS_INTERVAL = 0.1
+# Name the body of a generator-style script is wrapped in
+SCRIPT_FUNCTION = "__mcp_script__"
+# Characters of stdout one execute_code call may produce; the rest is counted and dropped
+DEFAULT_MAX_OUTPUT = 8 * 1024 * 1024
+# Streamed output is sent once this many characters are waiting, or after OUTPUT_FLUSH_INTERVAL s
+OUTPUT_CHUNK_SIZE = 64 * 1024
+OUTPUT_FLUSH_INTERVAL = 0.05
+_SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+
+
+def _top_level_nodes(tree):
+    """Nodes of a module that run in its own scope, not in nested functions or classes"""
+    pending = list(tree.body)
+    while pending:
+        node = pending.pop()
+        yield node
+        if isinstance(node, _SCOPE_NODES):
+            # Decorators and defaults are evaluated in the enclosing scope
+            pending.extend(getattr(node, "decorator_list", ()))
+            args = getattr(node, "args", None)
+            if args is not None:
+                pending.extend(args.defaults)
+                pending.extend(d for d in args.kw_defaults if d is not None)
+            pending.extend(getattr(node, "bases", ()))
+            continue
+        pending.extend(ast.iter_child_nodes(node))
+
+
+def _compile_script(source, filename):
+    """Compile source as a module; returns (code, is_generator).
+
+    A script with a top-level yield is wrapped in a generator function
+    named SCRIPT_FUNCTION that declares every name it binds global, so it
+    sets the same namespace variables a plain script would.
+    """
+    tree = ast.parse(source, filename)
+    nodes = list(_top_level_nodes(tree))
+    if not any(isinstance(node, (ast.Yield, ast.YieldFrom)) for node in nodes):
+        return compile(tree, filename, "exec"), False
+
+    names = set()
+    for node in nodes:
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+    names.discard("*")
+    wrapper = ast.parse(f"def {SCRIPT_FUNCTION}():\n    pass").body[0]
+    wrapper.body = ([ast.Global(names=sorted(names))] if names else []) + tree.body
+    module = ast.Module(body=[wrapper], type_ignores=[])
+    ast.fix_missing_locations(module)
+    return compile(module, filename, "exec"), True
+
+
+class CodeCache:
+    """LRU of compiled code objects keyed by a hash of their source.
+
+    compile() returns (code, is_generator); see _compile_script.
+    """
+
+    def __init__(self, capacity=DEFAULT_CODE_CACHE_SIZE):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._codes = OrderedDict()
+
+    def compile(self, source):
+        key = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        code = self._codes.get(key)
+        if code is not None:
+            self._codes.move_to_end(key)
+            self.hits += 1
+            return code
+        code = _compile_script(source, f"<mcp:{key[:12]}>")
+        self.misses += 1
+        self._codes[key] = code
+        while len(self._codes) > self.capacity:
+            self._codes.popitem(last=False)
+        return code
+
+    def stats(self):
+        return {"entries": len(self._codes), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
+
+
+def _estimate_size(namespace, limit=SESSION_SIZE_WALK_LIMIT):
+    """Rough bytes held by a namespace: its values and what they contain.
+
+    Modules, classes and functions are shared with the rest of Blender or
+    tiny, so the walk does not follow them.
+    """
+    seen = {id(namespace)}
+    pending = [value for key, value in namespace.items() if key != "__builtins__"]
+    total = sys.getsizeof(namespace)
+    while pending and len(seen) < limit:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, (type, type(sys), type(_estimate_size), type(len))):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj, 0)
+        pending.extend(gc.get_referents(obj))
+    return total
+
+
+class CodeSession:
+    __slots__ = ("name", "namespace", "created", "last_used", "runs", "size", "names", "measured_at")
+
+    def __init__(self, name):
+        self.name = name
+        self.namespace = {"bpy": bpy}
+        self.created = self.last_used = time.time()
+        self.runs = 0
+        self.size = 0
+        # Variable names and time when size was last estimated
+        self.names = None
+        self.measured_at = 0.0
+
+
+class SessionStore:
+    """Named execute_code namespaces that persist between calls.
+
+    Sessions are kept in least recently used order. When there are more
+    than max_sessions, or their estimated sizes add up to more than
+    memory_limit, the least recently used ones are dropped.
+    """
+
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, memory_limit=DEFAULT_SESSION_MEMORY_LIMIT):
+        self.max_sessions = max_sessions
+        self.memory_limit = memory_limit
+        self._sessions = OrderedDict()
+
+    def get(self, name):
+        """The session called name, created if needed, marked as most recently used"""
+        session = self._sessions.get(name)
+        if session is None:
+            session = self._sessions[name] = CodeSession(name)
+        self._sessions.move_to_end(name)
+        return session
+
+    def finished(self, session):
+        """Account for a run in session; returns the names of sessions dropped to stay in budget"""
+        session.runs += 1
+        session.last_used = now = time.time()
+        names = session.namespace.keys()
+        if session.names != names or now - session.measured_at >= SESSION_SIZE_INTERVAL:
+            session.size = _estimate_size(session.namespace)
+            session.names = set(names)
+            session.measured_at = now
+        evicted = []
+        while len(self._sessions) > self.max_sessions or (
+            len(self._sessions) > 1 and sum(s.size for s in self._sessions.values()) > self.memory_limit
+        ):
+            name, _ = self._sessions.popitem(last=False)
+            evicted.append(name)
+        if session.size > self.memory_limit:
+            self._sessions.pop(session.name, None)
+            evicted.append(session.name)
+        return evicted
+
+    def reset(self, name=None):
+        """Drop one session, or all of them; returns how many were dropped"""
+        if name is None:
+            count = len(self._sessions)
+            self._sessions.clear()
+            return count
+        return 1 if self._sessions.pop(name, None) is not None else 0
+
+    def describe(self):
+        now = time.time()
+        return [
+            {
+                "name": s.name,
+                "runs": s.runs,
+                "estimated_bytes": s.size,
+                "variables": sorted(k for k in s.namespace if not k.startswith("__")),
+                "idle_s": now - s.last_used,
+            }
+            for s in reversed(self._sessions.values())
+        ]
+
+
+class OutputSink(io.TextIOBase):
+    """stdout of execute_code: keeps what a script prints, or streams it, up to a cap.
+
+    Without emit, output is kept for the reply. With emit, it is handed to
+    emit(chunk, offset) in chunks as it is written, so the server holds at
+    most about OUTPUT_CHUNK_SIZE characters. Past `limit` characters output
+    is only counted, and a truncation marker ends it.
+    """
+
+    def __init__(self, limit=DEFAULT_MAX_OUTPUT, emit=None):
+        self.limit = limit
+        self.emit = emit
+        self.written = 0
+        self.dropped = 0
+        self.sent = 0
+        self._parts = []
+        self._pending = 0
+        self._last_flush = time.perf_counter()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        length = len(text)
+        room = self.limit - self.written
+        if length > room:
+            self.dropped += length - max(room, 0)
+            text = text[:max(room, 0)]
+        if text:
+            self._parts.append(text)
+            self.written += len(text)
+            self._pending += len(text)
+            if self.emit is not None and (
+                self._pending >= OUTPUT_CHUNK_SIZE
+                or time.perf_counter() - self._last_flush >= OUTPUT_FLUSH_INTERVAL
+            ):
+                self.flush()
+        return length
+
+    def flush(self):
+        """Stream everything written so far; a no-op when output is kept for the reply"""
+        if self.emit is None or not self._parts:
+            return
+        chunk = "".join(self._parts)
+        self._parts = []
+        self._pending = 0
+        self._last_flush = time.perf_counter()
+        offset = self.sent
+        self.sent += len(chunk)
+        self.emit(chunk, offset)
+
+    def finish(self):
+        """End the output; returns what the reply's "result" holds (nothing when streamed)"""
+        if self.dropped:
+            self._parts.append(f"\n[output truncated: {self.dropped} more characters]\n")
+        if self.emit is not None:
+            self.flush()
+            return ""
+        text = "".join(self._parts)
+        self._parts = [text]
+        return text
+
+    def close(self):
+        # IOBase flushes on close and on garbage collection; nothing should be sent that late
+        self._parts = []
+        super().close()
+
+
+class ScriptRun:
+    """A generator-style execute_code script, resumed a slice of main-thread time at a time.
+
+    Each yield is a point where the script may be paused; the last value
+    yielded is reported as its progress.
+    """
+
+    def __init__(self, generator, output, on_done):
+        self.generator = generator
+        self.output = output
+        self.on_done = on_done
+        self.extra = None
+        self.progress = None
+        self.slices = 0
+        # Main-thread seconds per step, and when progress was last sent
+        self.slice = DEFAULT_SCRIPT_SLICE_MS / 1000.0
+        self.last_report = 0.0
+
+    def step(self, budget=None):
+        """Run until the script yields with budget seconds used up; True once it has finished"""
+        deadline = time.perf_counter() + (self.slice if budget is None else budget)
+        self.slices += 1
+        try:
+            with redirect_stdout(self.output):
+                while True:
+                    try:
+                        self.progress = next(self.generator)
+                    except StopIteration:
+                        self._done()
+                        return True
+                    if time.perf_counter() >= deadline:
+                        self.output.flush()
+                        return False
+        except BaseException:
+            self.output.flush()
+            self._done()
+            raise
+
+    def close(self):
+        """Stop the script early; its finally blocks still run"""
+        try:
+            with redirect_stdout(self.output):
+                self.generator.close()
+        finally:
+            self._done()
+
+    def _done(self):
+        if self.extra is None:
+            self.extra = self.on_done() or {}
+
+    def result(self):
+        return {"executed": True, "result": self.output.finish(), "slices": self.slices, **(self.extra or {})}
+#endregion
+
+#region Change journal
+DEFAULT_JOURNAL_CAPACITY = 10000
+# Datablock types whose additions and removals are tracked, by bpy.data collection
+JOURNAL_DATA = {
+    "OBJECT": "objects",
+    "MESH": "meshes",
+    "MATERIAL": "materials",
+    "COLLECTION": "collections",
+    "IMAGE": "images",
+    "LIGHT": "lights",
+    "CAMERA": "cameras",
+}
+# Updated on every edit; tracking it would only add noise
+JOURNAL_IGNORED_TYPES = ("SCENE",)
+JOURNAL_UPDATE_FLAGS = ("transform", "geometry", "shading")
+
+
+class JournalEntry:
+    __slots__ = ("id_type", "name", "version", "added_version", "removed", "flags")
+
+    def __init__(self, id_type, name):
+        self.id_type = id_type
+        self.name = name
+        self.version = 0
+        self.added_version = 0
+        self.removed = False
+        # update kind -> version it last happened at
+        self.flags = {}
+
+
+class ChangeJournal:
+    """Versioned record of added, removed and modified datablocks.
+
+    Keeps only the latest state of each datablock, ordered by the version
+    it last changed at, so repeated edits (dragging an object) cost one
+    entry, and get_changes_since() walks back only as far as it has to.
+    When more than `capacity` datablocks have changed, the oldest entries
+    are dropped and clients older than them must rescan the scene.
+
+    Versions restart at 0 with every journal, so clients get them as
+    "<epoch>:<version>" tokens; a token from another epoch (an earlier
+    server or Blender session) always means a rescan.
+    """
+
+    def __init__(self, capacity=DEFAULT_JOURNAL_CAPACITY):
+        self.capacity = capacity
+        self.epoch = os.urandom(4).hex()
+        self.version = 0
+        # Versions at or below this are no longer fully covered by the journal
+        self.floor = 0
+        self._entries = OrderedDict()
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """Remember which datablocks exist now; later diffs report additions and removals"""
+        names = {}
+        for id_type, attr in JOURNAL_DATA.items():
+            collection = getattr(bpy.data, attr, None)
+            if collection is not None:
+                names[id_type] = {block.name for block in collection}
+        self._names = names
+
+    def reset(self):
+        """Forget all changes, e.g. after a file load; every client resyncs once"""
+        with self._lock:
+            self._entries.clear()
+            self.version += 1
+            self.floor = self.version
+        self.snapshot()
+
+    def _record(self, id_type, name, change, flags=()):
+        self.version += 1
+        key = (id_type, name)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            entry = JournalEntry(id_type, name)
+        entry.version = self.version
+        if change == "added":
+            entry.added_version = self.version
+            entry.removed = False
+            entry.flags = {}
+        elif change == "removed":
+            entry.removed = True
+        for flag in flags:
+            entry.flags[flag] = self.version
+        self._entries[key] = entry
+        while len(self._entries) > self.capacity:
+            _, dropped = self._entries.popitem(last=False)
+            self.floor = dropped.version
+
+    def _diff_names(self):
+        """Record datablocks added or removed since the last snapshot"""
+        for id_type, attr in JOURNAL_DATA.items():
+            collection = getattr(bpy.data, attr, None)
+            if collection is None:
+                continue
+            old = self._names.get(id_type, set())
+            if len(collection) == len(old) and all(block.name in old for block in collection):
+                continue
+            new = {block.name for block in collection}
+            for name in new - old:
+                self._record(id_type, name, "added")
+            for name in old - new:
+                self._record(id_type, name, "removed")
+            self._names[id_type] = new
+
+    def on_depsgraph_update(self, depsgraph):
+        """depsgraph_update_post: record what the depsgraph says was updated"""
+        with self._lock:
+            structural = False
+            for update in depsgraph.updates:
+                block = update.id
+                id_type = getattr(block, "id_type", type(block).__name__.upper())
+                if id_type in JOURNAL_IGNORED_TYPES:
+                    continue
+                if id_type == "COLLECTION" or block.name not in self._names.get(id_type, (block.name,)):
+                    # Linking, unlinking or renaming; find out with a full diff below
+                    structural = True
+                flags = [
+                    flag for flag in JOURNAL_UPDATE_FLAGS
+                    if getattr(update, f"is_updated_{flag}", False)
+                ]
+                self._record(id_type, block.name, "modified", flags)
+            if structural or self._counts_changed():
+                self._diff_names()
+
+    def on_undo_redo(self):
+        """undo_post / redo_post: anything may have come back or gone away"""
+        with self._lock:
+            self._diff_names()
+
+    def _counts_changed(self):
+        for id_type, attr in JOURNAL_DATA.items():
+            collection = getattr(bpy.data, attr, None)
+            if collection is not None and len(collection) != len(self._names.get(id_type, ())):
+                return True
+        return False
+
+    def token(self, version):
+        return f"{self.epoch}:{version}"
+
+    def since(self, version, epoch=None):
+        """Net changes after `version`, or a resync flag if the journal cannot tell.
+
+        epoch, when given, is the one `version` was issued under.
+        """
+        with self._lock:
+            if version is None:
+                return {"version": self.version, "resync": False, "changes": []}
+            if (epoch is not None and epoch != self.epoch) or version < self.floor or version > self.version:
+                return {"version": self.version, "resync": True, "changes": []}
+
+            changes = []
+            for entry in reversed(self._entries.values()):
+                if entry.version <= version:
+                    break
+                added = entry.added_version > version
+                if entry.removed:
+                    if added:
+                        continue  # came and went without the client ever seeing it
+                    change = "removed"
+                else:
+                    change = "added" if added else "modified"
+                changes.append({
+                    "id_type": entry.id_type,
+                    "name": entry.name,
+                    "change": change,
+                    "version": entry.version,
+                    "updates": sorted(flag for flag, at in entry.flags.items() if at > version),
+                })
+            changes.reverse()
+            return {"version": self.version, "resync": False, "changes": changes}
+#endregion
+
+#region Asset cache
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+CACHE_CHUNK_SIZE = 1024 * 1024
+CACHE_INDEX_VERSION = 1
+
+
+def default_cache_dir():
+    """Per-user folder for downloaded assets, kept across sessions unlike the temp dir"""
+    with suppress(Exception):
+        path = bpy.utils.user_resource('DATAFILES', path="blendermcp_cache")
+        if path:
+            return path
+    return osp.join(tempfile.gettempdir(), "blendermcp_cache")
+
+
+def _link_or_copy(source, destination):
+    """Place a cached file at destination, as a hard link where the filesystem allows it"""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def _file_digest(path):
+    """SHA-256 of a file's content, or None if it cannot be read"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CACHE_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class AssetCache:
+    """Downloaded asset files kept on disk so repeat imports skip the network.
+
+    Entries are keyed by provider, asset ID, resolution, format and a variant
+    (texture map, included file, ...) and point at a blob named after the
+    SHA-256 of its content, so the same file reached through several keys is
+    stored once. index.json records each entry's size and last use; when the
+    blobs outgrow max_bytes the least recently used entries are dropped.
+    Downloads are checked against the provider's size and MD5 when it gives
+    them, and a hit is only served if its blob still has the recorded size.
+
+    Imports fetch on the main thread while stats(verify=True) hashes blobs on
+    a worker thread; the index is only touched under _lock, and nothing
+    slow (downloads, hashing) runs while it is held.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_downloaded = 0
+        # key -> entry dict; read from index.json on first use
+        self._entries = None
+        # Partial files of downloads in progress, which orphan cleanup leaves alone
+        self._partials = set()
+        self._lock = threading.Lock()
+
+    @property
+    def _index_path(self):
+        return osp.join(self.directory, "index.json")
+
+    def _blob_path(self, entry):
+        digest = entry["sha256"]
+        return osp.join(self.directory, "blobs", digest[:2], digest + entry["suffix"])
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            with suppress(OSError, ValueError, KeyError, TypeError):
+                with open(self._index_path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+                if index["version"] == CACHE_INDEX_VERSION:
+                    self._entries = dict(index["entries"])
+        return self._entries
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        partial = self._index_path + ".partial"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_INDEX_VERSION, "entries": self._entries}, f)
+        os.replace(partial, self._index_path)
+
+    def fetch(self, url, provider, asset_id, resolution=None, file_format=None, variant=None,
+              suffix="", headers=None, size=None, md5=None, timeout=None, check=None, validate=None):
+        """Path of the cached file for an asset, downloading url into the cache on a miss
+
+        Parameters:
+        - suffix: File extension of the blob (e.g. ".glb"), for importers that go by it
+        - size, md5: What the provider says the file should be; a cached copy that
+          disagrees is downloaded again, and a download that disagrees is rejected
+        - check: Called between downloaded chunks, e.g. to raise CommandCancelled
+        - validate: Called with the path of a finished download; a false result rejects it
+
+        The returned file belongs to the cache: read it, link or copy it, never modify it.
+        """
+        key = "/".join(str(part) if part else "-" for part in (provider, asset_id, resolution, file_format, variant))
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key)
+            if entry is not None:
+                path = self._blob_path(entry)
+                stale = (size is not None and size != entry["size"]) or (md5 is not None and entry["md5"] not in (None, md5))
+                with suppress(OSError):
+                    if not stale and os.stat(path).st_size == entry["size"]:
+                        entry["last_used"] = time.time()
+                        self.hits += 1
+                        self._save()
+                        return path
+                self._drop(key)
+            self.misses += 1
+
+        entry, partial = self._download(url, suffix, headers, size, md5, timeout, check, validate)
+        entry.update(provider=provider, asset_id=asset_id, last_used=time.time())
+        path = self._blob_path(entry)
+        with self._lock:
+            try:
+                os.makedirs(osp.dirname(path), exist_ok=True)
+                os.replace(partial, path)
+            finally:
+                self._partials.discard(partial)
+            self._entries[key] = entry
+            self._evict(keep=key)
+            self._save()
+        return path
+
+    def _download(self, url, suffix, headers, size, md5, timeout, check, validate):
+        """Stream url into a partial file, hashing as it arrives; returns the new entry and that file"""
+        partial_dir = osp.join(self.directory, "partial")
+        os.makedirs(partial_dir, exist_ok=True)
+        with self._lock:
+            fd, partial = tempfile.mkstemp(dir=partial_dir, suffix=suffix)
+            self._partials.add(partial)
+        digest = hashlib.sha256()
+        checksum = hashlib.md5(usedforsecurity=False) if md5 else None
+        length = 0
+        try:
+            with os.fdopen(fd, "wb") as f, requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=CACHE_CHUNK_SIZE):
+                    if check is not None:
+                        check()
+                    f.write(chunk)
+                    digest.update(chunk)
+                    if checksum is not None:
+                        checksum.update(chunk)
+                    length += len(chunk)
+            if size is not None and length != size:
+                raise ValueError(f"Download of {url} ended after {length} of {size} bytes")
+            if checksum is not None and checksum.hexdigest() != md5.lower():
+                raise ValueError(f"Download of {url} does not match its MD5 checksum")
+            if validate is not None and not validate(partial):
+                raise ValueError(f"Download of {url} is not a valid {suffix or 'asset'} file")
+        except BaseException:
+            with self._lock:
+                self._partials.discard(partial)
+            with suppress(OSError):
+                os.unlink(partial)
+            raise
+        self.bytes_downloaded += length
+        return {"sha256": digest.hexdigest(), "suffix": suffix, "size": length, "md5": md5}, partial
+
+    def _drop(self, key):
+        """Forget one entry, deleting its blob unless another entry shares it; returns bytes freed"""
+        entry = self._entries.pop(key)
+        blob = (entry["sha256"], entry["suffix"])
+        if any((other["sha256"], other["suffix"]) == blob for other in self._entries.values()):
+            return 0
+        with suppress(OSError):
+            os.unlink(self._blob_path(entry))
+        return entry["size"]
+
+    def _total_bytes(self):
+        return sum({(e["sha256"], e["suffix"]): e["size"] for e in self._entries.values()}.values())
+
+    def _evict(self, keep=None):
+        """Drop least recently used entries until the blobs fit in max_bytes"""
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        # The entry being fetched stays even if it alone is over the limit
+        for key in sorted(self._entries, key=lambda k: self._entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key != keep:
+                total -= self._drop(key)
+
+    def _remove_orphans(self):
+        """Delete blobs no entry refers to and abandoned partial downloads; returns files removed"""
+        keep = {osp.normcase(self._blob_path(entry)) for entry in self._entries.values()}
+        keep.update(osp.normcase(partial) for partial in self._partials)
+        removed = 0
+        for folder in ("blobs", "partial"):
+            for root, _, files in os.walk(osp.join(self.directory, folder)):
+                for name in files:
+                    path = osp.join(root, name)
+                    if osp.normcase(path) not in keep:
+                        with suppress(OSError):
+                            os.unlink(path)
+                            removed += 1
+        return removed
+
+    def verify(self):
+        """Re-hash every blob, dropping entries whose content changed and files no entry uses.
+
+        The hashing runs without the lock, so imports can use the cache
+        meanwhile; an entry replaced or evicted in the meantime is left alone.
+        """
+        with self._lock:
+            snapshot = list(self._load().items())
+        corrupt = [(key, entry) for key, entry in snapshot if _file_digest(self._blob_path(entry)) != entry["sha256"]]
+        with self._lock:
+            dropped = 0
+            for key, entry in corrupt:
+                if self._entries.get(key) is entry:
+                    self._drop(key)
+                    dropped += 1
+            orphans = self._remove_orphans()
+            self._save()
+        return {"corrupt": dropped, "orphans_removed": orphans}
+
+    def stats(self, verify=False):
+        """Entries and bytes per provider, plus hit counts since the server started"""
+        report = self.verify() if verify else {}
+        with self._lock:
+            entries = self._load()
+            providers = {}
+            for entry in entries.values():
+                counts = providers.setdefault(entry["provider"], {"entries": 0, "bytes": 0})
+                counts["entries"] += 1
+                counts["bytes"] += entry["size"]
+            return {
+                "directory": self.directory,
+                "entries": len(entries),
+                "bytes": self._total_bytes(),
+                "max_bytes": self.max_bytes,
+                "providers": providers,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_downloaded": self.bytes_downloaded,
+                **report,
+            }
+
+    def purge(self, provider=None, asset_id=None):
+        """Delete the entries matching provider and asset_id (all of them by default)"""
+        with self._lock:
+            entries = self._load()
+            keys = [
+                key for key, entry in entries.items()
+                if provider in (None, entry["provider"]) and asset_id in (None, entry["asset_id"])
+            ]
+            freed = sum(self._drop(key) for key in keys)
+            if provider is None and asset_id is None:
+                self._remove_orphans()
+            self._save()
+        return {"removed": len(keys), "freed_bytes": freed}
+#endregion
+
+DEFAULT_MAX_CONNECTIONS = 32
+# Seconds a client may stay silent before it is disconnected; 0 disables
+DEFAULT_IDLE_TIMEOUT = 600
+SERVER_START_TIMEOUT = 5.0
+SERVER_STOP_TIMEOUT = 5.0
+# Commands handled by the connection itself rather than the command registry
+PROTOCOL_COMMANDS = ("negotiate_protocol", "cancel")
+
+def _response_failed(response):
+    """Whether a command failed, including handlers that report errors in a successful result"""
+    if response.get("status") == "error":
+        return True
+    result = response.get("result")
+    return isinstance(result, dict) and ("error" in result or result.get("succeed") is False)
+
 class BlenderMCPServer:
-    def __init__(self, host='localhost', port=9876):
+    def __init__(self, host='localhost', port=9876, max_frame_size=DEFAULT_MAX_FRAME_SIZE,
+                 dispatch_budget_ms=DEFAULT_DISPATCH_BUDGET_MS, max_connections=DEFAULT_MAX_CONNECTIONS,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, socket_path=None,
+                 max_queued_per_client=DEFAULT_MAX_QUEUED_PER_CLIENT, cache_dir=None,
+                 cache_max_bytes=DEFAULT_CACHE_MAX_BYTES, use_tcp=True):
         self.host = host
         self.port = port
+        # Optional Unix domain socket served alongside TCP for same-host clients
+        self.socket_path = socket_path or None
+        # With a socket path, TCP can be turned off so instances never fight over a port
+        self.use_tcp = use_tcp
+        self.max_frame_size = max_frame_size
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
         self.running = False
-        self.socket = None
         self.server_thread = None
+        self.loop = None
+        self.connections = set()
+        self._stop_event = None
+        self._started = threading.Event()
+        self._start_error = None
+        self.dispatcher = MainThreadDispatcher(
+            budget_ms=dispatch_budget_ms, max_queued_per_client=max_queued_per_client,
+        )
+        self.registry = CommandRegistry(self)
+        self.metrics = ServerMetrics()
+        # Running start_profiling session, if any
+        self.profiler = None
+        # Token and connection of the request whose handler is running on the main thread
+        self._active_token = None
+        self._active_conn = None
+        # Token of the request a main_thread=False handler is running on this (socket or worker) thread
+        self._local = threading.local()
+        self.journal = ChangeJournal()
+        self.spatial = SpatialIndex(self.journal)
+        self.object_order = ObjectOrder(self.journal)
+        self.capture = ViewportCapture()
+        self.streams = ViewportStreamer(self)
+        self.code_cache = CodeCache()
+        self.sessions = SessionStore()
+        # Downloads shared by the Polyhaven and Sketchfab importers
+        self.assets = AssetCache(cache_dir, cache_max_bytes)
 
     def start(self):
         if self.running:
@@ -52,136 +2885,450 @@ class BlenderMCPServer:
         self.running = True
 
         try:
-            # Create socket
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.socket.bind((self.host, self.port))
-            self.socket.listen(1)
-
-            # Start server thread
-            self.server_thread = threading.Thread(target=self._server_loop)
+            # Build the command table and start the main-thread dispatcher
+            # before any client can connect
+            self.refresh_commands()
+            self.journal.snapshot()
+            self.dispatcher.start()
+
+            # Start the event loop thread and wait until it is listening
+            self._started.clear()
+            self._start_error = None
+            self.server_thread = threading.Thread(target=self._run_event_loop)
             self.server_thread.daemon = True
             self.server_thread.start()
-
-            print(f"BlenderMCP server started on {self.host}:{self.port}")
+            if not self._started.wait(timeout=SERVER_START_TIMEOUT):
+                raise TimeoutError("Event loop did not start in time")
+            if self._start_error:
+                raise self._start_error
+
+            if self.use_tcp:
+                print(f"BlenderMCP server started on {self.host}:{self.port}")
+            if self.socket_path:
+                print(f"BlenderMCP server listening on {self.socket_path}")
         except Exception as e:
             print(f"Failed to start server: {str(e)}")
             self.stop()
 
     def stop(self):
         self.running = False
+        self.dispatcher.stop()
+        if self.profiler is not None:
+            # Ends tracemalloc if the abandoned session started it
+            with suppress(Exception):
+                self.profiler.report(top=0)
+            self.profiler = None
+        self.streams.stop()
+        self.capture.free()
 
-        # Close socket
-        if self.socket:
-            try:
-                self.socket.close()
-            except:
-                pass
-            self.socket = None
+        # Ask the event loop to close the listener and every connection
+        loop = self.loop
+        if loop and self._stop_event:
+            with suppress(RuntimeError):
+                loop.call_soon_threadsafe(self._stop_event.set)
 
         # Wait for thread to finish
         if self.server_thread:
             try:
                 if self.server_thread.is_alive():
-                    self.server_thread.join(timeout=1.0)
+                    self.server_thread.join(timeout=SERVER_STOP_TIMEOUT)
             except:
                 pass
             self.server_thread = None
 
         print("BlenderMCP server stopped")
 
-    def _server_loop(self):
-        """Main server loop in a separate thread"""
+    def _run_event_loop(self):
+        """Run the asyncio event loop that owns every socket, in a separate thread"""
         print("Server thread started")
-        self.socket.settimeout(1.0)  # Timeout to allow for stopping
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        try:
+            loop.run_until_complete(self._serve())
+        except Exception as e:
+            print(f"Error in server loop: {str(e)}")
+            traceback.print_exc()
+        finally:
+            self.loop = None
+            with suppress(Exception):
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+            self._started.set()
+        print("Server thread stopped")
 
-        while self.running:
-            try:
-                # Accept new connection
-                try:
-                    client, address = self.socket.accept()
-                    print(f"Connected to client: {address}")
-
-                    # Handle client in a separate thread
-                    client_thread = threading.Thread(
-                        target=self._handle_client,
-                        args=(client,)
-                    )
-                    client_thread.daemon = True
-                    client_thread.start()
-                except socket.timeout:
-                    # Just check running condition
-                    continue
-                except Exception as e:
-                    print(f"Error accepting connection: {str(e)}")
-                    time.sleep(0.5)
-            except Exception as e:
-                print(f"Error in server loop: {str(e)}")
-                if not self.running:
-                    break
-                time.sleep(0.5)
+    async def _serve(self):
+        self._stop_event = asyncio.Event()
+        listeners = []
+        try:
+            if not self.use_tcp and not self.socket_path:
+                raise ValueError("TCP is disabled and no Unix socket path is set; nothing to listen on")
+            if self.use_tcp:
+                listeners.append(await asyncio.start_server(self._handle_client, self.host, self.port))
+            if self.socket_path:
+                listeners.append(await self._start_unix_listener())
+        except Exception as e:
+            for listener in listeners:
+                listener.close()
+            self._start_error = e
+            self._started.set()
+            return
+        self._started.set()
 
-        print("Server thread stopped")
+        try:
+            await self._stop_event.wait()
+        finally:
+            # Clean shutdown: stop accepting, then close and reap every client
+            for listener in listeners:
+                listener.close()
+            client_tasks = []
+            for conn in list(self.connections):
+                conn.close()
+                if conn.task is not None:
+                    client_tasks.append(conn.task)
+            for task in client_tasks:
+                task.cancel()
+            if client_tasks:
+                await asyncio.gather(*client_tasks, return_exceptions=True)
+            for listener in listeners:
+                with suppress(Exception):
+                    await listener.wait_closed()
+            if self.socket_path:
+                with suppress(OSError):
+                    os.unlink(self.socket_path)
+
+    async def _start_unix_listener(self):
+        """Listen on the Unix domain socket path, replacing a stale socket file.
+
+        A socket file that still accepts connections belongs to another
+        running server (typically a second Blender instance) and is left alone.
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix domain sockets are not supported on this platform")
+        if os.path.exists(self.socket_path):
+            if not stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+                raise FileExistsError(f"{self.socket_path} exists and is not a socket")
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.settimeout(1.0)
+                probe.connect(self.socket_path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Left behind by a server that exited without cleaning up
+                with suppress(FileNotFoundError):
+                    os.unlink(self.socket_path)
+            else:
+                raise OSError(f"Socket {self.socket_path} is in use by another running server")
+            finally:
+                probe.close()
+        return await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
 
-    def _handle_client(self, client):
+    async def _handle_client(self, reader, writer):
         """Handle connected client"""
-        print("Client handler started")
-        client.settimeout(None)  # No timeout
-        buffer = b''
+        address = writer.get_extra_info("peername")
+        conn = MCPConnection(
+            writer, asyncio.get_running_loop(), address,
+            max_frame_size=self.max_frame_size, metrics=self.metrics,
+        )
+
+        if len(self.connections) >= self.max_connections:
+            print(f"Rejecting client {address}: connection limit reached")
+            conn.send({"status": "error", "message": f"Server is at its limit of {self.max_connections} connections"})
+            with suppress(Exception):
+                await writer.drain()
+            conn.close()
+            return
+
+        print(f"Connected to client: {address}")
+        conn.task = asyncio.current_task()
+        self.connections.add(conn)
+        idle_timeout = self.idle_timeout or None
 
         try:
             while self.running:
-                # Receive data
                 try:
-                    data = client.recv(8192)
-                    if not data:
-                        print("Client disconnected")
+                    data = await asyncio.wait_for(reader.read(65536), timeout=idle_timeout)
+                except asyncio.TimeoutError:
+                    print(f"Closing idle client {address}")
+                    break
+                if not data:
+                    print("Client disconnected")
+                    break
+
+                conn.decoder.feed(data)
+                while True:
+                    frame = conn.decoder.next_frame()
+                    if frame is None:
                         break
+                    self._handle_frame(conn, frame)
+                await writer.drain()
+        except FrameError as e:
+            print(f"Protocol error: {str(e)}")
+            with suppress(Exception):
+                conn.send({"status": "error", "message": str(e)})
+                await writer.drain()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Error in client handler: {str(e)}")
+        finally:
+            self.connections.discard(conn)
+            conn.close()
+            # Nobody is waiting for these any more
+            for token in list(conn.requests.values()):
+                token.cancel("abandoned: client disconnected")
+            print("Client handler stopped")
 
-                    buffer += data
-                    try:
-                        # Try to parse command
-                        command = json.loads(buffer.decode('utf-8'))
-                        buffer = b''
+    def _handle_frame(self, conn, frame):
+        """Decode one complete frame and schedule the command it carries"""
+        received_at = time.perf_counter()
+        request_size = len(frame)
+        if conn.awaiting_attachments:
+            command = conn.add_attachment(frame)
+            if command is None:
+                return
+            request_size = conn.request_size
+        else:
+            try:
+                command = conn.decode(frame)
+            except Exception as e:
+                conn.send({"status": "error", "message": f"Invalid {conn.codec.name} message: {str(e)}"})
+                return
+            if not isinstance(command, dict):
+                conn.send({"status": "error", "message": "Command must be a JSON object"})
+                return
 
-                        # Execute command in Blender's main thread
-                        def execute_wrapper():
-                            try:
-                                response = self.execute_command(command)
-                                response_json = json.dumps(response)
-                                try:
-                                    client.sendall(response_json.encode('utf-8'))
-                                except:
-                                    print("Failed to send response - client disconnected")
-                            except Exception as e:
-                                print(f"Error executing command: {str(e)}")
-                                traceback.print_exc()
-                                try:
-                                    error_response = {
-                                        "status": "error",
-                                        "message": str(e)
-                                    }
-                                    client.sendall(json.dumps(error_response).encode('utf-8'))
-                                except:
-                                    pass
-                            return None
-
-                        # Schedule execution in main thread
-                        bpy.app.timers.register(execute_wrapper, first_interval=0.0)
-                    except json.JSONDecodeError:
-                        # Incomplete data, wait for more
-                        pass
-                except Exception as e:
-                    print(f"Error receiving data: {str(e)}")
-                    break
+            # Binary frames listed in the manifest follow this one on the wire
+            if command.get("attachments"):
+                try:
+                    conn.expect_attachments(command, request_size)
+                except ValueError as e:
+                    self._reply(conn, command, {"status": "error", "message": str(e)})
+                return
+
+        metric_name = self._metric_name(command.get("type"))
+        self.metrics.record_request(metric_name, request_size)
+
+        # Protocol negotiation is answered on the socket thread, in the old
+        # framing, so that the very next frame is already read in the new one
+        if command.get("type") == "negotiate_protocol":
+            try:
+                agreed = conn.negotiate(command.get("params", {}))
+            except Exception as e:
+                self._reply(conn, command, {"status": "error", "message": str(e)})
+                return
+            self._reply(conn, command, {"status": "success", "result": agreed})
+            conn.apply(agreed)
+            return
+
+        if command.get("type") == "cancel":
+            self._reply(conn, command, self._cancel_request(conn, command.get("params", {})))
+            return
+
+        try:
+            token = CancelToken(command.get("id"), command.get("deadline_ms"))
+        except (TypeError, ValueError):
+            self._reply(conn, command, {"status": "error", "message": "deadline_ms must be a number"})
+            return
+        request_id = command.get("id")
+        if isinstance(request_id, (str, int)):
+            if request_id in conn.requests:
+                # Replying through _reply would forget the outstanding request's token
+                self.metrics.record_error(metric_name)
+                with suppress(ConnectionError):
+                    conn.send({
+                        "status": "error",
+                        "message": f"Request id {request_id!r} is already in use by an outstanding request",
+                        "id": request_id,
+                    }, metric_name)
+                return
+            conn.requests[request_id] = token
+
+        # Commands that never touch bpy are answered right here
+        handler, spec = self.registry.lookup(command.get("type"))
+        if spec is not None and not spec.main_thread:
+            if token.cancelled:
+                self.metrics.record_cancelled(metric_name)
+                self._reply(conn, command, {"status": "error", "message": token.message, "cancelled": True})
+                return
+            if spec.blocking:
+                self.loop.run_in_executor(None, self._execute_here, conn, command, token)
+            else:
+                self._execute_here(conn, command, token)
+            return
+
+        # Execute command in Blender's main thread
+        def execute_wrapper():
+            self.metrics.record_queue_wait(metric_name, time.perf_counter() - received_at)
+            # Drop work nobody is waiting for before it can block the UI
+            if conn.closed or token.cancelled:
+                self.metrics.record_cancelled(metric_name)
+                if not conn.closed:
+                    self._reply(conn, command, {"status": "error", "message": token.message, "cancelled": True})
+                return None
+
+            token.started = True
+            self._active_token = token
+            self._active_conn = conn
+            try:
+                response = self.execute_command(command)
+            except CommandCancelled as e:
+                self.metrics.record_cancelled(metric_name)
+                response = {"status": "error", "message": str(e), "cancelled": True}
+            except Exception as e:
+                print(f"Error executing command: {str(e)}")
+                traceback.print_exc()
+                response = {
+                    "status": "error",
+                    "message": str(e)
+                }
+            except BaseException as e:
+                # sys.exit() in execute_code, say; the client still gets a reply
+                traceback.print_exc()
+                response = {"status": "error", "message": f"Command raised {type(e).__name__}: {str(e)}"}
+            finally:
+                self._active_token = None
+                self._active_conn = None
+            if isinstance(response.get("result"), ScriptRun):
+                self._continue_script(conn, command, token, metric_name, response["result"])
+            else:
+                self._reply(conn, command, response)
+            return None
+
+        # Schedule execution in main thread, unless this client already has
+        # its share of work waiting
+        try:
+            self.dispatcher.submit(execute_wrapper, client=conn)
+        except QueueFull as e:
+            self._reply(conn, command, {
+                "status": "error",
+                "message": str(e),
+                "busy": True,
+                "retry_after_ms": e.retry_after_ms,
+            })
+
+    def _execute_here(self, conn, command, token):
+        """Run a main_thread=False command on this thread and reply"""
+        self._local.token = token
+        try:
+            response = self.execute_command(command)
+        finally:
+            self._local.token = None
+        self._reply(conn, command, response)
+
+    def _continue_script(self, conn, command, token, metric_name, run):
+        """Run one slice of a generator-style script, then queue the next or reply when it ends.
+
+        Each script waits its turn in the dispatcher like a client of its
+        own, so other clients' commands run between its slices.
+        """
+        if conn.closed or token.cancelled:
+            with suppress(Exception):
+                run.close()
+            self.metrics.record_cancelled(metric_name)
+            if not conn.closed:
+                self._reply(conn, command, {"status": "error", "message": token.message, "cancelled": True})
+            return
+
+        started = time.perf_counter()
+        self._active_token = token
+        self._active_conn = conn
+        try:
+            response = {"status": "success", "result": run.result()} if run.step() else None
+        except CommandCancelled as e:
+            self.metrics.record_cancelled(metric_name)
+            response = {"status": "error", "message": str(e), "cancelled": True}
         except Exception as e:
-            print(f"Error in client handler: {str(e)}")
+            traceback.print_exc()
+            response = {"status": "error", "message": f"Code execution error: {str(e)}"}
+        except BaseException as e:
+            # sys.exit() in the script; it must not take the dispatcher's timer down with it
+            traceback.print_exc()
+            with suppress(Exception):
+                run.close()
+            response = {"status": "error", "message": f"Code execution error: {type(e).__name__}: {str(e)}"}
         finally:
+            self._active_token = None
+            self._active_conn = None
+            self.metrics.record_handler(metric_name, time.perf_counter() - started)
+        if response is not None:
+            self._reply(conn, command, response)
+            return
+
+        if started - run.last_report >= SCRIPT_PROGRESS_INTERVAL:
+            run.last_report = started
+            value = run.progress
             try:
-                client.close()
-            except:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                value = str(value)
+            progress = {"status": "progress", "progress": value, "slices": run.slices}
+            if "id" in command:
+                progress["id"] = command["id"]
+            try:
+                conn.send(progress)
+            except ConnectionError:
                 pass
-            print("Client handler stopped")
+            except Exception as e:
+                print(f"Could not send script progress: {str(e)}")
+        self.dispatcher.submit(lambda: self._continue_script(conn, command, token, metric_name, run), client=run)
+
+    def _cancel_request(self, conn, params):
+        """Cancel one of this connection's outstanding requests by id.
+
+        A queued request is dropped before it runs; a running one stops at
+        its handler's next check_cancelled() call.
+        """
+        request_id = params.get("id")
+        if request_id is None:
+            return {"status": "error", "message": "cancel needs the id of the request to cancel"}
+        token = conn.requests.get(request_id) if isinstance(request_id, (str, int)) else None
+        if token is None:
+            return {"status": "success", "result": {"id": request_id, "found": False}}
+        token.cancel()
+        return {
+            "status": "success",
+            "result": {"id": request_id, "found": True, "state": "running" if token.started else "queued"},
+        }
+
+    def check_cancelled(self):
+        """Raise CommandCancelled if the request being handled was cancelled or is past its deadline.
+
+        Long handlers call this between steps (downloads, imports) so that
+        work nobody is waiting for stops early.
+        """
+        # Handlers answered on the socket thread keep their token in _local
+        token = getattr(self._local, "token", self._active_token)
+        if token is not None:
+            token.check()
+
+    def _metric_name(self, cmd_type):
+        if cmd_type in PROTOCOL_COMMANDS or cmd_type in self.registry.specs:
+            return cmd_type
+        return UNKNOWN_COMMAND
+
+    def _reply(self, conn, command, response):
+        """Send a response, tagged with the request's id when it carried one.
+
+        Commands may be pipelined on one connection and complete in any order,
+        so clients match replies to requests by this id rather than by order.
+        """
+        if "id" in command:
+            response["id"] = command["id"]
+            if isinstance(command["id"], (str, int)) and command.get("type") not in PROTOCOL_COMMANDS:
+                conn.requests.pop(command["id"], None)
+        metric_name = self._metric_name(command.get("type"))
+        if response.get("status") == "error":
+            self.metrics.record_error(metric_name)
+        try:
+            conn.send(response, metric_name)
+        except Exception:
+            print("Failed to send response - client disconnected")
+
+    def refresh_commands(self, scene=None):
+        """Rebuild the command table from the provider toggles of a scene"""
+        if scene is None:
+            scene = bpy.context.scene
+        self.registry.rebuild(enabled_providers(scene))
 
     def execute_command(self, command):
         """Execute a command in the main Blender thread"""
@@ -198,78 +3345,65 @@ class BlenderMCPServer:
         cmd_type = command.get("type")
         params = command.get("params", {})
 
-        # Add a handler for checking PolyHaven status
-        if cmd_type == "get_polyhaven_status":
-            return {"status": "success", "result": self.get_polyhaven_status()}
-
-        # Base handlers that are always available
-        handlers = {
-            "get_scene_info": self.get_scene_info,
-            "get_object_info": self.get_object_info,
-            "get_viewport_screenshot": self.get_viewport_screenshot,
-            "execute_code": self.execute_code,
-            "get_telemetry_consent": self.get_telemetry_consent,
-            "get_polyhaven_status": self.get_polyhaven_status,
-            "get_hyper3d_status": self.get_hyper3d_status,
-            "get_sketchfab_status": self.get_sketchfab_status,
-            "get_hunyuan3d_status": self.get_hunyuan3d_status,
-        }
-
-        # Add Polyhaven handlers only if enabled
-        if bpy.context.scene.blendermcp_use_polyhaven:
-            polyhaven_handlers = {
-                "get_polyhaven_categories": self.get_polyhaven_categories,
-                "search_polyhaven_assets": self.search_polyhaven_assets,
-                "download_polyhaven_asset": self.download_polyhaven_asset,
-                "set_texture": self.set_texture,
-            }
-            handlers.update(polyhaven_handlers)
-
-        # Add Hyper3d handlers only if enabled
-        if bpy.context.scene.blendermcp_use_hyper3d:
-            polyhaven_handlers = {
-                "create_rodin_job": self.create_rodin_job,
-                "poll_rodin_job_status": self.poll_rodin_job_status,
-                "import_generated_asset": self.import_generated_asset,
-            }
-            handlers.update(polyhaven_handlers)
-
-        # Add Sketchfab handlers only if enabled
-        if bpy.context.scene.blendermcp_use_sketchfab:
-            sketchfab_handlers = {
-                "search_sketchfab_models": self.search_sketchfab_models,
-                "get_sketchfab_model_preview": self.get_sketchfab_model_preview,
-                "download_sketchfab_model": self.download_sketchfab_model,
-            }
-            handlers.update(sketchfab_handlers)
-        
-        # Add Hunyuan3d handlers only if enabled
-        if bpy.context.scene.blendermcp_use_hunyuan3d:
-            hunyuan_handlers = {
-                "create_hunyuan_job": self.create_hunyuan_job,
-                "poll_hunyuan_job_status": self.poll_hunyuan_job_status,
-                "import_generated_asset_hunyuan": self.import_generated_asset_hunyuan
-            }
-            handlers.update(hunyuan_handlers)
-
-        handler = handlers.get(cmd_type)
+        handler, spec = self.registry.lookup(cmd_type)
         if handler:
+            started = time.perf_counter()
             try:
                 print(f"Executing handler for {cmd_type}")
-                result = handler(**params)
+                options = command.get("profile")
+                if options:
+                    return self._run_profiled(handler, params, options)
+                if self.profiler is not None and cmd_type not in ("start_profiling", "stop_profiling"):
+                    result = self.profiler.run(handler, params)
+                else:
+                    result = handler(**params)
                 print(f"Handler execution complete")
                 return {"status": "success", "result": result}
+            except CommandCancelled as e:
+                print(f"Handler stopped: {str(e)}")
+                return {"status": "error", "message": str(e), "cancelled": True}
             except Exception as e:
                 print(f"Error in handler: {str(e)}")
                 traceback.print_exc()
                 return {"status": "error", "message": str(e)}
+            finally:
+                self.metrics.record_handler(cmd_type, time.perf_counter() - started)
+        elif cmd_type in self.registry.specs:
+            provider = self.registry.specs[cmd_type].provider
+            return {"status": "error", "message": f"Command {cmd_type} requires the {provider} integration to be enabled"}
         else:
             return {"status": "error", "message": f"Unknown command type: {cmd_type}"}
 
+    def _run_profiled(self, handler, params, options):
+        """Run one handler under its own profiler and attach the report to the response.
+
+        options is true, or a dict with top, sort, memory and output_path.
+        """
+        if not isinstance(options, dict):
+            options = {}
+        sort = options.get("sort", "cumulative")
+        _profile_sort_key(sort)
+        output_path = options.get("output_path")
+
+        profiler = HandlerProfiler(memory=bool(options.get("memory")))
+        try:
+            result = profiler.run(handler, params)
+        finally:
+            report = profiler.report(
+                top=int(options.get("top", DEFAULT_PROFILE_TOP)),
+                sort=sort,
+                output_path=bpy.path.abspath(output_path) if output_path else None,
+            )
+        return {"status": "success", "result": result, "profile": report}
+
 
 
+    @mcp_command()
     def get_scene_info(self):
-        """Get information about the current Blender scene"""
+        """Get information about the current Blender scene
+
+        Lists only the first 10 objects; use query_objects to page through all of them.
+        """
         try:
             print("Getting scene info...")
             # Simplify the scene info to reduce data size
@@ -308,22 +3442,216 @@ class BlenderMCPServer:
         if obj.type != 'MESH':
             raise TypeError("Object must be a mesh")
 
-        # Get the bounding box corners in local space
-        local_bbox_corners = [mathutils.Vector(corner) for corner in obj.bound_box]
+        mins, maxs = world_bounds([obj])
+        return [mins[0].tolist(), maxs[0].tolist()]
 
-        # Convert to world coordinates
-        world_bbox_corners = [obj.matrix_world @ corner for corner in local_bbox_corners]
 
-        # Compute axis-aligned min/max coordinates
-        min_corner = mathutils.Vector(map(min, zip(*world_bbox_corners)))
-        max_corner = mathutils.Vector(map(max, zip(*world_bbox_corners)))
 
-        return [
-            [*min_corner], [*max_corner]
-        ]
+    @mcp_command()
+    def query_objects(self, types=None, collection=None, name=None, fields=None,
+                      cursor=None, limit=DEFAULT_QUERY_LIMIT):
+        """Page through the scene's objects with filters and a field projection
+
+        Parameters:
+        - types: Object type or list of types to keep, e.g. ["MESH", "EMPTY"]
+        - collection: Keep only objects in this collection (or its children)
+        - name: Glob the object name must match, e.g. "Tile.*"
+        - fields: Fields to return per object, from: name, type, location, rotation,
+          scale, dimensions, bounds, materials, polycount, visible, parent, collections
+        - cursor: next_cursor of the previous page; omit for the first page
+        - limit: Objects per page, at most 1000
+
+        Returns the page of objects and next_cursor, which is null on the last page
+        """
+        fields = list(fields) if fields else list(DEFAULT_QUERY_FIELDS)
+        unknown = [field for field in fields if field not in QUERY_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Must be from: {', '.join(QUERY_FIELDS)}")
+        limit = max(1, min(int(limit), MAX_QUERY_LIMIT))
+
+        if isinstance(types, str):
+            types = [types]
+        type_filter = {t.upper() for t in types} if types else None
+        name_filter = re.compile(fnmatch.translate(name)).match if name else None
+        member_names = None
+        if collection:
+            coll = bpy.data.collections.get(collection)
+            if coll is None:
+                raise ValueError(f"Collection not found: {collection}")
+            member_names = {obj.name for obj in coll.all_objects}
+
+        scene = bpy.context.scene
+        self.object_order.refresh(scene)
+        objects = self.object_order.objects
+        start = _resume_index(self.object_order, cursor) if cursor else 0
+
+        matches = []
+        index = start
+        while index < len(objects):
+            obj = objects[index]
+            index += 1
+            if type_filter is not None and obj.type not in type_filter:
+                continue
+            if name_filter is not None and not name_filter(obj.name):
+                continue
+            if member_names is not None and obj.name not in member_names:
+                continue
+            matches.append(obj)
+            if len(matches) >= limit:
+                break
+
+        # World bounds of the whole page in one batch
+        bounds = {}
+        if "bounds" in fields:
+            meshes = [obj for obj in matches if obj.type == "MESH"]
+            mins, maxs = world_bounds(meshes, scene.objects)
+            bounds = {obj.name: [lo, hi] for obj, lo, hi in zip(meshes, mins.tolist(), maxs.tolist())}
+
+        more = len(matches) >= limit and index < len(objects)
+        return {
+            "objects": [self._object_fields(obj, fields, bounds) for obj in matches],
+            "count": len(matches),
+            "next_cursor": _encode_cursor(index, matches[-1].name) if more else None,
+        }
+
+    def _object_fields(self, obj, fields, bounds=None):
+        """Project one object onto the requested query fields"""
+        info = {}
+        for field in fields:
+            if field == "name":
+                info["name"] = obj.name
+            elif field == "type":
+                info["type"] = obj.type
+            elif field == "location":
+                info["location"] = [obj.location.x, obj.location.y, obj.location.z]
+            elif field == "rotation":
+                info["rotation"] = [obj.rotation_euler.x, obj.rotation_euler.y, obj.rotation_euler.z]
+            elif field == "scale":
+                info["scale"] = [obj.scale.x, obj.scale.y, obj.scale.z]
+            elif field == "dimensions":
+                info["dimensions"] = list(obj.dimensions)
+            elif field == "bounds":
+                info["bounds"] = bounds.get(obj.name) if bounds is not None else None
+            elif field == "materials":
+                info["materials"] = [slot.material.name for slot in obj.material_slots if slot.material]
+            elif field == "polycount":
+                info["polycount"] = len(obj.data.polygons) if obj.type == "MESH" and obj.data else 0
+            elif field == "visible":
+                info["visible"] = obj.visible_get()
+            elif field == "parent":
+                info["parent"] = obj.parent.name if obj.parent else None
+            elif field == "collections":
+                info["collections"] = [coll.name for coll in obj.users_collection]
+        return info
+
+    @mcp_command()
+    def get_bounds(self, names=None, include_objects=True):
+        """Get world-space bounding boxes of many objects at once
+
+        Parameters:
+        - names: Object names; omit for every object in the scene
+        - include_objects: Return each object's box, not just the combined one
+
+        Boxes are [[min x, y, z], [max x, y, z]] built from each object's bound_box
+        """
+        if names is None:
+            source = bpy.context.scene.objects
+            objects = list(source)
+            missing = []
+        else:
+            source = bpy.data.objects
+            objects = []
+            missing = []
+            for name in names:
+                obj = source.get(name)
+                if obj is None:
+                    missing.append(name)
+                else:
+                    objects.append(obj)
+
+        mins, maxs = world_bounds(objects, source)
+        result = {
+            "count": len(objects),
+            "combined": combined_bounds(mins, maxs),
+            "missing": missing,
+        }
+        if include_objects:
+            result["objects"] = {
+                obj.name: [lo, hi] for obj, lo, hi in zip(objects, mins.tolist(), maxs.tolist())
+            }
+        return result
+
+    @mcp_command()
+    def raycast(self, origin, direction, max_distance=None):
+        """Cast a ray into the scene and get the first mesh surface it hits
+
+        Parameters:
+        - origin: [x, y, z] start of the ray in world space
+        - direction: [x, y, z] direction of the ray, need not be normalized
+        - max_distance: Ignore surfaces farther than this from the origin
+
+        Hidden objects are hit too. Returns hit false, or the object, world-space
+        location and normal, face index and distance of the hit
+        """
+        self.spatial.refresh()
+        hit = self.spatial.raycast(
+            origin, direction, np.inf if max_distance is None else float(max_distance),
+        )
+        if hit is None:
+            return {"hit": False}
+        row, location, normal, face_index, distance = hit
+        return {
+            "hit": True,
+            "object": self.spatial.names[row],
+            "location": location.tolist(),
+            "normal": normal.tolist(),
+            "face_index": face_index,
+            "distance": distance,
+        }
 
+    @mcp_command()
+    def objects_in_box(self, min_corner, max_corner, contained=False, limit=MAX_QUERY_LIMIT):
+        """Find the objects whose world bounding box meets an axis-aligned box
 
+        Parameters:
+        - min_corner: [x, y, z] lowest corner of the box in world space
+        - max_corner: [x, y, z] highest corner of the box
+        - contained: Only objects whose bounding box lies entirely inside
+        - limit: Maximum number of names to return
+
+        Returns the matching names in scene order and how many matched in total
+        """
+        self.spatial.refresh()
+        rows = self.spatial.in_box(min_corner, max_corner, contained=contained)
+        names = self.spatial.names
+        return {
+            "objects": [names[row] for row in rows[:max(0, int(limit))]],
+            "count": len(rows),
+        }
+
+    @mcp_command()
+    def nearest_object(self, point, max_distance=None):
+        """Find the mesh object whose surface is closest to a point
+
+        Parameters:
+        - point: [x, y, z] in world space
+        - max_distance: Ignore surfaces farther than this
 
+        Returns found false, or the object, the closest surface point and its distance
+        """
+        self.spatial.refresh()
+        nearest = self.spatial.nearest(point, np.inf if max_distance is None else float(max_distance))
+        if nearest is None:
+            return {"found": False}
+        row, location, distance = nearest
+        return {
+            "found": True,
+            "object": self.spatial.names[row],
+            "location": location.tolist(),
+            "distance": distance,
+        }
+
+    @mcp_command()
     def get_object_info(self, name):
         """Get detailed information about a specific object"""
         obj = bpy.data.objects.get(name)
@@ -361,7 +3689,62 @@ class BlenderMCPServer:
 
         return obj_info
 
-    def get_viewport_screenshot(self, max_size=800, filepath=None, format="png"):
+    @mcp_command()
+    def get_mesh_buffers(self, name, attributes=None, evaluated=False, world_space=False):
+        """Get a mesh's vertex positions, normals, UVs and triangles as binary buffers
+
+        Parameters:
+        - name: Object name
+        - attributes: Any of "positions", "normals", "uvs", "triangles"; omit for all
+        - evaluated: Read the mesh with modifiers applied, from the evaluated depsgraph
+        - world_space: Transform positions and normals by the object's world matrix
+
+        Each buffer is {"dtype", "shape", "data"}: little-endian float32 or int32
+        values, row-major. data comes as a binary attachment to clients that
+        negotiated attachments and as base64 otherwise. uvs are per loop, so
+        they come with triangle_loops, the loop of each triangle corner.
+        """
+        obj = bpy.data.objects.get(name)
+        if not obj:
+            raise ValueError(f"Object not found: {name}")
+        attributes = tuple(MESH_BUFFERS if attributes is None else attributes)
+        unknown = [attribute for attribute in attributes if attribute not in MESH_BUFFERS]
+        if unknown:
+            raise ValueError(f"Unknown mesh attributes: {', '.join(unknown)}")
+        matrix = np.array(obj.matrix_world, dtype=float) if world_space else None
+
+        if not evaluated:
+            if obj.type != "MESH":
+                raise ValueError(f"Object is not a mesh: {name}")
+            mesh = obj.data
+            owner = None
+        else:
+            owner = obj.evaluated_get(bpy.context.evaluated_depsgraph_get())
+            mesh = owner.to_mesh()
+            if mesh is None:
+                raise ValueError(f"Object has no geometry: {name}")
+        try:
+            buffers = mesh_buffers(mesh, attributes, matrix)
+            counts = {
+                "vertex_count": len(mesh.vertices),
+                "loop_count": len(mesh.loops),
+                "triangle_count": len(mesh.loop_triangles) if "triangles" in buffers else None,
+            }
+        finally:
+            if owner is not None:
+                owner.to_mesh_clear()
+
+        return {
+            "name": obj.name,
+            "evaluated": evaluated,
+            "space": "world" if world_space else "local",
+            **counts,
+            "buffers": buffers,
+        }
+
+    @mcp_command()
+    def get_viewport_screenshot(self, max_size=800, filepath=None, format="png", return_image=False,
+                                in_memory=False, quality=DEFAULT_CAPTURE_QUALITY):
         """
         Capture a screenshot of the current 3D viewport and save it to the specified path.
 
@@ -369,12 +3752,26 @@ class BlenderMCPServer:
         - max_size: Maximum size in pixels for the largest dimension of the image
         - filepath: Path where to save the screenshot file
         - format: Image format (png, jpg, etc.)
+        - return_image: Also return the encoded image bytes in the reply; filepath
+          becomes optional and a temporary file is used when it is omitted
+        - in_memory: Render the viewport offscreen and encode it without touching
+          disk; the image comes back in the reply and filepath is optional. Shows
+          the 3D view only, without the area's header and toolbars
+        - quality: JPEG/WebP quality for in_memory captures
 
         Returns success/error status
         """
+        if in_memory:
+            return self._capture_viewport(max_size, filepath, format, quality)
+
+        temp_path = None
         try:
             if not filepath:
-                return {"error": "No filepath provided"}
+                if not return_image:
+                    return {"error": "No filepath provided"}
+                with tempfile.NamedTemporaryFile(suffix=f".{format.lower()}", delete=False) as tmp_file:
+                    temp_path = tmp_file.name
+                filepath = temp_path
 
             # Find the active 3D viewport
             area = None
@@ -408,35 +3805,210 @@ class BlenderMCPServer:
             # Cleanup Blender image data
             bpy.data.images.remove(img)
 
-            return {
+            result = {
                 "success": True,
                 "width": width,
                 "height": height,
-                "filepath": filepath
             }
+            if filepath != temp_path:
+                result["filepath"] = filepath
+            if return_image:
+                with open(filepath, "rb") as f:
+                    result["image"] = Attachment(f.read(), f"image/{format.lower()}")
+                result["format"] = format.lower()
+            return result
 
         except Exception as e:
             return {"error": str(e)}
+        finally:
+            if temp_path:
+                with suppress(Exception):
+                    os.unlink(temp_path)
 
-    def execute_code(self, code):
-        """Execute arbitrary Blender Python code"""
-        # This is powerful but potentially dangerous - use with caution
+    def _capture_viewport(self, max_size, filepath, format, quality):
+        """get_viewport_screenshot(in_memory=True): offscreen render, NumPy resize, in-memory encode"""
         try:
-            # Create a local namespace for execution
-            namespace = {"bpy": bpy}
+            area = next((a for a in bpy.context.screen.areas if a.type == 'VIEW_3D'), None)
+            if not area:
+                return {"error": "No 3D viewport found"}
+
+            pixels = box_downscale(self.capture.read(area, bpy.context)[..., :3], max_size)
+            data, content_type = encode_image(pixels, format, quality)
+            height, width = pixels.shape[:2]
+            result = {
+                "success": True,
+                "width": width,
+                "height": height,
+                "format": format.lower(),
+                "image": Attachment(data, content_type),
+            }
+            if filepath:
+                with open(filepath, "wb") as f:
+                    f.write(data)
+                result["filepath"] = filepath
+            return result
+        except Exception as e:
+            return {"error": str(e)}
+
+    @mcp_command()
+    def subscribe_viewport(self, fps=DEFAULT_STREAM_FPS, max_size=DEFAULT_STREAM_MAX_SIZE, format="png",
+                           quality=DEFAULT_CAPTURE_QUALITY, tile_size=DEFAULT_STREAM_TILE_SIZE):
+        """Stream the 3D viewport to this connection until unsubscribe_viewport or disconnect
+
+        Parameters:
+        - fps: Frame rate cap
+        - max_size: Maximum size in pixels for the largest dimension of the frames
+        - format: png, jpeg or webp
+        - quality: JPEG/WebP quality
+        - tile_size: Side of the squares that are resent when they change
+
+        Frames arrive as messages without an id: {"event": "viewport_frame",
+        "subscription", "sequence", "width", "height", "keyframe", "tiles"}, each
+        tile {"x", "y", "width", "height", "image"} placed from the top-left.
+        A keyframe holds one tile covering the whole frame. Nothing is sent while
+        neither the scene nor the view changes.
+        """
+        conn = self._active_conn
+        if conn is None:
+            raise ValueError("subscribe_viewport needs a client connection")
+        fps = float(fps)
+        if not 0 < fps <= MAX_STREAM_FPS:
+            raise ValueError(f"fps must be between 0 and {MAX_STREAM_FPS}")
+        if format.lower() not in CAPTURE_FORMATS:
+            raise ValueError(f"Unsupported image format: {format}")
+        tile_size = int(tile_size)
+        if tile_size < 8:
+            raise ValueError("tile_size must be at least 8")
+        sub = self.streams.subscribe(
+            conn, fps=fps, max_size=int(max_size), format=format.lower(), quality=quality, tile_size=tile_size,
+        )
+        return {"subscription": sub.id, "fps": fps, "max_size": sub.max_size, "format": sub.format}
+
+    @mcp_command()
+    def unsubscribe_viewport(self, subscription):
+        """Stop a viewport stream started by subscribe_viewport on this connection
 
-            # Capture stdout during execution, and return it as result
-            capture_buffer = io.StringIO()
-            with redirect_stdout(capture_buffer):
-                exec(code, namespace)
+        Parameters:
+        - subscription: "subscription" returned by subscribe_viewport
+        """
+        return {"unsubscribed": self.streams.unsubscribe(subscription, self._active_conn)}
 
-            captured_output = capture_buffer.getvalue()
-            return {"executed": True, "result": captured_output}
+    @mcp_command()
+    def execute_code(self, code, session=None, slice_ms=DEFAULT_SCRIPT_SLICE_MS, stream_output=False,
+                     max_output=DEFAULT_MAX_OUTPUT):
+        """Execute arbitrary Blender Python code
+
+        Parameters:
+        - code: Python source; identical source is compiled only once
+        - session: Run in this named namespace, which keeps its variables for
+          later calls with the same session until reset_session. Omit for a
+          fresh namespace
+        - slice_ms: For scripts that yield, main-thread time per turn
+        - stream_output: Send printed output as it is written, in {"status":
+          "output", "output": <text>, "offset": <characters before it>} messages
+          with the request's id, instead of in the reply's "result"
+        - max_output: Characters of output kept or sent; further output is
+          dropped and a truncation marker ends it
+
+        A script with a top-level yield runs in slices: at each yield it may be
+        paused so the UI and other clients get a turn, then resumed. Until it
+        ends, the client receives {"status": "progress", "progress": <last
+        value yielded>} messages with the request's id.
+        """
+        # This is powerful but potentially dangerous - use with caution
+        try:
+            compiled, generator = self.code_cache.compile(code)
+            # Create a local namespace for execution, or reuse the session's
+            state = self.sessions.get(session) if session is not None else None
+            namespace = state.namespace if state is not None else {"bpy": bpy}
+
+            def finish():
+                evicted = self.sessions.finished(state) if state is not None else []
+                extra = {}
+                if capture_buffer.dropped:
+                    extra["truncated"] = capture_buffer.dropped
+                if state is not None:
+                    extra["session"] = session
+                    if evicted:
+                        extra["evicted_sessions"] = evicted
+                return extra
+
+            # Capture stdout during execution, and return or stream it
+            capture_buffer = OutputSink(int(max_output), self._output_emitter() if stream_output else None)
+            if generator:
+                exec(compiled, namespace)
+                run = ScriptRun(namespace.pop(SCRIPT_FUNCTION)(), capture_buffer, finish)
+                run.slice = max(1, float(slice_ms)) / 1000.0
+                return run
+            try:
+                with redirect_stdout(capture_buffer):
+                    exec(compiled, namespace)
+            finally:
+                capture_buffer.flush()
+                extra = finish()
+
+            captured_output = capture_buffer.finish()
+            return {"executed": True, "result": captured_output, **extra}
         except Exception as e:
             raise Exception(f"Code execution error: {str(e)}")
 
+    def _output_emitter(self):
+        """emit() for an OutputSink that streams to the client of the running request"""
+        conn = self._active_conn
+        if conn is None:
+            return None
+        token = self._active_token
+        request_id = token.request_id if token is not None else None
 
+        def emit(chunk, offset):
+            message = {"status": "output", "output": chunk, "offset": offset}
+            if request_id is not None:
+                message["id"] = request_id
+            with suppress(ConnectionError):
+                conn.send(message)
 
+        return emit
+
+    @mcp_command()
+    def reset_session(self, session=None):
+        """Forget the variables of an execute_code session
+
+        Parameters:
+        - session: Session name; omit to reset every session
+        """
+        return {"reset": self.sessions.reset(session)}
+
+    @mcp_command()
+    def list_sessions(self):
+        """List execute_code sessions with their variables and estimated memory, and code cache hits"""
+        return {
+            "sessions": self.sessions.describe(),
+            "memory_limit": self.sessions.memory_limit,
+            "code_cache": self.code_cache.stats(),
+        }
+
+    @mcp_command(main_thread=False, blocking=True)
+    def get_cache_stats(self, verify=False):
+        """Get the size, contents per provider and hit rate of the downloaded asset cache
+
+        Parameters:
+        - verify: Re-hash every cached file, dropping corrupt entries and files no entry uses
+        """
+        return self.assets.stats(verify=verify)
+
+    @mcp_command()
+    def purge_cache(self, provider=None, asset_id=None):
+        """Delete downloaded assets from the cache
+
+        Parameters:
+        - provider: Only this provider's files ("polyhaven" or "sketchfab")
+        - asset_id: Only this asset's files
+        """
+        return self.assets.purge(provider=provider, asset_id=asset_id)
+
+
+
+    @mcp_command(provider="polyhaven")
     def get_polyhaven_categories(self, asset_type):
         """Get categories for a specific asset type from Polyhaven"""
         try:
@@ -451,6 +4023,7 @@ class BlenderMCPServer:
         except Exception as e:
             return {"error": str(e)}
 
+    @mcp_command(provider="polyhaven")
     def search_polyhaven_assets(self, asset_type=None, categories=None):
         """Search for assets from Polyhaven with optional filtering"""
         try:
@@ -482,6 +4055,7 @@ class BlenderMCPServer:
         except Exception as e:
             return {"error": str(e)}
 
+    @mcp_command(provider="polyhaven")
     def download_polyhaven_asset(self, asset_id, asset_type, resolution="1k", file_format=None):
         try:
             # First get the files information
@@ -501,16 +4075,16 @@ class BlenderMCPServer:
                     file_info = files_data["hdri"][resolution][file_format]
                     file_url = file_info["url"]
 
-                    # For HDRIs, we need to save to a temporary file first
-                    # since Blender can't properly load HDR data directly from memory
-                    with tempfile.NamedTemporaryFile(suffix=f".{file_format}", delete=False) as tmp_file:
-                        # Download the file
-                        response = requests.get(file_url, headers=REQ_HEADERS)
-                        if response.status_code != 200:
-                            return {"error": f"Failed to download HDRI: {response.status_code}"}
-
-                        tmp_file.write(response.content)
-                        tmp_path = tmp_file.name
+                    # Blender can't properly load HDR data directly from memory,
+                    # so the image is loaded from the cached file
+                    try:
+                        tmp_path = self.assets.fetch(
+                            file_url, "polyhaven", asset_id, resolution, file_format,
+                            suffix=f".{file_format}", headers=REQ_HEADERS,
+                            size=file_info.get("size"), md5=file_info.get("md5"), check=self.check_cancelled,
+                        )
+                    except (requests.RequestException, ValueError) as e:
+                        return {"error": f"Failed to download HDRI: {str(e)}"}
 
                     try:
                         # Create a new world if none exists
@@ -536,6 +4110,9 @@ class BlenderMCPServer:
                         env_tex = node_tree.nodes.new(type='ShaderNodeTexEnvironment')
                         env_tex.location = (-400, 0)
                         env_tex.image = bpy.data.images.load(tmp_path)
+                        # Pack it like the texture maps, so evicting the cached
+                        # file cannot break the world of a saved .blend
+                        env_tex.image.pack()
 
                         # Use a color space that exists in all Blender versions
                         if file_format.lower() == 'exr':
@@ -569,12 +4146,6 @@ class BlenderMCPServer:
                         # Set as active world
                         bpy.context.scene.world = world
 
-                        # Clean up temporary file
-                        try:
-                            tempfile._cleanup()  # This will clean up all temporary files
-                        except:
-                            pass
-
                         return {
                             "success": True,
                             "message": f"HDRI {asset_id} imported successfully",
@@ -593,45 +4164,43 @@ class BlenderMCPServer:
 
                 try:
                     for map_type in files_data:
+                        self.check_cancelled()
                         if map_type not in ["blend", "gltf"]:  # Skip non-texture files
                             if resolution in files_data[map_type] and file_format in files_data[map_type][resolution]:
                                 file_info = files_data[map_type][resolution][file_format]
                                 file_url = file_info["url"]
 
-                                # Use NamedTemporaryFile like we do for HDRIs
-                                with tempfile.NamedTemporaryFile(suffix=f".{file_format}", delete=False) as tmp_file:
-                                    # Download the file
-                                    response = requests.get(file_url, headers=REQ_HEADERS)
-                                    if response.status_code == 200:
-                                        tmp_file.write(response.content)
-                                        tmp_path = tmp_file.name
-
-                                        # Load image from temporary file
-                                        image = bpy.data.images.load(tmp_path)
-                                        image.name = f"{asset_id}_{map_type}.{file_format}"
-
-                                        # Pack the image into .blend file
-                                        image.pack()
-
-                                        # Set color space based on map type
-                                        if map_type in ['color', 'diffuse', 'albedo']:
-                                            try:
-                                                image.colorspace_settings.name = 'sRGB'
-                                            except:
-                                                pass
-                                        else:
-                                            try:
-                                                image.colorspace_settings.name = 'Non-Color'
-                                            except:
-                                                pass
-
-                                        downloaded_maps[map_type] = image
-
-                                        # Clean up temporary file
-                                        try:
-                                            os.unlink(tmp_path)
-                                        except:
-                                            pass
+                                # Download into the asset cache like we do for HDRIs
+                                try:
+                                    tmp_path = self.assets.fetch(
+                                        file_url, "polyhaven", asset_id, resolution, file_format, map_type,
+                                        suffix=f".{file_format}", headers=REQ_HEADERS,
+                                        size=file_info.get("size"), md5=file_info.get("md5"), check=self.check_cancelled,
+                                    )
+                                except (requests.RequestException, ValueError) as e:
+                                    print(f"Failed to download {map_type} map: {str(e)}")
+                                    continue
+
+                                # Load image from the cached file
+                                image = bpy.data.images.load(tmp_path)
+                                image.name = f"{asset_id}_{map_type}.{file_format}"
+
+                                # Pack the image into .blend file
+                                image.pack()
+
+                                # Set color space based on map type
+                                if map_type in ['color', 'diffuse', 'albedo']:
+                                    try:
+                                        image.colorspace_settings.name = 'sRGB'
+                                    except:
+                                        pass
+                                else:
+                                    try:
+                                        image.colorspace_settings.name = 'Non-Color'
+                                    except:
+                                        pass
+
+                                downloaded_maps[map_type] = image
 
                     if not downloaded_maps:
                         return {"error": f"No texture maps found for the requested resolution and format"}
@@ -734,20 +4303,24 @@ class BlenderMCPServer:
                     main_file_path = ""
 
                     try:
-                        # Download the main model file
+                        # Link the main model file from the asset cache, downloading it if needed
                         main_file_name = file_url.split("/")[-1]
                         main_file_path = os.path.join(temp_dir, main_file_name)
 
-                        response = requests.get(file_url, headers=REQ_HEADERS)
-                        if response.status_code != 200:
-                            return {"error": f"Failed to download model: {response.status_code}"}
-
-                        with open(main_file_path, "wb") as f:
-                            f.write(response.content)
+                        try:
+                            cached_path = self.assets.fetch(
+                                file_url, "polyhaven", asset_id, resolution, file_format, main_file_name,
+                                suffix=osp.splitext(main_file_name)[1], headers=REQ_HEADERS,
+                                size=file_info.get("size"), md5=file_info.get("md5"), check=self.check_cancelled,
+                            )
+                        except (requests.RequestException, ValueError) as e:
+                            return {"error": f"Failed to download model: {str(e)}"}
+                        _link_or_copy(cached_path, main_file_path)
 
                         # Check for included files and download them
                         if "include" in file_info and file_info["include"]:
                             for include_path, include_info in file_info["include"].items():
+                                self.check_cancelled()
                                 # Get the URL for the included file - this is the fix
                                 include_url = include_info["url"]
 
@@ -756,12 +4329,17 @@ class BlenderMCPServer:
                                 os.makedirs(os.path.dirname(include_file_path), exist_ok=True)
 
                                 # Download the included file
-                                include_response = requests.get(include_url, headers=REQ_HEADERS)
-                                if include_response.status_code == 200:
-                                    with open(include_file_path, "wb") as f:
-                                        f.write(include_response.content)
-                                else:
+                                try:
+                                    cached_path = self.assets.fetch(
+                                        include_url, "polyhaven", asset_id, resolution, file_format, include_path,
+                                        suffix=osp.splitext(include_path)[1], headers=REQ_HEADERS,
+                                        size=include_info.get("size"), md5=include_info.get("md5"),
+                                        check=self.check_cancelled,
+                                    )
+                                except (requests.RequestException, ValueError):
                                     print(f"Failed to download included file: {include_path}")
+                                else:
+                                    _link_or_copy(cached_path, include_file_path)
 
                         # Import the model into Blender
                         if file_format == "gltf" or file_format == "glb":
@@ -805,6 +4383,7 @@ class BlenderMCPServer:
         except Exception as e:
             return {"error": f"Failed to download asset: {str(e)}"}
 
+    @mcp_command(provider="polyhaven")
     def set_texture(self, object_name, texture_id):
         """Apply a previously downloaded Polyhaven texture to an object by creating a new material"""
         try:
@@ -1109,6 +4688,165 @@ class BlenderMCPServer:
             traceback.print_exc()
             return {"error": f"Failed to apply texture: {str(e)}"}
 
+    @mcp_command()
+    def batch(self, commands, stop_on_error=False, undo_step=False, undo_message="BlenderMCP batch"):
+        """Execute a list of {type, params} commands in one main-thread slice
+
+        Parameters:
+        - commands: Ordered list of commands, each {"type": ..., "params": {...}}
+        - stop_on_error: Stop at the first command that fails: status "error", or a
+          result carrying an "error" key or "succeed": false
+        - undo_step: Push one undo step named undo_message after the batch. Changes
+          made through bpy.data (as execute_code usually does) are undone together
+          with it; operators that push their own undo steps still add those
+        - undo_message: Name of that undo step
+
+        Returns the per-command responses in order
+        """
+        if not isinstance(commands, list):
+            raise ValueError("commands must be a list of {type, params} objects")
+
+        results = []
+        failed = 0
+        for entry in commands:
+            self.check_cancelled()
+            if not isinstance(entry, dict):
+                response = {"status": "error", "message": "Batch entry must be a {type, params} object"}
+            elif entry.get("type") == "batch":
+                response = {"status": "error", "message": "Nested batch commands are not supported"}
+            else:
+                response = self.execute_command(entry)
+                run = response.get("result")
+                if isinstance(run, ScriptRun):
+                    # A batch is one main-thread slice; scripts run to the end in it
+                    try:
+                        while not run.step(float("inf")):
+                            pass
+                        response = {"status": "success", "result": run.result()}
+                    except Exception as e:
+                        response = {"status": "error", "message": f"Code execution error: {str(e)}"}
+            results.append(response)
+            if _response_failed(response):
+                failed += 1
+                if stop_on_error:
+                    break
+
+        if undo_step:
+            try:
+                bpy.ops.ed.undo_push(message=undo_message)
+            except Exception as e:
+                print(f"Could not push undo step: {str(e)}")
+
+        return {
+            "results": results,
+            "completed": len(results),
+            "failed": failed,
+            "stopped": len(results) < len(commands),
+        }
+
+    @mcp_command(main_thread=False)
+    def list_commands(self, include_disabled=False):
+        """List the available commands with their provider and parameter schema"""
+        return {
+            "enabled_providers": sorted(self.registry.enabled_providers),
+            "commands": self.registry.describe(include_disabled=include_disabled),
+        }
+
+    @mcp_command(main_thread=False)
+    def get_dispatcher_stats(self):
+        """Get queue depth and main-thread wait times of the command dispatcher"""
+        return self.dispatcher.stats()
+
+    @mcp_command()
+    def start_profiling(self, memory=False):
+        """Profile every command handler until stop_profiling is called
+
+        Parameters:
+        - memory: Also trace allocations with tracemalloc (slows Python code down)
+        """
+        if self.profiler is not None:
+            raise ValueError("A profiling session is already running")
+        self.profiler = HandlerProfiler(memory=memory)
+        return {"profiling": True, "memory": memory}
+
+    @mcp_command()
+    def stop_profiling(self, top=DEFAULT_PROFILE_TOP, sort="cumulative", output_path=None):
+        """Stop the profiling session and report its hot functions
+
+        Parameters:
+        - top: Number of functions (and allocation sites) to return
+        - sort: "cumulative", "tottime" or "calls"
+        - output_path: Also write the pstats data to this .prof file
+
+        Returns the hot functions and, with memory tracing, the allocation peak
+        """
+        profiler = self.profiler
+        if profiler is None:
+            raise ValueError("No profiling session is running")
+        report = profiler.report(top=top, sort=sort, output_path=bpy.path.abspath(output_path) if output_path else None)
+        self.profiler = None
+        report["duration_s"] = time.time() - profiler.started_at
+        return report
+
+    @mcp_command(main_thread=False)
+    def get_changes_since(self, version=None):
+        """Get the datablocks added, removed or modified since a journal version
+
+        Parameters:
+        - version: "version" token from the previous call; omit to just get the current version
+
+        Returns the net change per datablock and the new version token. When resync
+        is true the journal no longer covers that version (or it comes from an
+        earlier server session): rescan the scene instead.
+        """
+        epoch = None
+        if version is not None:
+            epoch, _, counter = str(version).rpartition(":")
+            try:
+                version = int(counter)
+            except ValueError:
+                raise ValueError(f"Not a journal version token: {version!r}")
+        delta = self.journal.since(version, epoch=epoch)
+        delta["version"] = self.journal.token(delta["version"])
+        for change in delta["changes"]:
+            change["version"] = self.journal.token(change["version"])
+        return delta
+
+    @mcp_command(main_thread=False)
+    def get_server_stats(self, reset=False, prometheus_path=None):
+        """Get per-command queue wait, handler and serialization times and payload sizes
+
+        Parameters:
+        - reset: Clear the histograms after reading them
+        - prometheus_path: Also write the metrics to this file in Prometheus text format
+
+        Times are in milliseconds, sizes in bytes; percentiles are bucket upper bounds
+        """
+        dispatcher = self.dispatcher.stats()
+        result = {
+            "uptime_s": time.time() - self.metrics.started_at,
+            "connections": len(self.connections),
+            "dispatcher": dispatcher,
+            "commands": self.metrics.summary(),
+        }
+        if prometheus_path:
+            text = self.metrics.to_prometheus({
+                "connections": len(self.connections),
+                "dispatch_queue_depth": dispatcher["queue_depth"],
+                "dispatch_budget_overruns": dispatcher["budget_overruns"],
+            })
+            # Write then rename so a scraper never reads a half-written file
+            path = bpy.path.abspath(prometheus_path)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            result["prometheus_path"] = path
+        if reset:
+            self.metrics.reset()
+        return result
+
+    @mcp_command()
     def get_telemetry_consent(self):
         """Get the current telemetry consent status"""
         try:
@@ -1124,6 +4862,7 @@ class BlenderMCPServer:
             consent = True
         return {"consent": consent}
 
+    @mcp_command()
     def get_polyhaven_status(self):
         """Get the current status of PolyHaven integration"""
         enabled = bpy.context.scene.blendermcp_use_polyhaven
@@ -1139,6 +4878,7 @@ class BlenderMCPServer:
         }
 
     #region Hyper3D
+    @mcp_command()
     def get_hyper3d_status(self):
         """Get the current status of Hyper3D Rodin integration"""
         enabled = bpy.context.scene.blendermcp_use_hyper3d
@@ -1168,6 +4908,11 @@ class BlenderMCPServer:
                             3. Restart the connection to Claude"""
             }
 
+    @mcp_command(provider="hyper3d", params={
+        "text_prompt": {"type": "string", "required": False},
+        "images": {"type": "array", "required": False, "attachment": True},
+        "bbox_condition": {"type": "any", "required": False},
+    })
     def create_rodin_job(self, *args, **kwargs):
         match bpy.context.scene.blendermcp_hyper3d_mode:
             case "MAIN_SITE":
@@ -1237,6 +4982,10 @@ class BlenderMCPServer:
         except Exception as e:
             return {"error": str(e)}
 
+    @mcp_command(provider="hyper3d", params={
+        "subscription_key": {"type": "string", "required": False, "mode": "MAIN_SITE"},
+        "request_id": {"type": "string", "required": False, "mode": "FAL_AI"},
+    })
     def poll_rodin_job_status(self, *args, **kwargs):
         match bpy.context.scene.blendermcp_hyper3d_mode:
             case "MAIN_SITE":
@@ -1340,6 +5089,11 @@ class BlenderMCPServer:
 
         return mesh_obj
 
+    @mcp_command(provider="hyper3d", params={
+        "task_uuid": {"type": "string", "required": False, "mode": "MAIN_SITE"},
+        "request_id": {"type": "string", "required": False, "mode": "FAL_AI"},
+        "name": {"type": "string", "required": True},
+    })
     def import_generated_asset(self, *args, **kwargs):
         match bpy.context.scene.blendermcp_hyper3d_mode:
             case "MAIN_SITE":
@@ -1377,6 +5131,7 @@ class BlenderMCPServer:
 
                     # Write the content to the temporary file
                     for chunk in response.iter_content(chunk_size=8192):
+                        self.check_cancelled()
                         temp_file.write(chunk)
 
                     # Close the file
@@ -1439,6 +5194,7 @@ class BlenderMCPServer:
 
             # Write the content to the temporary file
             for chunk in response.iter_content(chunk_size=8192):
+                self.check_cancelled()
                 temp_file.write(chunk)
 
             # Close the file
@@ -1475,6 +5231,7 @@ class BlenderMCPServer:
     #endregion
  
     #region Sketchfab API
+    @mcp_command()
     def get_sketchfab_status(self):
         """Get the current status of Sketchfab integration"""
         enabled = bpy.context.scene.blendermcp_use_sketchfab
@@ -1537,6 +5294,7 @@ class BlenderMCPServer:
                             4. Restart the connection to Claude"""
             }
 
+    @mcp_command(provider="sketchfab")
     def search_sketchfab_models(self, query, categories=None, count=20, downloadable=True):
         """Search for models on Sketchfab based on query and optional filters"""
         try:
@@ -1599,11 +5357,10 @@ class BlenderMCPServer:
             traceback.print_exc()
             return {"error": str(e)}
 
+    @mcp_command(provider="sketchfab")
     def get_sketchfab_model_preview(self, uid):
         """Get thumbnail preview image of a Sketchfab model by its UID"""
         try:
-            import base64
-            
             api_key = bpy.context.scene.blendermcp_sketchfab_api_key
             if not api_key:
                 return {"error": "Sketchfab API key is not configured"}
@@ -1653,15 +5410,15 @@ class BlenderMCPServer:
             if img_response.status_code != 200:
                 return {"error": f"Failed to download thumbnail: {img_response.status_code}"}
             
-            # Encode image as base64
-            image_data = base64.b64encode(img_response.content).decode('ascii')
-            
             # Determine format from content type or URL
             content_type = img_response.headers.get("Content-Type", "")
             if "png" in content_type or thumbnail_url.endswith(".png"):
                 img_format = "png"
             else:
                 img_format = "jpeg"
+
+            # Sent as a binary frame, or base64 for clients without attachments
+            image_data = Attachment(img_response.content, f"image/{img_format}")
             
             # Get additional model info for context
             model_name = data.get("name", "Unknown")
@@ -1685,6 +5442,7 @@ class BlenderMCPServer:
             traceback.print_exc()
             return {"error": f"Failed to get model preview: {str(e)}"}
 
+    @mcp_command(provider="sketchfab")
     def download_sketchfab_model(self, uid, normalize_size=False, target_size=1.0):
         """Download a model from Sketchfab by its UID
         
@@ -1733,18 +5491,18 @@ class BlenderMCPServer:
             if not download_url:
                 return {"error": "No download URL available for this model. Make sure the model is downloadable and you have access."}
 
-            # Download the model (already has timeout)
-            model_response = requests.get(download_url, timeout=60)  # 60 second timeout
-
-            if model_response.status_code != 200:
-                return {"error": f"Model download failed with status code {model_response.status_code}"}
+            # Download the model into the asset cache (already has timeout)
+            try:
+                zip_file_path = self.assets.fetch(
+                    download_url, "sketchfab", uid, file_format="gltf",
+                    suffix=".zip", timeout=60, check=self.check_cancelled, validate=zipfile.is_zipfile,
+                )
+            except (requests.RequestException, ValueError) as e:
+                return {"error": f"Model download failed: {str(e)}"}
+            self.check_cancelled()
 
-            # Save to temporary file
+            # Extract into a temporary directory; the zip stays in the cache
             temp_dir = tempfile.mkdtemp()
-            zip_file_path = os.path.join(temp_dir, f"{uid}.zip")
-
-            with open(zip_file_path, "wb") as f:
-                f.write(model_response.content)
 
             # Extract the zip file with enhanced security
             with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
@@ -1817,26 +5575,10 @@ class BlenderMCPServer:
             
             if all_meshes:
                 # Calculate combined world bounding box for all meshes
-                all_min = mathutils.Vector((float('inf'), float('inf'), float('inf')))
-                all_max = mathutils.Vector((float('-inf'), float('-inf'), float('-inf')))
-                
-                for mesh_obj in all_meshes:
-                    # Get world-space bounding box corners
-                    for corner in mesh_obj.bound_box:
-                        world_corner = mesh_obj.matrix_world @ mathutils.Vector(corner)
-                        all_min.x = min(all_min.x, world_corner.x)
-                        all_min.y = min(all_min.y, world_corner.y)
-                        all_min.z = min(all_min.z, world_corner.z)
-                        all_max.x = max(all_max.x, world_corner.x)
-                        all_max.y = max(all_max.y, world_corner.y)
-                        all_max.z = max(all_max.z, world_corner.z)
-                
+                all_min, all_max = combined_bounds(*world_bounds(all_meshes, bpy.data.objects))
+
                 # Calculate dimensions
-                dimensions = [
-                    all_max.x - all_min.x,
-                    all_max.y - all_min.y,
-                    all_max.z - all_min.z
-                ]
+                dimensions = [hi - lo for lo, hi in zip(all_min, all_max)]
                 max_dimension = max(dimensions)
                 
                 # Apply normalization if requested
@@ -1858,26 +5600,10 @@ class BlenderMCPServer:
                     bpy.context.view_layer.update()
                     
                     # Recalculate bounding box after scaling
-                    all_min = mathutils.Vector((float('inf'), float('inf'), float('inf')))
-                    all_max = mathutils.Vector((float('-inf'), float('-inf'), float('-inf')))
-                    
-                    for mesh_obj in all_meshes:
-                        for corner in mesh_obj.bound_box:
-                            world_corner = mesh_obj.matrix_world @ mathutils.Vector(corner)
-                            all_min.x = min(all_min.x, world_corner.x)
-                            all_min.y = min(all_min.y, world_corner.y)
-                            all_min.z = min(all_min.z, world_corner.z)
-                            all_max.x = max(all_max.x, world_corner.x)
-                            all_max.y = max(all_max.y, world_corner.y)
-                            all_max.z = max(all_max.z, world_corner.z)
-                    
-                    dimensions = [
-                        all_max.x - all_min.x,
-                        all_max.y - all_min.y,
-                        all_max.z - all_min.z
-                    ]
-                
-                world_bounding_box = [[all_min.x, all_min.y, all_min.z], [all_max.x, all_max.y, all_max.z]]
+                    all_min, all_max = combined_bounds(*world_bounds(all_meshes, bpy.data.objects))
+                    dimensions = [hi - lo for lo, hi in zip(all_min, all_max)]
+
+                world_bounding_box = [all_min, all_max]
             else:
                 world_bounding_box = None
                 dimensions = None
@@ -1910,6 +5636,7 @@ class BlenderMCPServer:
     #endregion
 
     #region Hunyuan3D
+    @mcp_command()
     def get_hunyuan3d_status(self):
         """Get the current status of Hunyuan3D integration"""
         enabled = bpy.context.scene.blendermcp_use_hunyuan3d
@@ -2037,6 +5764,10 @@ class BlenderMCPServer:
 
         return headers, endpoint
 
+    @mcp_command(provider="hunyuan3d", params={
+        "text_prompt": {"type": "string", "required": False},
+        "image": {"type": "string", "required": False, "attachment": True},
+    })
     def create_hunyuan_job(self, *args, **kwargs):
         match bpy.context.scene.blendermcp_hunyuan3d_mode:
             case "OFFICIAL_API":
@@ -2088,7 +5819,10 @@ class BlenderMCPServer:
 
             # Handling image
             if image:
-                if re.match(r'^https?://', image, re.IGNORECASE) is not None:
+                if isinstance(image, (bytes, bytearray)):
+                    # Raw bytes sent as an attachment
+                    data["ImageBase64"] = base64.b64encode(image).decode("ascii")
+                elif re.match(r'^https?://', image, re.IGNORECASE) is not None:
                     data["ImageUrl"] = image
                 else:
                     try:
@@ -2147,7 +5881,10 @@ class BlenderMCPServer:
 
             # Handling image
             if image:
-                if re.match(r'^https?://', image, re.IGNORECASE) is not None:
+                if isinstance(image, (bytes, bytearray)):
+                    # Raw bytes sent as an attachment
+                    data["image"] = base64.b64encode(image).decode("ascii")
+                elif re.match(r'^https?://', image, re.IGNORECASE) is not None:
                     try:
                         resImg = requests.get(image)
                         resImg.raise_for_status()
@@ -2179,13 +5916,13 @@ class BlenderMCPServer:
                 temp_file.write(response.content)
                 temp_file_name = temp_file.name
 
-            # Import the GLB file in the main thread
+            # Import the GLB file in the main thread, after this reply is sent
             def import_handler():
                 bpy.ops.import_scene.gltf(filepath=temp_file_name)
                 os.unlink(temp_file.name)
                 return None
             
-            bpy.app.timers.register(import_handler)
+            self.dispatcher.submit(import_handler)
 
             return {
                 "status": "DONE",
@@ -2196,6 +5933,9 @@ class BlenderMCPServer:
             return {"error": str(e)}
         
     
+    @mcp_command(provider="hunyuan3d", params={
+        "job_id": {"type": "string", "required": True},
+    })
     def poll_hunyuan_job_status(self, *args, **kwargs):
         return self.poll_hunyuan_job_status_ai(*args, **kwargs)
     
@@ -2243,6 +5983,10 @@ class BlenderMCPServer:
         except Exception as e:
             return {"error": str(e)}
 
+    @mcp_command(provider="hunyuan3d", params={
+        "name": {"type": "string", "required": True},
+        "zip_file_url": {"type": "string", "required": True},
+    })
     def import_generated_asset_hunyuan(self, *args, **kwargs):
         return self.import_generated_asset_hunyuan_ai(*args, **kwargs)
             
@@ -2266,6 +6010,7 @@ class BlenderMCPServer:
             zip_response.raise_for_status()
             with open(zip_file_path, "wb") as f:
                 for chunk in zip_response.iter_content(chunk_size=8192):
+                    self.check_cancelled()
                     f.write(chunk)
 
             # Unzip the ZIP
@@ -2330,9 +6075,79 @@ class BLENDERMCP_AddonPreferences(bpy.types.AddonPreferences):
         default=True
     )
 
+    max_frame_size_mb: IntProperty(
+        name="Max Message Size (MB)",
+        description="Largest single message a client may send to the server",
+        default=DEFAULT_MAX_FRAME_SIZE // (1024 * 1024),
+        min=1,
+        max=1024
+    )
+
+    dispatch_budget_ms: IntProperty(
+        name="Dispatch Budget (ms)",
+        description="Main-thread time spent running queued commands before yielding to the UI",
+        default=DEFAULT_DISPATCH_BUDGET_MS,
+        min=1,
+        max=100
+    )
+
+    max_connections: IntProperty(
+        name="Max Connections",
+        description="Maximum number of clients connected at the same time",
+        default=DEFAULT_MAX_CONNECTIONS,
+        min=1,
+        max=1024
+    )
+
+    idle_timeout: IntProperty(
+        name="Idle Timeout (s)",
+        description="Disconnect clients that send nothing for this long (0 = never)",
+        default=DEFAULT_IDLE_TIMEOUT,
+        min=0,
+        max=86400
+    )
+
+    max_queued_per_client: IntProperty(
+        name="Max Queued per Client",
+        description="Commands one client may have waiting for the main thread before it is told to retry (0 = unlimited)",
+        default=DEFAULT_MAX_QUEUED_PER_CLIENT,
+        min=0,
+        max=100000
+    )
+
+    asset_cache_dir: StringProperty(
+        name="Asset Cache Folder",
+        description="Where downloaded assets are kept for later imports (empty = Blender's user data folder)",
+        subtype='DIR_PATH',
+        default=""
+    )
+
+    asset_cache_size_mb: IntProperty(
+        name="Asset Cache Size (MB)",
+        description="Least recently used downloads are deleted once the cache grows past this",
+        default=DEFAULT_CACHE_MAX_BYTES // (1024 * 1024),
+        min=1,
+        max=1024 * 1024
+    )
+
     def draw(self, context):
         layout = self.layout
-        
+
+        # Server section
+        layout.label(text="Server:", icon='NETWORK_DRIVE')
+        box = layout.box()
+        box.prop(self, "max_frame_size_mb")
+        box.prop(self, "dispatch_budget_ms")
+        box.prop(self, "max_connections")
+        box.prop(self, "idle_timeout")
+        box.prop(self, "max_queued_per_client")
+
+        # Asset cache section
+        layout.label(text="Asset Cache:", icon='FILE_CACHE')
+        box = layout.box()
+        box.prop(self, "asset_cache_dir")
+        box.prop(self, "asset_cache_size_mb")
+
         # Telemetry section
         layout.label(text="Telemetry & Privacy:", icon='PREFERENCES')
         
@@ -2355,6 +6170,47 @@ class BLENDERMCP_AddonPreferences(bpy.types.AddonPreferences):
         row = box.row()
         row.operator("blendermcp.open_terms", text="View Terms and Conditions", icon='TEXT')
 
+def get_addon_preferences():
+    """Return this addon's preferences, or None when they are not available"""
+    try:
+        addon = bpy.context.preferences.addons.get(__name__)
+    except AttributeError:
+        return None
+    return addon.preferences if addon else None
+
+def _on_provider_toggle(self, context):
+    """Property update callback: refresh the running server's command table"""
+    server = getattr(bpy.types, "blendermcp_server", None)
+    if server:
+        server.refresh_commands(self)
+
+@persistent
+def _on_load_post(*args):
+    # Toggles are stored per scene, so a newly loaded file may change them
+    server = getattr(bpy.types, "blendermcp_server", None)
+    if server:
+        server.refresh_commands()
+        server.journal.reset()
+        # Session variables may point at datablocks of the old file
+        server.sessions.reset()
+
+@persistent
+def _on_depsgraph_update(scene, depsgraph=None):
+    server = getattr(bpy.types, "blendermcp_server", None)
+    if server and server.running and depsgraph is not None:
+        try:
+            server.journal.on_depsgraph_update(depsgraph)
+        except Exception as e:
+            print(f"Error recording scene changes: {str(e)}")
+
+@persistent
+def _on_undo_redo(*args):
+    server = getattr(bpy.types, "blendermcp_server", None)
+    if server and server.running:
+        server.journal.on_undo_redo()
+        server.spatial.invalidate()
+        server.object_order.invalidate()
+
 # Blender UI Panel
 class BLENDERMCP_PT_Panel(bpy.types.Panel):
     bl_label = "Blender MCP"
@@ -2368,6 +6224,9 @@ class BLENDERMCP_PT_Panel(bpy.types.Panel):
         scene = context.scene
 
         layout.prop(scene, "blendermcp_port")
+        layout.prop(scene, "blendermcp_socket_path", text="Unix Socket")
+        if scene.blendermcp_socket_path:
+            layout.prop(scene, "blendermcp_use_tcp", text="Also listen on TCP port")
         layout.prop(scene, "blendermcp_use_polyhaven", text="Use assets from Poly Haven")
 
         layout.prop(scene, "blendermcp_use_hyper3d", text="Use Hyper3D Rodin 3D model generation")
@@ -2397,7 +6256,10 @@ class BLENDERMCP_PT_Panel(bpy.types.Panel):
             layout.operator("blendermcp.start_server", text="Connect to MCP server")
         else:
             layout.operator("blendermcp.stop_server", text="Disconnect from MCP server")
-            layout.label(text=f"Running on port {scene.blendermcp_port}")
+            if scene.blendermcp_use_tcp or not scene.blendermcp_socket_path:
+                layout.label(text=f"Running on port {scene.blendermcp_port}")
+            if scene.blendermcp_socket_path:
+                layout.label(text=f"Listening on {scene.blendermcp_socket_path}")
 
 # Operator to set Hyper3D API Key
 class BLENDERMCP_OT_SetFreeTrialHyper3DAPIKey(bpy.types.Operator):
@@ -2421,7 +6283,22 @@ class BLENDERMCP_OT_StartServer(bpy.types.Operator):
 
         # Create a new server instance
         if not hasattr(bpy.types, "blendermcp_server") or not bpy.types.blendermcp_server:
-            bpy.types.blendermcp_server = BlenderMCPServer(port=scene.blendermcp_port)
+            prefs = get_addon_preferences()
+            server_options = {}
+            if prefs:
+                server_options["max_frame_size"] = prefs.max_frame_size_mb * 1024 * 1024
+                server_options["dispatch_budget_ms"] = prefs.dispatch_budget_ms
+                server_options["max_connections"] = prefs.max_connections
+                server_options["idle_timeout"] = prefs.idle_timeout
+                server_options["max_queued_per_client"] = prefs.max_queued_per_client
+                server_options["cache_dir"] = bpy.path.abspath(prefs.asset_cache_dir) if prefs.asset_cache_dir else None
+                server_options["cache_max_bytes"] = prefs.asset_cache_size_mb * 1024 * 1024
+            bpy.types.blendermcp_server = BlenderMCPServer(
+                port=scene.blendermcp_port,
+                socket_path=bpy.path.abspath(scene.blendermcp_socket_path) if scene.blendermcp_socket_path else None,
+                use_tcp=scene.blendermcp_use_tcp or not scene.blendermcp_socket_path,
+                **server_options
+            )
 
         # Start the server
         bpy.types.blendermcp_server.start()
@@ -2475,6 +6352,19 @@ def register():
         max=65535
     )
 
+    bpy.types.Scene.blendermcp_socket_path = bpy.props.StringProperty(
+        name="Unix Socket Path",
+        subtype="FILE_PATH",
+        description="Also listen on this Unix domain socket (same-host clients, Linux/macOS). Leave empty for TCP only",
+        default=""
+    )
+
+    bpy.types.Scene.blendermcp_use_tcp = bpy.props.BoolProperty(
+        name="Use TCP",
+        description="Listen on the TCP port as well as the Unix socket. Turn off to run several Blender instances without port conflicts",
+        default=True
+    )
+
     bpy.types.Scene.blendermcp_server_running = bpy.props.BoolProperty(
         name="Server Running",
         default=False
@@ -2483,13 +6373,15 @@ def register():
     bpy.types.Scene.blendermcp_use_polyhaven = bpy.props.BoolProperty(
         name="Use Poly Haven",
         description="Enable Poly Haven asset integration",
-        default=False
+        default=False,
+        update=_on_provider_toggle
     )
 
     bpy.types.Scene.blendermcp_use_hyper3d = bpy.props.BoolProperty(
         name="Use Hyper3D Rodin",
         description="Enable Hyper3D Rodin generatino integration",
-        default=False
+        default=False,
+        update=_on_provider_toggle
     )
 
     bpy.types.Scene.blendermcp_hyper3d_mode = bpy.props.EnumProperty(
@@ -2512,7 +6404,8 @@ def register():
     bpy.types.Scene.blendermcp_use_hunyuan3d = bpy.props.BoolProperty(
         name="Use Hunyuan 3D",
         description="Enable Hunyuan asset integration",
-        default=False
+        default=False,
+        update=_on_provider_toggle
     )
 
     bpy.types.Scene.blendermcp_hunyuan3d_mode = bpy.props.EnumProperty(
@@ -2577,7 +6470,8 @@ def register():
     bpy.types.Scene.blendermcp_use_sketchfab = bpy.props.BoolProperty(
         name="Use Sketchfab",
         description="Enable Sketchfab asset integration",
-        default=False
+        default=False,
+        update=_on_provider_toggle
     )
 
     bpy.types.Scene.blendermcp_sketchfab_api_key = bpy.props.StringProperty(
@@ -2596,6 +6490,11 @@ def register():
     bpy.utils.register_class(BLENDERMCP_OT_StopServer)
     bpy.utils.register_class(BLENDERMCP_OT_OpenTerms)
 
+    bpy.app.handlers.load_post.append(_on_load_post)
+    bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update)
+    bpy.app.handlers.undo_post.append(_on_undo_redo)
+    bpy.app.handlers.redo_post.append(_on_undo_redo)
+
     print("BlenderMCP addon registered")
 
 def unregister():
@@ -2604,6 +6503,14 @@ def unregister():
         bpy.types.blendermcp_server.stop()
         del bpy.types.blendermcp_server
 
+    if _on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_on_load_post)
+    if _on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_on_depsgraph_update)
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if _on_undo_redo in handlers:
+            handlers.remove(_on_undo_redo)
+
     bpy.utils.unregister_class(BLENDERMCP_PT_Panel)
     bpy.utils.unregister_class(BLENDERMCP_OT_SetFreeTrialHyper3DAPIKey)
     bpy.utils.unregister_class(BLENDERMCP_OT_StartServer)
@@ -2612,6 +6519,8 @@ def unregister():
     bpy.utils.unregister_class(BLENDERMCP_AddonPreferences)
 
     del bpy.types.Scene.blendermcp_port
+    del bpy.types.Scene.blendermcp_socket_path
+    del bpy.types.Scene.blendermcp_use_tcp
     del bpy.types.Scene.blendermcp_server_running
     del bpy.types.Scene.blendermcp_use_polyhaven
     del bpy.types.Scene.blendermcp_use_hyper3d
@@ -0,0 +1,123 @@
+"""
+Repeat asset downloads: a fresh temp file every time vs the AssetCache.
+
+Serves a `--size-mb` file from a local HTTP server throttled to
+`--bandwidth-mbps`, standing in for Poly Haven or Sketchfab, then times:
+- legacy: requests.get into a NamedTemporaryFile, as the importers used to;
+- cache miss: the first AssetCache.fetch, which streams, hashes and stores it;
+- cache hit: every later fetch of the same key, a stat and an index write.
+
+Run from the repository root:
+
+    python Blender/benchmarks/bench_asset_cache.py [--size-mb 100] [--bandwidth-mbps 200] [--repeat 3]
+"""
+from __future__ import annotations
+
+import argparse
+import functools
+import hashlib
+import http.server
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+import requests
+
+from harness import addon
+
+THROTTLE_CHUNK = 64 * 1024
+
+
+class ThrottledHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves files no faster than bytes_per_second"""
+
+    bytes_per_second = 0.0
+
+    def copyfile(self, source, outputfile):
+        start = time.perf_counter()
+        sent = 0
+        while chunk := source.read(THROTTLE_CHUNK):
+            outputfile.write(chunk)
+            sent += len(chunk)
+            ahead = sent / self.bytes_per_second - (time.perf_counter() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    def log_message(self, *args):
+        pass
+
+
+def legacy_download(url: str) -> str:
+    with tempfile.NamedTemporaryFile(suffix=".hdr", delete=False) as tmp_file:
+        tmp_file.write(requests.get(url).content)
+    return tmp_file.name
+
+
+def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=100, help="size of the served asset")
+    parser.add_argument("--bandwidth-mbps", type=float, default=200.0, help="simulated download speed in Mbit/s")
+    parser.add_argument("--repeat", type=int, default=3, help="iterations per measurement (median is reported)")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="blendermcp_bench_")
+    try:
+        web = os.path.join(root, "web")
+        os.makedirs(web)
+        payload = os.urandom(args.size_mb * 1024 * 1024)
+        with open(os.path.join(web, "asset.hdr"), "wb") as f:
+            f.write(payload)
+        md5 = hashlib.md5(payload).hexdigest()
+
+        ThrottledHandler.bytes_per_second = args.bandwidth_mbps * 1e6 / 8
+        httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(ThrottledHandler, directory=web))
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{httpd.server_port}/asset.hdr"
+
+        def legacy() -> None:
+            os.unlink(legacy_download(url))
+
+        def miss() -> None:
+            cache = addon.AssetCache(os.path.join(root, f"cache_{time.perf_counter_ns()}"))
+            cache.fetch(url, "polyhaven", "asset", "4k", "hdr", suffix=".hdr", size=len(payload), md5=md5)
+
+        cache = addon.AssetCache(os.path.join(root, "cache"))
+        path = cache.fetch(url, "polyhaven", "asset", "4k", "hdr", suffix=".hdr", size=len(payload), md5=md5)
+        with open(path, "rb") as f:
+            assert f.read() == payload
+
+        legacy_ms = timed(legacy, args.repeat)
+        miss_ms = timed(miss, args.repeat)
+        hit_ms = timed(
+            lambda: cache.fetch(url, "polyhaven", "asset", "4k", "hdr", suffix=".hdr", size=len(payload), md5=md5),
+            args.repeat,
+        )
+        assert cache.hits == args.repeat
+        httpd.shutdown()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(f"{args.size_mb} MB asset at {args.bandwidth_mbps:g} Mbit/s (median of {args.repeat})")
+    print(f"{'download':<30}{'ms':>12}{'speedup':>10}")
+    for label, ms in (
+        ("legacy temp file", legacy_ms),
+        ("cache miss (hash + verify)", miss_ms),
+        ("cache hit", hit_ms),
+    ):
+        print(f"{label:<30}{ms:>12.1f}{legacy_ms / ms:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
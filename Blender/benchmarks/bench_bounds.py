@@ -0,0 +1,88 @@
+"""
+World bounds of many objects: the old per-object Vector loop vs world_bounds().
+
+Compares, for `--objects` randomly placed meshes:
+- legacy: 8 mathutils Vectors per object transformed and reduced in Python,
+  as _get_aabb and the Sketchfab import used to do;
+- per-object read: world_bounds() without a source collection, so matrices
+  and bound boxes are read object by object, then transformed in one batch;
+- bulk read: world_bounds() with scene.objects as the source, one
+  foreach_get for all matrices and one for all bound boxes.
+
+Against fake_bpy the property reads are Python too, so the read columns
+exaggerate their cost compared to Blender; the batched math column is the
+same NumPy code that runs inside Blender.
+
+Run from the repository root:
+
+    python Blender/benchmarks/bench_bounds.py [--objects 10000] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from fake_bpy import populate
+from harness import addon, bpy
+
+import mathutils
+
+
+def legacy_bounds(objects: list) -> list:
+    boxes = []
+    for obj in objects:
+        corners = [obj.matrix_world @ mathutils.Vector(corner) for corner in obj.bound_box]
+        boxes.append([list(map(min, zip(*corners))), list(map(max, zip(*corners)))])
+    return boxes
+
+
+def timed(fn, repeat: int) -> tuple[float, object]:
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000.0, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=10000, help="mesh objects in the scene")
+    parser.add_argument("--repeat", type=int, default=5, help="iterations per measurement (median is reported)")
+    args = parser.parse_args()
+
+    populate(args.objects)
+    source = bpy.context.scene.objects
+    objects = list(source)
+
+    legacy_ms, legacy = timed(lambda: legacy_bounds(objects), args.repeat)
+    per_object_ms, (mins, maxs) = timed(lambda: addon.world_bounds(objects), args.repeat)
+    bulk_ms, (bulk_mins, bulk_maxs) = timed(lambda: addon.world_bounds(objects, source), args.repeat)
+    read_ms, (matrices, corners) = timed(lambda: addon._bulk_transforms(source), args.repeat)
+    math_ms, _ = timed(
+        lambda: corners @ matrices[:, :3, :3].transpose(0, 2, 1) + matrices[:, None, :3, 3],
+        args.repeat,
+    )
+
+    expected = np.array(legacy)
+    assert np.allclose(expected[:, 0], mins) and np.allclose(expected[:, 1], maxs)
+    assert np.allclose(expected[:, 0], bulk_mins, atol=1e-3) and np.allclose(expected[:, 1], bulk_maxs, atol=1e-3)
+
+    print(f"world bounds of {args.objects:,} objects (median of {args.repeat})")
+    print(f"{'method':<34}{'ms':>10}{'speedup':>10}")
+    for label, ms in (
+        ("legacy Vector loop", legacy_ms),
+        ("world_bounds, per-object read", per_object_ms),
+        ("world_bounds, bulk foreach_get", bulk_ms),
+        ("  of which foreach_get reads", read_ms),
+        ("  of which batched matmul", math_ms),
+    ):
+        print(f"{label:<34}{ms:>10.2f}{legacy_ms / ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Micro-benchmark of the BlenderMCP wire encodings.
+
+Compares encode time, decode time and wire size of representative responses
+for every encoding (json, plus orjson / msgpack when installed) with and
+without per-frame compression (zlib, plus zstd when installed).
+
+Run from the repository root:
+
+    python Blender/benchmarks/bench_codecs.py [--repeat 20]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import string
+import time
+
+from fake_bpy import load_addon
+
+addon = load_addon()
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(count))
+
+
+def make_payloads(seed: int = 7) -> dict[str, dict]:
+    """Responses shaped like the ones the addon actually sends"""
+    rng = random.Random(seed)
+
+    stdout = "\n".join(
+        f"[{i:06d}] Placed tile_{i % 100}_{i // 100} at ({rng.uniform(-50, 50):.3f}, {rng.uniform(-50, 50):.3f}, 0.000)"
+        for i in range(20000)
+    )
+    execute_code = {"status": "success", "result": {"executed": True, "result": stdout}}
+
+    assets = {
+        f"asset_{i:04d}": {
+            "name": _words(rng, 3).title(),
+            "type": rng.choice([0, 1, 2]),
+            "categories": [_words(rng, 1) for _ in range(rng.randint(1, 4))],
+            "tags": [_words(rng, 1) for _ in range(rng.randint(2, 8))],
+            "authors": {_words(rng, 2).title(): "All"},
+            "download_count": rng.randint(0, 100000),
+            "date_published": rng.randint(1500000000, 1700000000),
+            "max_resolution": [8192, 4096],
+        }
+        for i in range(1500)
+    }
+    polyhaven = {"status": "success", "result": {"assets": assets, "total_count": len(assets)}}
+
+    results = [
+        {
+            "uid": "".join(rng.choices(string.hexdigits.lower(), k=32)),
+            "name": _words(rng, 4).title(),
+            "description": _words(rng, 60),
+            "user": {"username": _words(rng, 1), "displayName": _words(rng, 2).title()},
+            "thumbnails": {"images": [
+                {"url": f"https://media.sketchfab.com/models/{i}/thumbnails/{w}.jpeg", "width": w, "height": w * 9 // 16}
+                for w in (64, 200, 256, 640, 720, 1024)
+            ]},
+            "faceCount": rng.randint(100, 500000),
+            "vertexCount": rng.randint(100, 500000),
+            "isDownloadable": True,
+            "license": {"label": "CC Attribution"},
+        }
+        for i in range(24)
+    ]
+    sketchfab = {"status": "success", "result": {"results": results, "next": None}}
+
+    objects = [
+        {"name": f"Tile.{i:05d}", "type": "MESH", "location": [round(rng.uniform(-50, 50), 2) for _ in range(3)]}
+        for i in range(5000)
+    ]
+    scene = {"status": "success", "result": {"name": "Arena", "object_count": len(objects), "objects": objects}}
+
+    return {
+        "execute_code stdout": execute_code,
+        "polyhaven assets": polyhaven,
+        "sketchfab search": sketchfab,
+        "scene objects": scene,
+    }
+
+
+def _decode(chunks: list[bytes], codec, compression) -> object:
+    frame = chunks[0]
+    header = int.from_bytes(frame[:addon.FRAME_HEADER_SIZE], "big")
+    body = frame[addon.FRAME_HEADER_SIZE:]
+    if header & addon.FRAME_COMPRESSED_FLAG:
+        body = compression.decompress(body, addon.DEFAULT_MAX_FRAME_SIZE)
+    return codec.loads(body)
+
+
+def bench(repeat: int) -> None:
+    payloads = make_payloads()
+    compressions = [None] + [addon.COMPRESSIONS[name] for name in sorted(addon.COMPRESSIONS)]
+
+    print(f"encodings: {', '.join(sorted(addon.CODECS))}; compression: {', '.join(sorted(addon.COMPRESSIONS))}")
+    header = f"{'payload':<22}{'encoding':<10}{'compression':<13}{'wire bytes':>12}{'ratio':>8}{'encode ms':>11}{'decode ms':>11}"
+    for label, message in payloads.items():
+        print()
+        print(header)
+        baseline = None
+        for encoding in sorted(addon.CODECS):
+            codec = addon.CODECS[encoding]
+            for compression in compressions:
+                encode_times = []
+                decode_times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    chunks = addon.encode_message(
+                        message, addon.FRAMING_LENGTH, codec=codec, compression=compression,
+                    )
+                    encode_times.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    _decode(chunks, codec, compression)
+                    decode_times.append(time.perf_counter() - start)
+
+                size = sum(len(chunk) for chunk in chunks)
+                if baseline is None:
+                    baseline = size
+                print(
+                    f"{label:<22}{encoding:<10}{compression.name if compression else '-':<13}"
+                    f"{size:>12,}{size / baseline:>8.2f}"
+                    f"{statistics.median(encode_times) * 1000:>11.2f}{statistics.median(decode_times) * 1000:>11.2f}"
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="iterations per measurement (median is reported)")
+    args = parser.parse_args()
+    bench(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Spatial queries against the cached SpatialIndex vs walking every object.
+
+For `--objects` randomly placed meshes, times the raycast, objects_in_box and
+nearest_object handlers (index already built, as it is after the first query)
+against a brute-force loop that tests every object's tree in Python, and
+checks that both give the same answers. Also times the first query, which
+builds the index, and the refresh after one object moves.
+
+fake_bpy's BVH trees are the objects' bound boxes, so tree queries cost less
+than on real meshes; the AABB pruning in front of them is the same NumPy code
+that runs inside Blender.
+
+Run from the repository root:
+
+    python Blender/benchmarks/bench_spatial.py [--objects 10000] [--queries 200]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+import types
+
+import numpy as np
+
+from fake_bpy import FakeBVHTree, populate
+from harness import addon, bpy
+
+
+def brute_raycast(objects: list, origin, direction):
+    best = None
+    for obj in objects:
+        tree = FakeBVHTree.FromObject(obj, None)
+        m = np.array(list(obj.matrix_world), dtype=float)
+        inverse = np.linalg.inv(m)
+        local_direction = inverse[:3, :3] @ direction
+        local_direction /= np.linalg.norm(local_direction)
+        location, _, _, _ = tree.ray_cast((inverse[:3, :3] @ origin + inverse[:3, 3]).tolist(), local_direction.tolist())
+        if location is not None:
+            distance = np.linalg.norm(m[:3, :3] @ np.array(list(location)) + m[:3, 3] - origin)
+            if best is None or distance < best[1]:
+                best = (obj.name, distance)
+    return best
+
+
+def brute_in_box(objects: list, lo, hi) -> list[str]:
+    names = []
+    for obj in objects:
+        corners = np.array([list(obj.matrix_world @ addon.mathutils.Vector(c)) for c in obj.bound_box])
+        if (corners.min(axis=0) <= hi).all() and (corners.max(axis=0) >= lo).all():
+            names.append(obj.name)
+    return names
+
+
+def timed(fn, inputs: list) -> tuple[float, list]:
+    results = []
+    times = []
+    for args in inputs:
+        start = time.perf_counter()
+        results.append(fn(*args))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=10000, help="mesh objects in the scene")
+    parser.add_argument("--queries", type=int, default=200, help="queries of each kind (median is reported)")
+    parser.add_argument("--brute-queries", type=int, default=5, help="queries checked against the brute-force loop")
+    args = parser.parse_args()
+
+    objects = populate(args.objects)
+    server = addon.BlenderMCPServer()
+    rng = random.Random(2)
+
+    def point() -> list[float]:
+        return [rng.uniform(-100.0, 100.0) for _ in range(3)]
+
+    def ray() -> tuple[list[float], list[float]]:
+        return point(), [rng.uniform(-1.0, 1.0) for _ in range(3)]
+
+    def box() -> tuple[list[float], list[float]]:
+        lo = point()
+        return lo, [v + 20.0 for v in lo]
+
+    start = time.perf_counter()
+    server.spatial.refresh()
+    build_ms = (time.perf_counter() - start) * 1000.0
+
+    rays = [ray() for _ in range(args.queries)]
+    boxes = [box() for _ in range(args.queries)]
+    points = [(point(),) for _ in range(args.queries)]
+    raycast_us, hits = timed(server.raycast, rays)
+    box_us, found = timed(lambda lo, hi: server.objects_in_box(lo, hi, limit=args.objects), boxes)
+    nearest_us, _ = timed(server.nearest_object, points)
+
+    checked = args.brute_queries
+    brute_ray_us, brute_hits = timed(
+        lambda o, d: brute_raycast(objects, np.array(o), np.array(d) / np.linalg.norm(d)), rays[:checked],
+    )
+    brute_box_us, brute_found = timed(
+        lambda lo, hi: brute_in_box(objects, np.array(lo), np.array(hi)), boxes[:checked],
+    )
+    for hit, expected in zip(hits, brute_hits):
+        assert hit["hit"] == (expected is not None)
+        assert not hit["hit"] or abs(hit["distance"] - expected[1]) < 1e-3, (hit, expected)
+    for result, expected in zip(found, brute_found):
+        assert result["objects"] == expected
+
+    # One object moves: the journal hands the index a single modified row
+    moved = objects[0]
+    moved.location = addon.mathutils.Vector((500.0, 500.0, 500.0))
+    update = types.SimpleNamespace(
+        id=types.SimpleNamespace(name=moved.name, id_type="OBJECT"),
+        is_updated_transform=True, is_updated_geometry=False, is_updated_shading=False,
+    )
+    server.journal.snapshot()
+    server.journal.on_depsgraph_update(types.SimpleNamespace(updates=[update]))
+    start = time.perf_counter()
+    server.spatial.refresh()
+    refresh_ms = (time.perf_counter() - start) * 1000.0
+    assert server.objects_in_box([499.0] * 3, [501.0] * 3)["objects"] == [moved.name]
+
+    print(f"spatial queries over {args.objects:,} objects (median of {args.queries}, brute force of {checked})")
+    print(f"index build {build_ms:.1f} ms, refresh after one move {refresh_ms:.2f} ms")
+    print(f"{'query':<18}{'index us':>12}{'brute us':>14}{'speedup':>10}")
+    for label, fast, slow in (
+        ("raycast", raycast_us, brute_ray_us),
+        ("objects_in_box", box_us, brute_box_us),
+        ("nearest_object", nearest_us, None),
+    ):
+        slow_text = f"{slow:>14.0f}{slow / fast:>9.0f}x" if slow else f"{'-':>14}{'-':>10}"
+        print(f"{label:<18}{fast:>12.1f}{slow_text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Round-trip latency of small commands over TCP loopback vs a Unix domain socket.
+
+Starts the real BlenderMCPServer (against fake_bpy) listening on both
+transports and times sequential request/response pairs on each:
+
+- get_dispatcher_stats is answered on the socket thread, so it measures the
+  transport and framing alone;
+- get_scene_info goes through the main-thread dispatcher as well.
+
+Run from the repository root (Linux/macOS):
+
+    python Blender/benchmarks/bench_transport.py [--requests 5000] [--max-p50-us 2000] [--max-p99-us 20000]
+
+The budgets apply to every row; the script exits with status 1 if one is missed.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+from harness import Client, addon, check_budgets, run_with_server
+
+
+def _measure(client: Client, command_type: str, count: int) -> list[float]:
+    for i in range(min(100, count)):  # warm up
+        client.call({"type": command_type, "id": i})
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        client.call({"type": command_type, "id": i})
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> tuple[float, float]:
+    ordered = sorted(samples)
+    p50 = ordered[len(ordered) // 2] * 1e6
+    p99 = ordered[int(len(ordered) * 0.99)] * 1e6
+    print(f"{label:<36}{statistics.mean(samples) * 1e6:>10.1f}{p50:>10.1f}{p99:>10.1f}")
+    return p50, p99
+
+
+def run(requests: int, port: int, max_p50_us: float | None = None, max_p99_us: float | None = None) -> bool:
+    if not hasattr(socket, "AF_UNIX"):
+        sys.exit("Unix domain sockets are not available on this platform")
+
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="blendermcp_"), "mcp.sock")
+    server = addon.BlenderMCPServer(port=port, socket_path=socket_path)
+    results: dict[str, list[float]] = {}
+
+    def clients() -> None:
+        for transport, client in (("tcp", Client.tcp(port)), ("uds", Client.unix(socket_path))):
+            results[f"{transport} get_dispatcher_stats"] = _measure(client, "get_dispatcher_stats", requests)
+            results[f"{transport} get_scene_info"] = _measure(client, "get_scene_info", max(1, requests // 10))
+            client.close()
+
+    run_with_server(server, clients)
+
+    print(f"{'round trip (us)':<36}{'mean':>10}{'p50':>10}{'p99':>10}")
+    checks = []
+    for label, samples in results.items():
+        p50, p99 = _report(label, samples)
+        checks.append((f"{label} p50 us", p50, "<=", max_p50_us))
+        checks.append((f"{label} p99 us", p99, "<=", max_p99_us))
+    return check_budgets(checks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="round trips per transport")
+    parser.add_argument("--port", type=int, default=19876, help="TCP port to listen on")
+    parser.add_argument("--max-p50-us", type=float, help="fail if any p50 round trip is above this")
+    parser.add_argument("--max-p99-us", type=float, help="fail if any p99 round trip is above this")
+    args = parser.parse_args()
+    if not run(args.requests, args.port, args.max_p50_us, args.max_p99_us):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
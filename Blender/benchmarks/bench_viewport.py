@@ -0,0 +1,107 @@
+"""
+Viewport capture latency: the screenshot/reload/rescale/save path vs in_memory.
+
+get_viewport_screenshot used to write a full-size screenshot to disk, load it
+back as a Blender image, scale it, save it again and, to return the bytes,
+read the file once more. With in_memory=True it renders the view offscreen,
+shrinks the pixels with a NumPy box filter and encodes them in memory.
+
+fake_bpy has no screenshot operator or image codecs, so the disk path is
+re-enacted step by step with the same PNG encoder and zlib, writing and
+reading real temporary files; the in_memory column runs the addon's actual
+handler (against a fake offscreen buffer, so GPU draw time is not included).
+
+Run from the repository root:
+
+    python Blender/benchmarks/bench_viewport.py [--width 1920 --height 1080] [--max-size 800]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from harness import addon, bpy
+
+import gpu
+
+
+def decode_png(data: bytes) -> np.ndarray:
+    """Decode the unfiltered PNGs written by addon.encode_png"""
+    width = int.from_bytes(data[16:20], "big")
+    height = int.from_bytes(data[20:24], "big")
+    channels = 4 if data[25] == 6 else 3
+    length = int.from_bytes(data[33:37], "big")
+    rows = np.frombuffer(zlib.decompress(data[41:41 + length]), dtype=np.uint8)
+    return rows.reshape(height, width * channels + 1)[:, 1:].reshape(height, width, channels)
+
+
+def disk_capture(area, max_size: int, directory: str) -> bytes:
+    region = area.regions[0]
+    width, height = region.width, region.height
+    path = os.path.join(directory, "screenshot.png")
+    # screen.screenshot_area: the full-size frame written to disk
+    frame = np.asarray(gpu.types.GPUOffScreen(width, height).texture_color.read())
+    with open(path, "wb") as f:
+        f.write(addon.encode_png(frame.reshape(height, width, 4)[::-1]))
+    # bpy.data.images.load
+    with open(path, "rb") as f:
+        image = decode_png(f.read())
+    # img.scale: plain resample to the target size
+    scale = max_size / max(width, height)
+    rows = (np.arange(int(height * scale)) / scale).astype(np.intp)
+    cols = (np.arange(int(width * scale)) / scale).astype(np.intp)
+    image = np.ascontiguousarray(image[rows][:, cols])
+    # img.save
+    with open(path, "wb") as f:
+        f.write(addon.encode_png(image))
+    # return_image: the file read back for the reply
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def timed(fn, repeat: int) -> tuple[float, object]:
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000.0, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920, help="viewport width in pixels")
+    parser.add_argument("--height", type=int, default=1080, help="viewport height in pixels")
+    parser.add_argument("--max-size", type=int, default=800, help="longest side of the returned image")
+    parser.add_argument("--repeat", type=int, default=20, help="captures per method (median is reported)")
+    args = parser.parse_args()
+
+    area = bpy.context.screen.areas[0]
+    area.regions[0].width, area.regions[0].height = args.width, args.height
+    server = addon.BlenderMCPServer()
+
+    with tempfile.TemporaryDirectory(prefix="blendermcp_") as directory:
+        disk_ms, disk = timed(lambda: disk_capture(area, args.max_size, directory), args.repeat)
+    memory_ms, result = timed(
+        lambda: server.get_viewport_screenshot(max_size=args.max_size, in_memory=True), args.repeat,
+    )
+    assert result.get("success"), result
+    image = decode_png(bytes(result["image"].data))
+    assert max(image.shape[:2]) == args.max_size
+
+    print(f"{args.width}x{args.height} viewport to {result['width']}x{result['height']} PNG (median of {args.repeat})")
+    print(f"{'method':<28}{'ms':>10}{'bytes':>12}")
+    print(f"{'disk round trips':<28}{disk_ms:>10.1f}{len(disk):>12,}")
+    print(f"{'in_memory':<28}{memory_ms:>10.1f}{result['image'].size:>12,}")
+    print(f"speedup {disk_ms / memory_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Fixtures for the unit tests in this folder, which run Blender/addon.py against
+fake_bpy like the benchmarks do:
+
+    python -m pytest Blender/benchmarks
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import threading
+
+import pytest
+
+from harness import addon, bpy
+
+
+@pytest.fixture(autouse=True)
+def empty_scene():
+    """Every test starts and ends with no objects in the fake scene or bpy.data"""
+
+    def clear() -> None:
+        bpy.context.scene.objects.clear()
+        for collection in (bpy.data.objects, bpy.data.materials, bpy.data.images, bpy.data.collections):
+            collection.clear()
+
+    clear()
+    yield bpy.context.scene
+    clear()
+
+
+@pytest.fixture
+def server(tmp_path) -> addon.BlenderMCPServer:
+    """A server that is never started, for calling command handlers directly"""
+    return addon.BlenderMCPServer(cache_dir=str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def start_server():
+    """Factory for running servers on a Unix socket, with a thread pumping the fake timers.
+
+    The pumping thread plays Blender's main thread; if a timer callback
+    raises, it dies like Blender would unregister the timer, and the test
+    sees commands go unanswered. Connect with Client.unix(server.socket_path).
+    """
+    directory = tempfile.mkdtemp(prefix="mcp_")
+    started = []
+
+    def start(**kwargs) -> addon.BlenderMCPServer:
+        kwargs.setdefault("socket_path", os.path.join(directory, f"{len(started)}.sock"))
+        kwargs.setdefault("use_tcp", False)
+        server = addon.BlenderMCPServer(**kwargs)
+        server.start()
+        assert server.running
+        stop = threading.Event()
+        thread = threading.Thread(target=bpy.app.timers.run, args=(stop,), daemon=True)
+        thread.start()
+        started.append((server, stop, thread))
+        return server
+
+    yield start
+    for server, stop, thread in started:
+        stop.set()
+        thread.join()
+        server.stop()
+    shutil.rmtree(directory, ignore_errors=True)
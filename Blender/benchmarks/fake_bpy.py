@@ -0,0 +1,439 @@
+"""
+Stand-ins for Blender's `bpy`, `mathutils` and `gpu` modules.
+
+Lets the benchmark scripts and unit tests in this folder import
+`Blender/addon.py` on a plain Python install, without Blender:
+
+    from fake_bpy import load_addon
+    addon = load_addon()
+
+`bpy.app.timers` is backed by FakeTimers: whichever thread calls
+`bpy.app.timers.run(stop_event)` plays the part of Blender's main thread.
+`populate(count)` fills the scene with mesh objects for the handlers to walk.
+"""
+from __future__ import annotations
+
+import importlib.util
+import os
+import random
+import sys
+import threading
+import time
+import types
+
+ADDON_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addon.py")
+
+
+class FakeTimers:
+    """bpy.app.timers, run by whichever thread calls run()"""
+
+    def __init__(self) -> None:
+        self._due: dict = {}
+        self._wakeup = threading.Condition()
+
+    def register(self, fn, first_interval: float = 0.0, persistent: bool = False) -> None:
+        with self._wakeup:
+            self._due[fn] = time.perf_counter() + (first_interval or 0.0)
+            self._wakeup.notify()
+
+    def unregister(self, fn) -> None:
+        with self._wakeup:
+            if fn not in self._due:
+                raise ValueError("Timer not registered")
+            del self._due[fn]
+
+    def is_registered(self, fn) -> bool:
+        with self._wakeup:
+            return fn in self._due
+
+    def run(self, stop_event: threading.Event) -> None:
+        """Call due timers until stop_event is set, like Blender's event loop"""
+        while not stop_event.is_set():
+            now = time.perf_counter()
+            with self._wakeup:
+                due = [fn for fn, at in self._due.items() if at <= now]
+            for fn in due:
+                interval = fn()
+                with self._wakeup:
+                    if fn not in self._due:
+                        continue
+                    if interval is None:
+                        del self._due[fn]
+                    else:
+                        self._due[fn] = time.perf_counter() + interval
+            with self._wakeup:
+                if self._due:
+                    timeout = max(0.0, min(self._due.values()) - time.perf_counter())
+                else:
+                    timeout = 0.05
+                if timeout > 0:
+                    self._wakeup.wait(min(timeout, 0.05))
+                    continue
+            # Blender's event loop runs C code between timer calls, during
+            # which other threads get the GIL; a bare Python loop would not
+            time.sleep(0)
+
+
+class Vector:
+    """Just enough of mathutils.Vector for the addon's handlers"""
+
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, values=(0.0, 0.0, 0.0)) -> None:
+        self.x, self.y, self.z = (float(v) for v in values)
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __getitem__(self, index: int) -> float:
+        return (self.x, self.y, self.z)[index]
+
+    def __len__(self) -> int:
+        return 3
+
+    def __repr__(self) -> str:
+        return f"Vector(({self.x}, {self.y}, {self.z}))"
+
+
+class Matrix:
+    """Translation plus per-axis scale; iterates over its 4 rows like mathutils.Matrix"""
+
+    def __init__(self, translation=(0.0, 0.0, 0.0), scale=(1.0, 1.0, 1.0)) -> None:
+        self.translation = Vector(translation)
+        self.scale = Vector(scale)
+
+    def __matmul__(self, other: Vector) -> Vector:
+        return Vector(t + s * v for t, s, v in zip(self.translation, self.scale, other))
+
+    def __iter__(self):
+        sx, sy, sz = self.scale
+        tx, ty, tz = self.translation
+        return iter((
+            (sx, 0.0, 0.0, tx),
+            (0.0, sy, 0.0, ty),
+            (0.0, 0.0, sz, tz),
+            (0.0, 0.0, 0.0, 1.0),
+        ))
+
+    def __len__(self) -> int:
+        return 4
+
+    def __getitem__(self, row: int) -> tuple:
+        return tuple(self)[row]
+
+    def flat_columns(self) -> list[float]:
+        """The 16 values in Blender's storage order, column by column"""
+        return [value for column in zip(*self) for value in column]
+
+
+class FakeBVHTree:
+    """mathutils.bvhtree.BVHTree of an object's bound box, standing in for its mesh"""
+
+    def __init__(self, lo, hi) -> None:
+        self.lo = lo
+        self.hi = hi
+
+    @classmethod
+    def FromObject(cls, obj, depsgraph) -> "FakeBVHTree":
+        return cls([min(c[i] for c in obj.bound_box) for i in range(3)],
+                   [max(c[i] for c in obj.bound_box) for i in range(3)])
+
+    def ray_cast(self, origin, direction, distance=float("inf")):
+        enter, leave, axis = 0.0, distance, None
+        for i in range(3):
+            if direction[i] == 0.0:
+                if not self.lo[i] <= origin[i] <= self.hi[i]:
+                    return None, None, None, None
+                continue
+            t1 = (self.lo[i] - origin[i]) / direction[i]
+            t2 = (self.hi[i] - origin[i]) / direction[i]
+            if min(t1, t2) > enter:
+                enter, axis = min(t1, t2), i
+            leave = min(leave, max(t1, t2))
+        if enter > leave or axis is None:
+            return None, None, None, None
+        normal = [0.0, 0.0, 0.0]
+        normal[axis] = -1.0 if direction[axis] > 0 else 1.0
+        return Vector(o + d * enter for o, d in zip(origin, direction)), Vector(normal), axis, enter
+
+    def find_nearest(self, point, distance=float("inf")):
+        inside = all(lo <= p <= hi for p, lo, hi in zip(point, self.lo, self.hi))
+        if inside:
+            # Push out through the closest face
+            gaps = [(p - lo, i, lo) for i, (p, lo) in enumerate(zip(point, self.lo))]
+            gaps += [(hi - p, i, hi) for i, (p, hi) in enumerate(zip(point, self.hi))]
+            gap, axis, value = min(gaps)
+            location = list(point)
+            location[axis] = value
+        else:
+            location = [min(max(p, lo), hi) for p, lo, hi in zip(point, self.lo, self.hi)]
+        gap = sum((a - b) ** 2 for a, b in zip(location, point)) ** 0.5
+        if gap > distance:
+            return None, None, None, None
+        return Vector(location), Vector(), 0, gap
+
+
+class FakeOffScreen:
+    """gpu.types.GPUOffScreen whose color texture holds a made-up viewport frame"""
+
+    def __init__(self, width: int, height: int) -> None:
+        import numpy as np
+
+        y, x = np.mgrid[0:height, 0:width]
+        frame = np.empty((height, width, 4), dtype=np.uint8)
+        frame[..., 0] = 40 + 30 * y // max(1, height)
+        frame[..., 1] = 40 + (x * 7 // max(1, width)) * 20
+        frame[..., 2] = 60 + ((x // 40 + y // 40) % 2) * 80
+        frame[..., 3] = 255
+        self.texture_color = types.SimpleNamespace(read=lambda: frame.ravel())
+
+    def draw_view3d(self, *args, **kwargs) -> None:
+        pass
+
+    def free(self) -> None:
+        pass
+
+
+class FakeElements(list):
+    """A mesh's vertices, loops or loop triangles, readable with foreach_get"""
+
+    def foreach_get(self, attr: str, buffer) -> None:
+        _foreach_get(self, attr, buffer)
+
+
+class FakeMesh:
+    def __init__(self, name: str, vertex_count: int = 8) -> None:
+        self.name = name
+        self.vertices = [None] * vertex_count
+        self.edges = [None] * (vertex_count * 3 // 2)
+        self.polygons = [None] * (vertex_count - 2)
+        self.loops = FakeElements()
+        self.loop_triangles = FakeElements()
+        self.uv_layers = types.SimpleNamespace(active=None)
+
+    @classmethod
+    def grid(cls, name: str, columns: int = 2, rows: int = 1) -> "FakeMesh":
+        """A flat grid of quads on the XY plane, with vertices, loops, UVs and triangles to read"""
+        mesh = cls(name)
+        mesh.vertices = FakeElements(
+            types.SimpleNamespace(co=Vector((x, y, 0.0)), normal=Vector((0.0, 0.0, 1.0)))
+            for y in range(rows + 1) for x in range(columns + 1)
+        )
+        uvs = FakeElements()
+        for y in range(rows):
+            for x in range(columns):
+                corners = [(x, y), (x + 1, y), (x + 1, y + 1), (x, y + 1)]
+                first = len(mesh.loops)
+                for cx, cy in corners:
+                    mesh.loops.append(types.SimpleNamespace(vertex_index=cy * (columns + 1) + cx))
+                    uvs.append(types.SimpleNamespace(uv=(cx / columns, cy / rows)))
+                quad = [loop.vertex_index for loop in mesh.loops[first:]]
+                for a, b, c in ((0, 1, 2), (0, 2, 3)):
+                    mesh.loop_triangles.append(types.SimpleNamespace(
+                        vertices=(quad[a], quad[b], quad[c]), loops=(first + a, first + b, first + c)))
+        mesh.polygons = [None] * (columns * rows)
+        mesh.edges = [None] * (columns * (rows + 1) + rows * (columns + 1))
+        mesh.uv_layers.active = types.SimpleNamespace(data=uvs)
+        return mesh
+
+    def calc_loop_triangles(self) -> None:
+        pass
+
+
+class FakeObject:
+    def __init__(self, name: str, location=(0.0, 0.0, 0.0), scale=(1.0, 1.0, 1.0), obj_type: str = "MESH") -> None:
+        self.name = name
+        self.type = obj_type
+        self.location = Vector(location)
+        self.rotation_euler = Vector()
+        self.scale = Vector(scale)
+        self.data = FakeMesh(name) if obj_type == "MESH" else None
+        self.material_slots: list = []
+        self.users_collection: list = []
+        self.parent = None
+        self.hide_viewport = False
+        # Unit cube corners in local space, like a default mesh's bound_box
+        self.bound_box = [(x, y, z) for x in (-1.0, 1.0) for y in (-1.0, 1.0) for z in (-1.0, 1.0)]
+
+    @property
+    def dimensions(self) -> Vector:
+        return Vector(2.0 * s for s in self.scale)
+
+    @property
+    def matrix_world(self) -> Matrix:
+        return Matrix(self.location, self.scale)
+
+    def visible_get(self) -> bool:
+        return not self.hide_viewport
+
+    def evaluated_get(self, depsgraph) -> "FakeObject":
+        return self
+
+    def to_mesh(self):
+        return self.data
+
+    def to_mesh_clear(self) -> None:
+        pass
+
+
+def _foreach_get(items, attr: str, buffer) -> None:
+    """bpy_prop_collection.foreach_get for the array properties the addon reads in bulk"""
+    values = []
+    for item in items:
+        if attr == "matrix_world":
+            values.extend(item.matrix_world.flat_columns())
+        elif attr == "bound_box":
+            values.extend(v for corner in item.bound_box for v in corner)
+        else:
+            value = getattr(item, attr)
+            if hasattr(value, "__iter__"):
+                values.extend(value)
+            else:
+                values.append(value)
+    buffer[:] = values
+
+
+class FakeCollection(dict):
+    """bpy.data.objects and friends: a name-keyed dict iterating over its values"""
+
+    def __iter__(self):
+        return iter(list(self.values()))
+
+    def new(self, item):
+        self[item.name] = item
+        return item
+
+    def foreach_get(self, attr: str, buffer) -> None:
+        _foreach_get(self.values(), attr, buffer)
+
+
+class FakeObjectList(list):
+    """scene.objects: an ordered collection supporting keys() and foreach_get()"""
+
+    def keys(self) -> list[str]:
+        return [item.name for item in self]
+
+    def foreach_get(self, attr: str, buffer) -> None:
+        _foreach_get(self, attr, buffer)
+
+
+class FakeScene:
+    def __init__(self, name: str = "Scene") -> None:
+        self.name = name
+        self.objects = FakeObjectList()
+        self.blendermcp_use_polyhaven = False
+        self.blendermcp_use_hyper3d = False
+        self.blendermcp_use_sketchfab = False
+        self.blendermcp_use_hunyuan3d = False
+
+
+def _property(*args, **kwargs):
+    return None
+
+
+def _persistent(fn):
+    return fn
+
+
+def _view3d_area(width: int, height: int):
+    region_3d = types.SimpleNamespace(view_matrix=Matrix(), window_matrix=Matrix())
+    return types.SimpleNamespace(
+        type="VIEW_3D",
+        regions=[types.SimpleNamespace(type="WINDOW", width=width, height=height)],
+        spaces=types.SimpleNamespace(active=types.SimpleNamespace(region_3d=region_3d)),
+    )
+
+
+def _build_bpy() -> types.ModuleType:
+    bpy = types.ModuleType("bpy")
+
+    props = types.ModuleType("bpy.props")
+    for name in ("BoolProperty", "EnumProperty", "FloatProperty", "IntProperty", "StringProperty"):
+        setattr(props, name, _property)
+
+    handlers = types.ModuleType("bpy.app.handlers")
+    handlers.persistent = _persistent
+    handlers.load_post = []
+    handlers.depsgraph_update_post = []
+    handlers.undo_post = []
+    handlers.redo_post = []
+
+    app = types.ModuleType("bpy.app")
+    app.handlers = handlers
+    app.timers = FakeTimers()
+    app.version = (4, 2, 0)
+
+    scene = FakeScene()
+    bpy.props = props
+    bpy.app = app
+    bpy.context = types.SimpleNamespace(
+        scene=scene,
+        preferences=types.SimpleNamespace(addons={}),
+        evaluated_depsgraph_get=lambda: None,
+        view_layer=None,
+        screen=types.SimpleNamespace(areas=[_view3d_area(1920, 1080)]),
+    )
+    bpy.path = types.SimpleNamespace(abspath=os.path.abspath)
+    bpy.data = types.SimpleNamespace(
+        objects=FakeCollection(), materials=FakeCollection(), images=FakeCollection(),
+        collections=FakeCollection(), scenes=[scene],
+    )
+    bpy.types = types.SimpleNamespace(
+        AddonPreferences=object,
+        Operator=object,
+        Panel=object,
+        Scene=types.SimpleNamespace(),
+    )
+    return bpy
+
+
+def install() -> types.ModuleType:
+    """Register the fake modules in sys.modules and return the fake bpy"""
+    if "bpy" in sys.modules:
+        return sys.modules["bpy"]
+
+    bpy = _build_bpy()
+    sys.modules["bpy"] = bpy
+    sys.modules["bpy.props"] = bpy.props
+    sys.modules["bpy.app"] = bpy.app
+    sys.modules["bpy.app.handlers"] = bpy.app.handlers
+    mathutils = types.ModuleType("mathutils")
+    mathutils.Vector = Vector
+    mathutils.Matrix = Matrix
+    sys.modules["mathutils"] = mathutils
+    bvhtree = types.ModuleType("mathutils.bvhtree")
+    bvhtree.BVHTree = FakeBVHTree
+    mathutils.bvhtree = bvhtree
+    sys.modules["mathutils.bvhtree"] = bvhtree
+    gpu = types.ModuleType("gpu")
+    gpu.types = types.SimpleNamespace(GPUOffScreen=FakeOffScreen)
+    sys.modules["gpu"] = gpu
+    return bpy
+
+
+def populate(count: int, extent: float = 100.0, seed: int = 1) -> list[FakeObject]:
+    """Add `count` randomly placed mesh objects to the scene and bpy.data"""
+    bpy = install()
+    rng = random.Random(seed)
+    scene = bpy.context.scene
+    start = len(scene.objects)
+    objects = []
+    for i in range(start, start + count):
+        obj = FakeObject(
+            f"Object.{i:05d}",
+            location=[rng.uniform(-extent, extent) for _ in range(3)],
+            scale=[rng.uniform(0.2, 2.0) for _ in range(3)],
+        )
+        bpy.data.objects.new(obj)
+        scene.objects.append(obj)
+        objects.append(obj)
+    return objects
+
+
+def load_addon() -> types.ModuleType:
+    """Import Blender/addon.py against the fake modules"""
+    install()
+    spec = importlib.util.spec_from_file_location("blendermcp_addon", ADDON_PATH)
+    addon = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(addon)
+    return addon
@@ -0,0 +1,129 @@
+"""
+Helpers shared by the benchmark scripts: a blocking socket client and a way
+to run the real BlenderMCPServer with this thread as Blender's main thread.
+
+    from harness import Client, addon, run_with_server
+
+    server = addon.BlenderMCPServer(port=19876)
+
+    def work():
+        client = Client.tcp(19876, framing="length")
+        print(client.call({"type": "get_scene_info"}))
+
+    run_with_server(server, work)
+
+Scripts that take --max-*/--min-* budgets pass their measurements to
+check_budgets() and exit non-zero when one is missed, which is how CI
+fails a run (see .github/workflows/blender-benchmarks.yml).
+"""
+from __future__ import annotations
+
+import socket
+import sys
+import threading
+from typing import Callable
+
+from fake_bpy import load_addon
+
+addon = load_addon()
+bpy = sys.modules["bpy"]
+
+
+class Client:
+    """Blocking client that negotiates a protocol and then calls commands one at a time"""
+
+    def __init__(self, sock: socket.socket, framing: str = "length", encoding: str = "json",
+                 compression: str | None = None) -> None:
+        self.sock = sock
+        self.decoder = addon.FrameDecoder()
+        self.framing = addon.FRAMING_JSON
+        self.codec = addon.JSON_CODEC
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        if framing != addon.FRAMING_JSON or encoding != "json" or compression:
+            params = {"framing": framing, "encoding": encoding, "compression": compression}
+            agreed = self.call({"type": "negotiate_protocol", "params": params})["result"]
+            self.framing = agreed["framing"]
+            self.codec = addon.CODECS[agreed["encoding"]]
+            self.decoder.set_framing(self.framing)
+            self.decoder.compression = addon.COMPRESSIONS.get(agreed["compression"])
+
+    @classmethod
+    def tcp(cls, port: int, host: str = "localhost", **kwargs) -> "Client":
+        sock = socket.create_connection((host, port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return cls(sock, **kwargs)
+
+    @classmethod
+    def unix(cls, path: str, **kwargs) -> "Client":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        return cls(sock, **kwargs)
+
+    def send(self, command: dict) -> None:
+        frame = addon.encode_frame(self.codec.dumps(command, None), self.framing)
+        self.sock.sendall(frame)
+        self.bytes_sent += len(frame)
+
+    def receive(self) -> dict:
+        while True:
+            frame = self.decoder.next_frame()
+            if frame is not None:
+                return self.codec.loads(frame)
+            data = self.sock.recv(1 << 20)
+            if not data:
+                raise ConnectionError("Server closed the connection")
+            self.bytes_received += len(data)
+            self.decoder.feed(data)
+
+    def call(self, command: dict) -> dict:
+        self.send(command)
+        return self.receive()
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+def run_with_server(server, work: Callable[[], None]) -> None:
+    """Start server, run work() on a worker thread and pump Blender's timers here until it returns"""
+    server.start()
+    if not server.running:
+        sys.exit("Server failed to start")
+
+    stop = threading.Event()
+    errors: list[BaseException] = []
+
+    def worker() -> None:
+        try:
+            work()
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            stop.set()
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    bpy.app.timers.run(stop)
+    thread.join()
+    server.stop()
+    if errors:
+        raise errors[0]
+
+
+def check_budgets(checks: list[tuple[str, float, str, float | None]]) -> bool:
+    """Print PASS/FAIL for each (label, value, "<=" or ">=", limit) check; True if all passed.
+
+    Checks with a limit of None were not asked for and are skipped, so the
+    scripts can hand their optional budget arguments over as they are.
+    """
+    checks = [check for check in checks if check[3] is not None]
+    if not checks:
+        return True
+    passed_all = True
+    print()
+    print("budgets")
+    for label, value, op, limit in checks:
+        passed = value <= limit if op == "<=" else value >= limit
+        passed_all = passed_all and passed
+        print(f"  {'PASS' if passed else 'FAIL'}  {label}: {value:,.2f} {op} {limit:,.2f}")
+    return passed_all
@@ -0,0 +1,233 @@
+"""
+Load test of the real BlenderMCPServer on a plain Python install.
+
+Runs the server against fake_bpy with a populated scene, then drives it from
+`--clients` concurrent connections sending a weighted mix of commands for
+`--duration` seconds. Reports throughput, per-command p50/p99 latency and the
+process's memory growth, and can write the results as JSON for CI.
+
+With any of the --max-*/--min-* budgets given, the run exits with status 1
+when one is missed. Latency budgets apply to every command in the mix.
+
+Run from the repository root:
+
+    python Blender/benchmarks/load_test.py --clients 8 --duration 10 \\
+        --mix get_scene_info=5,get_object_info=3,execute_code=1,get_dispatcher_stats=1 \\
+        --response-bytes 65536
+
+    python Blender/benchmarks/load_test.py --max-p50-ms 5 --max-p99-ms 50 --min-rps 500 --max-errors 0
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+from fake_bpy import populate
+from harness import Client, addon, check_budgets, run_with_server
+
+DEFAULT_MIX = "get_scene_info=5,get_object_info=3,execute_code=1,get_dispatcher_stats=1"
+
+
+def parse_mix(text: str) -> list[tuple[str, int]]:
+    mix = []
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        mix.append((name.strip(), int(weight or 1)))
+    return mix
+
+
+def make_command(name: str, rng: random.Random, objects: list, request_bytes: int, response_bytes: int) -> dict:
+    """A command of the given type; execute_code carries the configured payload sizes"""
+    if name == "get_object_info":
+        return {"type": name, "params": {"name": rng.choice(objects).name}}
+    if name == "execute_code":
+        padding = f"# {'x' * max(0, request_bytes - 40)}\n" if request_bytes else ""
+        return {"type": name, "params": {"code": f"{padding}print('y' * {response_bytes})"}}
+    return {"type": name}
+
+
+def rss_bytes() -> int:
+    """Current resident set size; falls back to the peak where /proc is missing"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def run(args: argparse.Namespace) -> dict:
+    objects = populate(args.objects)
+    mix = parse_mix(args.mix)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+
+    server = addon.BlenderMCPServer(port=args.port, max_connections=max(addon.DEFAULT_MAX_CONNECTIONS, args.clients))
+    latencies: dict[str, list[float]] = {name: [] for name in names}
+    errors: dict[str, int] = {name: 0 for name in names}
+    traffic = {"sent": 0, "received": 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.clients + 1)
+    window = {}
+
+    def client_loop(index: int) -> None:
+        rng = random.Random(index)
+        client = Client.tcp(args.port, framing=args.framing, encoding=args.encoding, compression=args.compression)
+        local = {name: [] for name in names}
+        local_errors = {name: 0 for name in names}
+        barrier.wait()
+        deadline = time.perf_counter() + args.duration
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            command = make_command(name, rng, objects, args.request_bytes, args.response_bytes)
+            start = time.perf_counter()
+            response = client.call(command)
+            local[name].append(time.perf_counter() - start)
+            if response.get("status") != "success":
+                local_errors[name] += 1
+        client.close()
+        with lock:
+            for name in names:
+                latencies[name].extend(local[name])
+                errors[name] += local_errors[name]
+            traffic["sent"] += client.bytes_sent
+            traffic["received"] += client.bytes_received
+
+    def work() -> None:
+        threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        gc.collect()
+        window["rss_before"] = rss_bytes()
+        if args.trace_memory:
+            tracemalloc.start()
+        window["start"] = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        window["elapsed"] = time.perf_counter() - window["start"]
+        gc.collect()
+        window["rss_after"] = rss_bytes()
+        if args.trace_memory:
+            window["heap_growth"], window["heap_peak"] = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    run_with_server(server, work)
+
+    elapsed = window["elapsed"]
+    total = sum(len(samples) for samples in latencies.values())
+    results = {
+        "clients": args.clients,
+        "duration_s": elapsed,
+        "requests": total,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "bytes_sent": traffic["sent"],
+        "bytes_received": traffic["received"],
+        "rss_growth_bytes": window["rss_after"] - window["rss_before"],
+        "commands": {},
+    }
+    if args.trace_memory:
+        results["heap_growth_bytes"] = window["heap_growth"]
+        results["heap_peak_bytes"] = window["heap_peak"]
+    for name in names:
+        samples = sorted(latencies[name])
+        if not samples:
+            continue
+        results["commands"][name] = {
+            "requests": len(samples),
+            "errors": errors[name],
+            "mean_ms": statistics.mean(samples) * 1000.0,
+            "p50_ms": percentile(samples, 0.5) * 1000.0,
+            "p99_ms": percentile(samples, 0.99) * 1000.0,
+            "max_ms": samples[-1] * 1000.0,
+        }
+    return results
+
+
+def report(results: dict) -> None:
+    print(
+        f"{results['requests']:,} requests from {results['clients']} clients in {results['duration_s']:.1f}s: "
+        f"{results['throughput_rps']:,.0f} req/s, {results['bytes_received'] / results['duration_s'] / 1e6:.1f} MB/s received"
+    )
+    memory = f"RSS growth {results['rss_growth_bytes'] / 1e6:+.1f} MB"
+    if "heap_growth_bytes" in results:
+        memory += f", Python heap growth {results['heap_growth_bytes'] / 1e6:+.1f} MB (peak {results['heap_peak_bytes'] / 1e6:.1f} MB)"
+    print(memory)
+    print()
+    print(f"{'command':<24}{'requests':>10}{'errors':>8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in results["commands"].items():
+        print(
+            f"{name:<24}{stats['requests']:>10,}{stats['errors']:>8}{stats['mean_ms']:>10.2f}"
+            f"{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}"
+        )
+
+
+def budgets(results: dict, args: argparse.Namespace) -> list[tuple[str, float, str, float | None]]:
+    """The checks asked for on the command line, in check_budgets() form"""
+    checks = [
+        ("throughput req/s", results["throughput_rps"], ">=", args.min_rps),
+        ("RSS growth MB", results["rss_growth_bytes"] / 1e6, "<=", args.max_rss_growth_mb),
+        ("errors", sum(stats["errors"] for stats in results["commands"].values()), "<=", args.max_errors),
+    ]
+    for name, stats in results["commands"].items():
+        checks.append((f"{name} p50 ms", stats["p50_ms"], "<=", args.max_p50_ms))
+        checks.append((f"{name} p99 ms", stats["p99_ms"], "<=", args.max_p99_ms))
+    return checks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=4, help="concurrent connections")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds to run")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="comma separated command=weight pairs")
+    parser.add_argument("--objects", type=int, default=1000, help="mesh objects in the fake scene")
+    parser.add_argument("--request-bytes", type=int, default=0, help="approximate size of execute_code requests")
+    parser.add_argument("--response-bytes", type=int, default=1024, help="stdout size of execute_code responses")
+    parser.add_argument("--framing", default="length", choices=addon.FRAMING_MODES)
+    parser.add_argument("--encoding", default="json", choices=sorted(addon.CODECS))
+    parser.add_argument("--compression", default=None, choices=sorted(addon.COMPRESSIONS))
+    parser.add_argument("--port", type=int, default=19877, help="TCP port to listen on")
+    parser.add_argument("--trace-memory", action="store_true", help="also measure Python heap growth with tracemalloc")
+    parser.add_argument("--json", metavar="PATH", help="write the results to this file as JSON")
+    parser.add_argument("--max-p50-ms", type=float, help="fail if any command's p50 latency is above this")
+    parser.add_argument("--max-p99-ms", type=float, help="fail if any command's p99 latency is above this")
+    parser.add_argument("--min-rps", type=float, help="fail if throughput in requests/s is below this")
+    parser.add_argument("--max-rss-growth-mb", type=float, help="fail if RSS grows by more than this")
+    parser.add_argument("--max-errors", type=int, help="fail if more commands than this return an error")
+    parser.add_argument("--verbose", action="store_true", help="keep the addon's per-command log output")
+    args = parser.parse_args()
+
+    # The addon logs every command; that alone would dominate the measurement
+    stdout = sys.stdout
+    if not args.verbose:
+        sys.stdout = open(os.devnull, "w")
+    try:
+        results = run(args)
+    finally:
+        sys.stdout = stdout
+
+    report(results)
+    passed = check_budgets(budgets(results, args))
+    if args.json:
+        results["budgets_passed"] = passed
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
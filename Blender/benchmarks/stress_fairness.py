@@ -0,0 +1,150 @@
+"""
+Fairness of the main-thread dispatcher under a flood from one client.
+
+One client pipelines execute_code commands that each hold the main thread
+for `--work-ms`, keeping up to `--flood-window` in flight and backing off
+when told the server is busy. Meanwhile `--clients` well-behaved clients
+send one get_object_info at a time. The run is repeated without the flood
+as a baseline, so the report shows how much the flood delays everyone else.
+
+Notes on reading the numbers:
+- Without a flood, requests still arrive often enough to keep the
+  dispatcher in its hot window (DISPATCH_HOT_WINDOW), so they rarely wait
+  for an idle poll (DISPATCH_IDLE_INTERVAL).
+- The flooding client runs in this same process. With a window far above
+  the queue limit, its own stream of busy responses competes for the GIL.
+
+Run from the repository root:
+
+    python Blender/benchmarks/stress_fairness.py --duration 5 --flood-window 500 --max-queued 64
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+from fake_bpy import populate
+from harness import Client, addon, bpy, run_with_server
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def run(args: argparse.Namespace, flood: bool) -> dict:
+    objects = bpy.context.scene.objects
+    server = addon.BlenderMCPServer(port=args.port, max_queued_per_client=args.max_queued)
+    latencies: list[float] = []
+    flood_stats = {"sent": 0, "completed": 0, "busy": 0, "max_depth": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def victim(index: int) -> None:
+        rng = random.Random(index)
+        client = Client.tcp(args.port)
+        samples = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.call({"type": "get_object_info", "params": {"name": rng.choice(objects).name}})
+            samples.append(time.perf_counter() - start)
+        client.close()
+        with lock:
+            latencies.extend(samples)
+
+    def flooder() -> None:
+        client = Client.tcp(args.port)
+        slots = threading.Semaphore(args.flood_window)
+        backoff = {"until": 0.0}
+        command = {"type": "execute_code", "params": {"code": f"import time; time.sleep({args.work_ms / 1000.0})"}}
+
+        def receive() -> None:
+            while True:
+                try:
+                    response = client.receive()
+                except (ConnectionError, OSError):
+                    return
+                if response.get("busy"):
+                    flood_stats["busy"] += 1
+                    backoff["until"] = time.perf_counter() + response["retry_after_ms"] / 1000.0
+                else:
+                    flood_stats["completed"] += 1
+                flood_stats["max_depth"] = max(flood_stats["max_depth"], server.dispatcher.queue_depth)
+                slots.release()
+
+        receiver = threading.Thread(target=receive, daemon=True)
+        receiver.start()
+        while not stop.is_set():
+            pause = backoff["until"] - time.perf_counter()
+            if pause > 0:
+                time.sleep(pause)
+            if slots.acquire(timeout=0.1):
+                client.send(command)
+                flood_stats["sent"] += 1
+        client.close()
+
+    def work() -> None:
+        threads = [threading.Thread(target=victim, args=(i,)) for i in range(args.clients)]
+        if flood:
+            threads.append(threading.Thread(target=flooder))
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    run_with_server(server, work)
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "mean_ms": statistics.mean(ordered) * 1000.0,
+        "p50_ms": percentile(ordered, 0.5) * 1000.0,
+        "p99_ms": percentile(ordered, 0.99) * 1000.0,
+        "max_ms": ordered[-1] * 1000.0,
+        "flood": flood_stats if flood else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=3, help="well-behaved clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per run")
+    parser.add_argument("--flood-window", type=int, default=500, help="commands the flooding client keeps in flight")
+    parser.add_argument("--work-ms", type=float, default=2.0, help="main-thread time of each flood command")
+    parser.add_argument("--max-queued", type=int, default=addon.DEFAULT_MAX_QUEUED_PER_CLIENT,
+                        help="per-client queue limit (0 = unlimited)")
+    parser.add_argument("--port", type=int, default=19878, help="TCP port to listen on")
+    args = parser.parse_args()
+
+    populate(100)
+    # The addon logs every command; that alone would dominate the measurement
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        baseline = run(args, flood=False)
+        flooded = run(args, flood=True)
+    finally:
+        sys.stdout = stdout
+
+    print(f"{args.clients} clients sending get_object_info; per-client queue limit {args.max_queued or 'unlimited'}")
+    print(f"{'run':<12}{'requests':>10}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, result in (("baseline", baseline), ("flooded", flooded)):
+        print(
+            f"{label:<12}{result['requests']:>10,}{result['mean_ms']:>10.2f}{result['p50_ms']:>10.2f}"
+            f"{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}"
+        )
+    stats = flooded["flood"]
+    print()
+    print(
+        f"flooding client: {stats['sent']:,} sent, {stats['completed']:,} completed, "
+        f"{stats['busy']:,} busy responses, deepest queue {stats['max_depth']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
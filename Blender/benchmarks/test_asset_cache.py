@@ -0,0 +1,206 @@
+"""AssetCache: hits and misses, rejected downloads, LRU eviction and verification."""
+from __future__ import annotations
+
+import functools
+import hashlib
+import http.server
+import os
+import threading
+import time
+
+import pytest
+
+from harness import Client, addon
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Web:
+    """Local HTTP server standing in for an asset provider"""
+
+    def __init__(self, root) -> None:
+        self.root = root
+        self.httpd = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(root)))
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def serve(self, name: str, data: bytes) -> str:
+        """Publish data under name; returns its URL"""
+        (self.root / name).write_bytes(data)
+        return f"http://127.0.0.1:{self.httpd.server_port}/{name}"
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def web(tmp_path):
+    root = tmp_path / "web"
+    root.mkdir()
+    web = Web(root)
+    yield web
+    web.close()
+
+
+def files_under(path) -> list[str]:
+    return sorted(name for _, _, names in os.walk(path) for name in names)
+
+
+def test_second_fetch_is_a_hit(web, tmp_path):
+    url = web.serve("sky.hdr", b"pixels" * 1000)
+    cache = addon.AssetCache(str(tmp_path / "cache"))
+    path = cache.fetch(url, "polyhaven", "sky", "1k", "hdr", suffix=".hdr")
+    assert path.endswith(".hdr")
+    (web.root / "sky.hdr").unlink()
+    assert cache.fetch(url, "polyhaven", "sky", "1k", "hdr", suffix=".hdr") == path
+    assert (cache.hits, cache.misses) == (1, 1)
+    with open(path, "rb") as f:
+        assert f.read() == b"pixels" * 1000
+
+
+def test_index_survives_a_new_cache_object(web, tmp_path):
+    url = web.serve("sky.hdr", b"pixels")
+    addon.AssetCache(str(tmp_path / "cache")).fetch(url, "polyhaven", "sky")
+    cache = addon.AssetCache(str(tmp_path / "cache"))
+    cache.fetch(url, "polyhaven", "sky")
+    assert cache.hits == 1
+
+
+def test_same_content_under_two_keys_is_stored_once(web, tmp_path):
+    url = web.serve("wood.png", b"grain" * 100)
+    cache = addon.AssetCache(str(tmp_path / "cache"))
+    first = cache.fetch(url, "polyhaven", "wood", "1k", "png", variant="diffuse")
+    second = cache.fetch(url, "polyhaven", "planks", "1k", "png", variant="diffuse")
+    assert first == second
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] == 500
+
+
+@pytest.mark.parametrize("check", [
+    {"size": 999},
+    {"md5": "0" * 32},
+    {"validate": lambda path: False},
+])
+def test_rejected_download_leaves_nothing_behind(web, tmp_path, check):
+    url = web.serve("model.glb", b"glTF" * 10)
+    cache = addon.AssetCache(str(tmp_path / "cache"))
+    with pytest.raises(ValueError):
+        cache.fetch(url, "sketchfab", "model", suffix=".glb", **check)
+    assert files_under(tmp_path / "cache") == []
+    assert cache.stats()["entries"] == 0
+
+
+def test_cancelled_download_removes_its_partial_file(web, tmp_path):
+    url = web.serve("big.glb", os.urandom(3 * addon.CACHE_CHUNK_SIZE))
+    cache = addon.AssetCache(str(tmp_path / "cache"))
+
+    def check():
+        raise addon.CommandCancelled("Cancelled by client")
+
+    with pytest.raises(addon.CommandCancelled):
+        cache.fetch(url, "sketchfab", "big", suffix=".glb", check=check)
+    assert files_under(tmp_path / "cache") == []
+
+
+def test_changed_size_or_md5_downloads_again(web, tmp_path):
+    data = b"v1" * 50
+    url = web.serve("sky.hdr", data)
+    cache = addon.AssetCache(str(tmp_path / "cache"))
+    cache.fetch(url, "polyhaven", "sky", size=len(data), md5=hashlib.md5(data).hexdigest())
+    data = b"v2" * 60
+    web.serve("sky.hdr", data)
+    path = cache.fetch(url, "polyhaven", "sky", size=len(data), md5=hashlib.md5(data).hexdigest())
+    assert (cache.hits, cache.misses) == (0, 2)
+    with open(path, "rb") as f:
+        assert f.read() == data
+    # The old blob is gone with its entry
+    assert len(files_under(tmp_path / "cache" / "blobs")) == 1
+
+
+def test_least_recently_used_entries_are_evicted(web, tmp_path):
+    cache = addon.AssetCache(str(tmp_path / "cache"), max_bytes=250)
+    urls = {name: web.serve(name, name.encode() * 100) for name in ("a", "b", "c")}
+    cache.fetch(urls["a"], "polyhaven", "a")
+    cache.fetch(urls["b"], "polyhaven", "b")
+    cache.fetch(urls["a"], "polyhaven", "a")  # a is now more recent than b
+    cache.fetch(urls["c"], "polyhaven", "c")
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= 250
+    cache.fetch(urls["a"], "polyhaven", "a")
+    assert cache.hits == 2
+    cache.fetch(urls["b"], "polyhaven", "b")
+    assert cache.misses == 4
+
+
+def test_entry_larger_than_the_cache_is_still_returned(web, tmp_path):
+    url = web.serve("huge", b"x" * 1000)
+    cache = addon.AssetCache(str(tmp_path / "cache"), max_bytes=10)
+    path = cache.fetch(url, "polyhaven", "huge")
+    assert os.path.getsize(path) == 1000
+
+
+def test_truncated_blob_is_not_served(web, tmp_path):
+    url = web.serve("sky.hdr", b"pixels" * 100)
+    cache = addon.AssetCache(str(tmp_path / "cache"))
+    path = cache.fetch(url, "polyhaven", "sky")
+    with open(path, "r+b") as f:
+        f.truncate(10)
+    path = cache.fetch(url, "polyhaven", "sky")
+    assert cache.hits == 0
+    assert os.path.getsize(path) == 600
+
+
+def test_verify_drops_corrupt_entries_and_orphans(web, tmp_path):
+    cache = addon.AssetCache(str(tmp_path / "cache"))
+    good = cache.fetch(web.serve("good", b"good" * 10), "polyhaven", "good")
+    bad = cache.fetch(web.serve("bad", b"bad!" * 10), "sketchfab", "bad")
+    with open(bad, "r+b") as f:
+        f.write(b"BAD!")
+    orphan = tmp_path / "cache" / "blobs" / "zz" / "orphan.bin"
+    orphan.parent.mkdir(parents=True)
+    orphan.write_bytes(b"left over")
+    abandoned = tmp_path / "cache" / "partial" / "abandoned.glb"
+    abandoned.write_bytes(b"half")
+
+    stats = cache.stats(verify=True)
+    assert stats["corrupt"] == 1
+    assert stats["orphans_removed"] == 2
+    assert stats["entries"] == 1
+    assert set(stats["providers"]) == {"polyhaven"}
+    assert os.path.exists(good)
+    assert not os.path.exists(bad)
+    assert not orphan.exists() and not abandoned.exists()
+
+
+def test_purge_by_provider(web, tmp_path):
+    cache = addon.AssetCache(str(tmp_path / "cache"))
+    cache.fetch(web.serve("a", b"a" * 10), "polyhaven", "a")
+    cache.fetch(web.serve("b", b"b" * 20), "sketchfab", "b")
+    assert cache.purge(provider="sketchfab") == {"removed": 1, "freed_bytes": 20}
+    assert cache.stats()["providers"] == {"polyhaven": {"entries": 1, "bytes": 10}}
+    assert cache.purge()["removed"] == 1
+    assert files_under(tmp_path / "cache" / "blobs") == []
+
+
+def test_verify_does_not_hold_up_other_commands(start_server, tmp_path):
+    server = start_server(cache_dir=str(tmp_path / "cache"))
+    verify = server.assets.verify
+    server.assets.verify = lambda: (time.sleep(1.0), verify())[1]
+    client = Client.unix(server.socket_path)
+    client.sock.settimeout(5)
+    try:
+        client.send({"type": "get_cache_stats", "params": {"verify": True}, "id": "stats"})
+        started = time.perf_counter()
+        client.send({"type": "get_dispatcher_stats", "id": "dispatcher"})
+        first = client.receive()
+        assert first["id"] == "dispatcher"
+        assert time.perf_counter() - started < 0.5
+        second = client.receive()
+        assert second["id"] == "stats" and second["result"]["corrupt"] == 0
+    finally:
+        client.close()
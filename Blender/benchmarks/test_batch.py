@@ -0,0 +1,57 @@
+"""batch: per-command responses, counting failures and stop_on_error."""
+from __future__ import annotations
+
+import pytest
+
+
+@pytest.fixture
+def server(server, empty_scene):
+    empty_scene.blendermcp_use_polyhaven = True
+    server.refresh_commands(empty_scene)
+    yield server
+    empty_scene.blendermcp_use_polyhaven = False
+
+
+COMMANDS = [
+    {"type": "execute_code", "params": {"code": "print('first')"}},
+    {"type": "no_such_command"},
+    # Handlers that catch their own errors report them in a successful result
+    {"type": "get_polyhaven_categories", "params": {"asset_type": "nonsense"}},
+    {"type": "execute_code", "params": {"code": "print('last')"}},
+]
+
+
+def test_failures_are_counted_and_the_rest_still_run(server):
+    result = server.batch(COMMANDS)
+    assert [response["status"] for response in result["results"]] == ["success", "error", "success", "success"]
+    assert "error" in result["results"][2]["result"]
+    assert result["results"][3]["result"]["result"] == "last\n"
+    assert (result["completed"], result["failed"], result["stopped"]) == (4, 2, False)
+
+
+@pytest.mark.parametrize("commands, completed", [
+    (COMMANDS, 2),
+    ([COMMANDS[0], COMMANDS[2], COMMANDS[3]], 2),
+])
+def test_stop_on_error_stops_at_the_first_failure(server, commands, completed):
+    result = server.batch(commands, stop_on_error=True)
+    assert (result["completed"], result["failed"], result["stopped"]) == (completed, 1, True)
+    assert len(result["results"]) == completed
+
+
+def test_generator_scripts_run_to_the_end_inside_the_batch(server):
+    result = server.batch([{"type": "execute_code", "params": {"code": "yield 1\nprint('done')"}}])
+    assert result["results"][0]["status"] == "success"
+    assert result["results"][0]["result"]["result"] == "done\n"
+
+
+def test_bad_entries_fail_without_stopping_the_batch(server):
+    result = server.batch(["execute_code", {"type": "batch", "params": {"commands": []}}, COMMANDS[0]])
+    assert [response["status"] for response in result["results"]] == ["error", "error", "success"]
+    assert "Nested batch" in result["results"][1]["message"]
+    assert result["failed"] == 2
+
+
+def test_commands_must_be_a_list(server):
+    with pytest.raises(ValueError):
+        server.batch({"type": "execute_code"})
@@ -0,0 +1,68 @@
+"""world_bounds and get_bounds, per object and in bulk, checked against transforming each corner."""
+from __future__ import annotations
+
+import pytest
+
+from fake_bpy import Vector, populate
+from harness import addon, bpy
+
+
+def brute_bounds(obj) -> list[list[float]]:
+    corners = [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
+    return [[min(c[i] for c in corners) for i in range(3)], [max(c[i] for c in corners) for i in range(3)]]
+
+
+def assert_boxes_equal(actual, expected) -> None:
+    for side in range(2):
+        assert actual[side] == pytest.approx(expected[side])
+
+
+@pytest.fixture(params=[addon.BULK_BOUNDS_THRESHOLD // 2, addon.BULK_BOUNDS_THRESHOLD * 2],
+                ids=["per-object", "bulk"])
+def objects(request):
+    objects = populate(request.param)
+    # Off-centre, uneven bound boxes so a mix-up of corners or axes shows
+    for i, obj in enumerate(objects):
+        obj.bound_box = [(x * (1 + i % 3), y - 0.5, z * 0.25 + i % 2) for x, y, z in obj.bound_box]
+    return objects
+
+
+def test_world_bounds_match_every_corner_transformed(objects):
+    mins, maxs = addon.world_bounds(objects, bpy.context.scene.objects)
+    assert mins.shape == maxs.shape == (len(objects), 3)
+    for obj, lo, hi in zip(objects, mins.tolist(), maxs.tolist()):
+        assert_boxes_equal([lo, hi], brute_bounds(obj))
+
+
+def test_world_bounds_of_a_subset_keep_its_order(objects):
+    subset = objects[::-2]
+    mins, maxs = addon.world_bounds(subset, bpy.data.objects)
+    for obj, lo, hi in zip(subset, mins.tolist(), maxs.tolist()):
+        assert_boxes_equal([lo, hi], brute_bounds(obj))
+
+
+def test_get_bounds_of_the_scene(server, objects):
+    result = server.get_bounds()
+    assert result["count"] == len(objects)
+    assert result["missing"] == []
+    boxes = [brute_bounds(obj) for obj in objects]
+    for obj, box in zip(objects, boxes):
+        assert_boxes_equal(result["objects"][obj.name], box)
+    assert_boxes_equal(result["combined"], [
+        [min(box[0][i] for box in boxes) for i in range(3)],
+        [max(box[1][i] for box in boxes) for i in range(3)],
+    ])
+
+
+def test_get_bounds_by_name_reports_missing_objects(server, objects):
+    result = server.get_bounds(names=[objects[3].name, "Nowhere"], include_objects=False)
+    assert result["count"] == 1
+    assert result["missing"] == ["Nowhere"]
+    assert "objects" not in result
+    assert_boxes_equal(result["combined"], brute_bounds(objects[3]))
+
+
+def test_no_objects_have_no_bounds(server):
+    mins, maxs = addon.world_bounds([])
+    assert mins.shape == maxs.shape == (0, 3)
+    assert server.get_bounds()["combined"] is None
@@ -0,0 +1,104 @@
+"""Cancelling requests: the cancel command, deadline_ms and work abandoned by a disconnect."""
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from harness import Client, addon, bpy
+
+SLOW = {"type": "execute_code", "params": {"code": "import time; time.sleep(0.3)"}, "id": "slow"}
+
+
+@pytest.fixture
+def client(start_server):
+    server = start_server()
+    client = Client.unix(server.socket_path)
+    client.sock.settimeout(5)
+    client.server = server
+    yield client
+    client.close()
+
+
+def replies(client: Client, count: int) -> dict:
+    """The next `count` final replies by id, skipping script progress"""
+    found = {}
+    while len(found) < count:
+        reply = client.receive()
+        if reply["status"] != "progress":
+            found[reply["id"]] = reply
+    return found
+
+
+def test_token_reports_the_first_reason():
+    token = addon.CancelToken("job")
+    assert not token.cancelled
+    token.cancel()
+    token.cancel("abandoned: client disconnected")
+    with pytest.raises(addon.CommandCancelled, match="Request job cancelled by client"):
+        token.check()
+
+
+def test_token_expires_at_its_deadline():
+    token = addon.CancelToken("job", deadline_ms=10)
+    assert not token.cancelled
+    time.sleep(0.02)
+    assert token.cancelled
+    assert token.message == "Request job exceeded its deadline"
+
+
+def test_queued_request_is_dropped(client):
+    client.send(SLOW)
+    client.send({"type": "execute_code", "params": {"code": "print('ran')"}, "id": "queued"})
+    client.send({"type": "cancel", "params": {"id": "queued"}, "id": "cancel"})
+    found = replies(client, 3)
+    assert found["cancel"]["result"] == {"id": "queued", "found": True, "state": "queued"}
+    assert found["queued"]["cancelled"] is True
+    assert found["slow"]["status"] == "success"
+
+
+def test_running_script_stops_at_its_next_slice(client):
+    code = "import time\nwhile True:\n    time.sleep(0.005)\n    yield"
+    client.send({"type": "execute_code", "params": {"code": code}, "id": "loop"})
+    while client.server.dispatcher.stats()["processed"] < 2:
+        time.sleep(0.005)
+    client.send({"type": "cancel", "params": {"id": "loop"}, "id": "cancel"})
+    found = replies(client, 2)
+    assert found["cancel"]["result"]["state"] == "running"
+    assert found["loop"]["cancelled"] is True
+    assert found["loop"]["message"] == "Request loop cancelled by client"
+
+
+def test_cancelling_an_unknown_request(client):
+    response = client.call({"type": "cancel", "params": {"id": "nothing"}})
+    assert response["result"] == {"id": "nothing", "found": False}
+    response = client.call({"type": "cancel", "params": {}})
+    assert response["status"] == "error"
+
+
+def test_request_past_its_deadline_is_not_run(client):
+    client.send(SLOW)
+    client.send({"type": "execute_code", "params": {"code": "print('ran')"}, "id": "late", "deadline_ms": 50})
+    found = replies(client, 2)
+    assert found["late"]["cancelled"] is True
+    assert found["late"]["message"] == "Request late exceeded its deadline"
+
+
+def test_deadline_must_be_a_number(client):
+    response = client.call({"type": "get_scene_info", "deadline_ms": "soon"})
+    assert response == {"status": "error", "message": "deadline_ms must be a number"}
+
+
+def test_work_of_a_disconnected_client_is_abandoned(client, empty_scene):
+    client.send(SLOW)
+    client.send({"type": "execute_code", "params": {"code": "import bpy; bpy.context.scene.name = 'Ran'"}})
+    client.close()
+    dispatcher = client.server.dispatcher
+    deadline = time.perf_counter() + 5
+    while dispatcher.stats()["processed"] < 2 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    try:
+        assert dispatcher.stats()["processed"] == 2
+        assert bpy.context.scene.name == "Scene"
+    finally:
+        empty_scene.name = "Scene"
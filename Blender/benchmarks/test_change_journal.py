@@ -0,0 +1,115 @@
+"""ChangeJournal: additions, removals and edits since a version, capacity limits and epochs."""
+from __future__ import annotations
+
+import types
+
+import pytest
+
+from fake_bpy import FakeObject
+from harness import addon, bpy
+
+
+def add_object(name: str) -> FakeObject:
+    obj = FakeObject(name)
+    bpy.data.objects.new(obj)
+    bpy.context.scene.objects.append(obj)
+    return obj
+
+
+def remove_object(obj: FakeObject) -> None:
+    del bpy.data.objects[obj.name]
+    bpy.context.scene.objects.remove(obj)
+
+
+def depsgraph(*objects: FakeObject, **flags: bool):
+    """A depsgraph update listing the objects, with is_updated_<flag> set as given"""
+    updates = [
+        types.SimpleNamespace(id=types.SimpleNamespace(id_type="OBJECT", name=obj.name),
+                              **{f"is_updated_{flag}": value for flag, value in flags.items()})
+        for obj in objects
+    ]
+    return types.SimpleNamespace(updates=updates)
+
+
+@pytest.fixture
+def journal() -> addon.ChangeJournal:
+    journal = addon.ChangeJournal()
+    journal.snapshot()
+    return journal
+
+
+def changes(journal: addon.ChangeJournal, version: int) -> list[tuple[str, str, list[str]]]:
+    delta = journal.since(version)
+    assert not delta["resync"]
+    return [(change["name"], change["change"], change["updates"]) for change in delta["changes"]]
+
+
+def test_first_call_returns_current_version_without_changes(journal):
+    add_object("Cube")
+    journal.on_depsgraph_update(depsgraph())
+    assert journal.since(None) == {"version": journal.version, "resync": False, "changes": []}
+
+
+def test_added_modified_and_removed(journal):
+    cube = add_object("Cube")
+    journal.on_depsgraph_update(depsgraph(cube))
+    assert changes(journal, 0) == [("Cube", "added", [])]
+
+    seen = journal.version
+    journal.on_depsgraph_update(depsgraph(cube, transform=True))
+    assert changes(journal, seen) == [("Cube", "modified", ["transform"])]
+
+    seen = journal.version
+    remove_object(cube)
+    journal.on_undo_redo()
+    assert changes(journal, seen) == [("Cube", "removed", [])]
+
+
+def test_repeated_edits_cost_one_entry(journal):
+    cube = add_object("Cube")
+    journal.on_depsgraph_update(depsgraph(cube))
+    seen = journal.version
+    for _ in range(100):
+        journal.on_depsgraph_update(depsgraph(cube, transform=True))
+    journal.on_depsgraph_update(depsgraph(cube, geometry=True))
+    assert changes(journal, seen) == [("Cube", "modified", ["geometry", "transform"])]
+
+
+def test_object_that_came_and_went_is_not_reported(journal):
+    seen = journal.version
+    cube = add_object("Cube")
+    journal.on_depsgraph_update(depsgraph(cube))
+    remove_object(cube)
+    journal.on_undo_redo()
+    assert changes(journal, seen) == []
+
+
+def test_versions_past_capacity_need_a_resync(journal):
+    journal.capacity = 3
+    seen = journal.version
+    objects = [add_object(f"Object.{i}") for i in range(5)]
+    journal.on_depsgraph_update(depsgraph(*objects))
+    assert journal.since(seen)["resync"]
+    # A client that saw the journal recently is still covered
+    recent = journal.version
+    journal.on_depsgraph_update(depsgraph(objects[0], transform=True))
+    assert changes(journal, recent) == [("Object.0", "modified", ["transform"])]
+
+
+def test_reset_forces_every_client_to_resync(journal):
+    seen = journal.version
+    journal.reset()
+    assert journal.since(seen)["resync"]
+    assert not journal.since(journal.version)["resync"]
+
+
+def test_versions_from_another_epoch_resync(journal):
+    seen = journal.version
+    assert not journal.since(seen, journal.epoch)["resync"]
+    assert journal.since(seen, "0" * 8)["resync"]
+    assert addon.ChangeJournal().epoch != journal.epoch
+    assert journal.token(7) == f"{journal.epoch}:7"
+
+
+def test_versions_from_the_future_resync(journal):
+    assert journal.since(journal.version + 1)["resync"]
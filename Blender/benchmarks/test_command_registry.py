@@ -0,0 +1,63 @@
+"""CommandRegistry: commands following the provider toggles, and disabled or unknown commands."""
+from __future__ import annotations
+
+import pytest
+
+from harness import addon, bpy
+
+
+def enabled(server) -> set[str]:
+    return {command["name"] for command in server.list_commands()["commands"]}
+
+
+def test_provider_commands_follow_the_scene_toggles(server, empty_scene):
+    server.refresh_commands(empty_scene)
+    assert "get_scene_info" in enabled(server)
+    assert "get_polyhaven_categories" not in enabled(server)
+    assert server.list_commands()["enabled_providers"] == []
+
+    empty_scene.blendermcp_use_polyhaven = True
+    try:
+        server.refresh_commands(empty_scene)
+        assert "get_polyhaven_categories" in enabled(server)
+        assert "search_sketchfab_models" not in enabled(server)
+        assert server.list_commands()["enabled_providers"] == ["polyhaven"]
+    finally:
+        empty_scene.blendermcp_use_polyhaven = False
+
+
+def test_toggle_callback_refreshes_the_running_server(server, empty_scene, monkeypatch):
+    server.refresh_commands(empty_scene)
+    monkeypatch.setattr(bpy.types, "blendermcp_server", server, raising=False)
+    empty_scene.blendermcp_use_sketchfab = True
+    try:
+        addon._on_provider_toggle(empty_scene, bpy.context)
+        assert "search_sketchfab_models" in enabled(server)
+    finally:
+        empty_scene.blendermcp_use_sketchfab = False
+    addon._on_provider_toggle(empty_scene, bpy.context)
+    assert "search_sketchfab_models" not in enabled(server)
+
+
+def test_disabled_command_names_its_integration(server, empty_scene):
+    server.refresh_commands(empty_scene)
+    response = server.execute_command({"type": "get_polyhaven_categories", "params": {"asset_type": "hdris"}})
+    assert response == {
+        "status": "error",
+        "message": "Command get_polyhaven_categories requires the polyhaven integration to be enabled",
+    }
+    response = server.execute_command({"type": "no_such_command"})
+    assert response == {"status": "error", "message": "Unknown command type: no_such_command"}
+
+
+def test_disabled_commands_are_listed_on_request(server, empty_scene):
+    server.refresh_commands(empty_scene)
+    commands = {command["name"]: command for command in server.list_commands(include_disabled=True)["commands"]}
+    assert commands["get_polyhaven_categories"]["enabled"] is False
+    assert commands["get_polyhaven_categories"]["provider"] == "polyhaven"
+    assert commands["get_scene_info"]["enabled"] is True
+
+
+def test_unknown_provider_is_refused():
+    with pytest.raises(ValueError):
+        addon.mcp_command(provider="nowhere")
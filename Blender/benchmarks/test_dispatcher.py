@@ -0,0 +1,139 @@
+"""MainThreadDispatcher: per-tick budget, hot window, fairness between clients and surviving work that raises."""
+from __future__ import annotations
+
+import socket
+import time
+
+import pytest
+
+from harness import Client, addon
+
+
+def test_work_runs_in_submission_order_within_the_budget():
+    dispatcher = addon.MainThreadDispatcher(budget_ms=1000)
+    ran = []
+    for i in range(5):
+        dispatcher.submit(lambda i=i: ran.append(i))
+    dispatcher._tick()
+    assert ran == [0, 1, 2, 3, 4]
+    assert dispatcher.stats()["queue_depth"] == 0
+
+
+def test_tick_yields_once_the_budget_is_spent():
+    dispatcher = addon.MainThreadDispatcher(budget_ms=5)
+    ran = []
+    for i in range(10):
+        dispatcher.submit(lambda i=i: (time.sleep(0.003), ran.append(i)))
+    assert dispatcher._tick() == 0.0  # work is left, so come straight back
+    assert 1 <= len(ran) < 10
+    while len(ran) < 10:
+        dispatcher._tick()
+    assert ran == list(range(10))
+
+
+def test_work_longer_than_the_budget_counts_an_overrun():
+    dispatcher = addon.MainThreadDispatcher(budget_ms=1)
+    dispatcher.submit(lambda: time.sleep(0.005))
+    dispatcher.submit(lambda: None)
+    dispatcher._tick()
+    stats = dispatcher.stats()
+    assert (stats["processed"], stats["ticks"], stats["budget_overruns"]) == (1, 1, 1)
+    dispatcher._tick()
+    assert dispatcher.stats()["budget_overruns"] == 1
+
+
+def test_tick_stays_hot_after_work_then_polls_lazily():
+    dispatcher = addon.MainThreadDispatcher()
+    assert dispatcher._tick() == dispatcher.idle_interval
+    dispatcher.submit(lambda: None)
+    assert dispatcher._tick() == 0.0
+    dispatcher._last_submit -= addon.DISPATCH_HOT_WINDOW
+    assert dispatcher._tick() == dispatcher.idle_interval
+
+
+def test_clients_are_served_in_turn():
+    dispatcher = addon.MainThreadDispatcher(budget_ms=1000)
+    ran = []
+    for i in range(3):
+        dispatcher.submit(lambda i=i: ran.append(("flood", i)), client="flood")
+    for i in range(2):
+        dispatcher.submit(lambda i=i: ran.append(("quiet", i)), client="quiet")
+    dispatcher._tick()
+    assert ran == [("flood", 0), ("quiet", 0), ("flood", 1), ("quiet", 1), ("flood", 2)]
+
+
+def test_client_over_its_limit_is_refused_with_a_retry_hint():
+    dispatcher = addon.MainThreadDispatcher(max_queued_per_client=2)
+    dispatcher.submit(lambda: None, client="a")
+    dispatcher.submit(lambda: None, client="a")
+    with pytest.raises(addon.QueueFull) as refused:
+        dispatcher.submit(lambda: None, client="a")
+    assert refused.value.depth == 2
+    assert addon.MIN_RETRY_AFTER_MS <= refused.value.retry_after_ms <= addon.MAX_RETRY_AFTER_MS
+    # Other clients and the addon's own work still get in
+    dispatcher.submit(lambda: None, client="b")
+    for _ in range(5):
+        dispatcher.submit(lambda: None)
+    stats = dispatcher.stats()
+    assert stats["rejected"] == 1
+    assert stats["queue_depth"] == 8
+    assert stats["clients_waiting"] == 3
+
+
+def test_zero_limit_queues_without_bound():
+    dispatcher = addon.MainThreadDispatcher(max_queued_per_client=0)
+    for _ in range(1000):
+        dispatcher.submit(lambda: None, client="a")
+    assert dispatcher.client_depth("a") == 1000
+    assert dispatcher.stats()["rejected"] == 0
+
+
+def test_busy_client_gets_a_reply_saying_when_to_retry(start_server):
+    server = start_server(max_queued_per_client=1)
+    client = Client.unix(server.socket_path)
+    client.sock.settimeout(5)
+    try:
+        submitted = server.dispatcher._last_submit
+        client.send({"type": "execute_code", "params": {"code": "import time; time.sleep(0.5)"}, "id": "slow"})
+        # Wait for the slow command to start running, leaving the queue empty
+        while server.dispatcher._last_submit == submitted or server.dispatcher.queue_depth:
+            time.sleep(0.001)
+        client.send({"type": "get_scene_info", "id": "queued"})
+        client.send({"type": "get_scene_info", "id": "refused"})
+        replies = {reply["id"]: reply for reply in (client.receive() for _ in range(3))}
+        assert replies["refused"]["status"] == "error"
+        assert replies["refused"]["busy"] is True
+        assert replies["refused"]["retry_after_ms"] >= addon.MIN_RETRY_AFTER_MS
+        assert replies["slow"]["status"] == "success"
+        assert replies["queued"]["status"] == "success"
+    finally:
+        client.close()
+
+
+def test_work_raising_system_exit_does_not_escape_the_tick():
+    dispatcher = addon.MainThreadDispatcher()
+    ran = []
+
+    def exit_():
+        raise SystemExit(1)
+
+    dispatcher.submit(exit_)
+    dispatcher.submit(lambda: ran.append("next"))
+    dispatcher._tick()
+    assert ran == ["next"]
+
+
+def test_sys_exit_in_execute_code_gets_an_error_reply(start_server):
+    server = start_server()
+    client = Client.unix(server.socket_path)
+    client.sock.settimeout(5)
+    try:
+        response = client.call({"type": "execute_code", "params": {"code": "import sys; sys.exit(3)"}})
+        assert response["status"] == "error"
+        assert "SystemExit" in response["message"]
+        # The dispatcher timer is still alive for the next command
+        assert client.call({"type": "get_scene_info"})["status"] == "success"
+    except socket.timeout:
+        raise AssertionError("The server stopped answering") from None
+    finally:
+        client.close()
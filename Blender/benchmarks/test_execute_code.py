@@ -0,0 +1,132 @@
+"""_compile_script, CodeCache and OutputSink behind execute_code."""
+from __future__ import annotations
+
+from harness import Client, addon
+
+
+def run_script(source: str, namespace: dict | None = None) -> tuple[dict, list]:
+    """Run a script the way execute_code does; returns its namespace and what it yielded"""
+    namespace = {} if namespace is None else namespace
+    code, is_generator = addon._compile_script(source, "<test>")
+    exec(code, namespace)
+    yielded = list(namespace.pop(addon.SCRIPT_FUNCTION)()) if is_generator else []
+    return namespace, yielded
+
+
+def test_plain_script_is_not_a_generator():
+    code, is_generator = addon._compile_script("x = 1", "<test>")
+    assert not is_generator
+    namespace = {}
+    exec(code, namespace)
+    assert namespace["x"] == 1
+
+
+def test_yield_in_nested_scope_keeps_a_plain_script():
+    source = "def gen():\n    yield 1\nclass C:\n    f = lambda self: (yield)\nvalues = list(gen())"
+    _, is_generator = addon._compile_script(source, "<test>")
+    assert not is_generator
+    namespace, _ = run_script(source)
+    assert namespace["values"] == [1]
+
+
+def test_top_level_yield_binds_the_same_globals_as_a_plain_script():
+    source = (
+        "import os.path\n"
+        "from math import pi as PI\n"
+        "total = 0\n"
+        "for i in range(3):\n"
+        "    total += i\n"
+        "    yield i\n"
+        "def helper():\n"
+        "    return total\n"
+        "try:\n"
+        "    raise ValueError('x')\n"
+        "except ValueError as err:\n"
+        "    message = str(err)\n"
+        "a, (b, c) = 1, (2, 3)\n"
+        "del a\n"
+    )
+    namespace, yielded = run_script(source)
+    assert yielded == [0, 1, 2]
+    assert namespace["total"] == 3
+    assert namespace["helper"]() == 3
+    assert namespace["os"].path is not None
+    assert namespace["PI"] > 3
+    assert namespace["message"] == "x"
+    assert (namespace["b"], namespace["c"]) == (2, 3)
+    assert "a" not in namespace
+    assert "i" in namespace
+
+
+def test_generator_script_reads_existing_session_variables():
+    namespace, yielded = run_script("yield count\ncount += 1", {"count": 41})
+    assert yielded == [41]
+    assert namespace["count"] == 42
+
+
+def test_generator_script_raising_system_exit_gets_an_error_reply(start_server):
+    server = start_server()
+    client = Client.unix(server.socket_path)
+    client.sock.settimeout(5)
+    try:
+        code = "import sys\ntry:\n    yield 1\n    sys.exit(2)\nfinally:\n    print('cleaned up')\n"
+        response = client.call({"type": "execute_code", "params": {"code": code}})
+        assert response["status"] == "error"
+        assert "SystemExit" in response["message"]
+        # Later slices and commands still run
+        response = client.call({"type": "execute_code", "params": {"code": "yield 1\nprint('again')"}})
+        assert response["result"]["result"] == "again\n"
+    finally:
+        client.close()
+
+
+def test_code_cache_reuses_compiled_scripts():
+    cache = addon.CodeCache(capacity=2)
+    first = cache.compile("x = 1")
+    assert cache.compile("x = 1") is first
+    cache.compile("x = 2")
+    cache.compile("x = 3")
+    assert (cache.hits, cache.misses) == (1, 3)
+    # "x = 1" was the least recently used of three and has been dropped
+    assert cache.compile("x = 1") is not first
+
+
+def test_output_sink_keeps_output_for_the_reply():
+    sink = addon.OutputSink()
+    assert sink.write("hello ") == 6
+    sink.write("world")
+    assert sink.finish() == "hello world"
+
+
+def test_output_sink_truncates_past_the_limit():
+    sink = addon.OutputSink(limit=10)
+    assert sink.write("x" * 25) == 25
+    sink.write("more")
+    assert sink.written == 10
+    assert sink.dropped == 19
+    assert sink.finish() == "x" * 10 + "\n[output truncated: 19 more characters]\n"
+
+
+def test_output_sink_streams_chunks_with_offsets():
+    emitted = []
+    sink = addon.OutputSink(emit=lambda chunk, offset: emitted.append((offset, chunk)))
+    big = "y" * addon.OUTPUT_CHUNK_SIZE
+    sink.write("a")
+    sink.write(big)
+    sink.write("tail")
+    assert sink.finish() == ""
+    assert "".join(chunk for _, chunk in emitted) == "a" + big + "tail"
+    # Each chunk says where it starts, however the writes were grouped
+    starts = [0]
+    for _, chunk in emitted[:-1]:
+        starts.append(starts[-1] + len(chunk))
+    assert [offset for offset, _ in emitted] == starts
+    assert len(emitted) >= 2
+
+
+def test_output_sink_sends_nothing_on_close():
+    emitted = []
+    sink = addon.OutputSink(emit=lambda chunk, offset: emitted.append(chunk))
+    sink.write("late")
+    sink.close()
+    assert emitted == []
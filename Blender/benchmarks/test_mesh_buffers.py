@@ -0,0 +1,93 @@
+"""get_mesh_buffers: dtype, shape and contents of each buffer, in local and world space."""
+from __future__ import annotations
+
+import base64
+
+import numpy as np
+import pytest
+
+from fake_bpy import FakeMesh, FakeObject
+from harness import Client, addon, bpy
+
+
+@pytest.fixture
+def grid() -> FakeObject:
+    obj = FakeObject("Grid", location=(10.0, 0.0, 0.0), scale=(2.0, 2.0, 2.0))
+    obj.data = FakeMesh.grid("Grid", columns=3, rows=2)
+    bpy.data.objects.new(obj)
+    bpy.context.scene.objects.append(obj)
+    return obj
+
+
+def array(buffer: dict) -> np.ndarray:
+    data = buffer["data"]
+    data = data.data if isinstance(data, addon.Attachment) else base64.b64decode(data)
+    return np.frombuffer(data, dtype=np.dtype(buffer["dtype"]).newbyteorder("<")).reshape(buffer["shape"])
+
+
+def test_buffers_have_their_documented_dtype_and_shape(server, grid):
+    result = server.get_mesh_buffers("Grid")
+    assert (result["vertex_count"], result["loop_count"], result["triangle_count"]) == (12, 24, 12)
+    shapes = {name: (buffer["dtype"], buffer["shape"]) for name, buffer in result["buffers"].items()}
+    assert shapes == {
+        "positions": ("float32", [12, 3]),
+        "normals": ("float32", [12, 3]),
+        "uvs": ("float32", [24, 2]),
+        "triangles": ("int32", [12, 3]),
+        "triangle_loops": ("int32", [12, 3]),
+    }
+    for buffer in result["buffers"].values():
+        assert buffer["data"].size == np.prod(buffer["shape"]) * 4
+
+
+def test_buffers_hold_the_mesh(server, grid):
+    buffers = server.get_mesh_buffers("Grid")["buffers"]
+    mesh = grid.data
+    assert array(buffers["positions"]).tolist() == [list(v.co) for v in mesh.vertices]
+    assert array(buffers["triangles"]).tolist() == [list(t.vertices) for t in mesh.loop_triangles]
+    # Each triangle corner's loop belongs to that corner's vertex
+    loops = array(buffers["triangle_loops"])
+    vertex_of_loop = np.array([loop.vertex_index for loop in mesh.loops])
+    assert (vertex_of_loop[loops] == array(buffers["triangles"])).all()
+    assert array(buffers["uvs"]) == pytest.approx(np.array([uv.uv for uv in mesh.uv_layers.active.data]))
+
+
+def test_world_space_moves_positions_and_keeps_normals_unit(server, grid):
+    local = array(server.get_mesh_buffers("Grid")["buffers"]["positions"])
+    result = server.get_mesh_buffers("Grid", attributes=["positions", "normals"], world_space=True)
+    assert result["space"] == "world"
+    assert set(result["buffers"]) == {"positions", "normals"}
+    assert result["triangle_count"] is None
+    assert array(result["buffers"]["positions"]) == pytest.approx(local * 2.0 + [10.0, 0.0, 0.0])
+    assert array(result["buffers"]["normals"]).tolist() == [[0.0, 0.0, 1.0]] * 12
+
+
+def test_evaluated_mesh_is_read_too(server, grid):
+    result = server.get_mesh_buffers("Grid", attributes=["triangles"], evaluated=True)
+    assert result["evaluated"] is True
+    assert result["buffers"]["triangles"]["shape"] == [12, 3]
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"name": "Nowhere"}, "Object not found"),
+    ({"name": "Grid", "attributes": ["colors"]}, "Unknown mesh attributes: colors"),
+    ({"name": "Lamp"}, "Object is not a mesh"),
+])
+def test_bad_requests_are_refused(server, grid, kwargs, message):
+    lamp = FakeObject("Lamp", obj_type="LIGHT")
+    bpy.data.objects.new(lamp)
+    with pytest.raises(ValueError, match=message):
+        server.get_mesh_buffers(**kwargs)
+
+
+def test_buffers_arrive_as_base64_without_attachments(start_server, grid):
+    server = start_server()
+    client = Client.unix(server.socket_path)
+    client.sock.settimeout(5)
+    try:
+        result = client.call({"type": "get_mesh_buffers", "params": {"name": "Grid", "attributes": ["positions"]}})
+        positions = result["result"]["buffers"]["positions"]
+        assert isinstance(positions["data"], str)
+        assert array(positions).tolist() == [list(v.co) for v in grid.data.vertices]
+    finally:
+        client.close()
@@ -0,0 +1,50 @@
+"""Histogram buckets and quantiles behind get_server_stats."""
+from __future__ import annotations
+
+from harness import addon
+
+
+def test_empty_histogram_summary_is_zero():
+    summary = addon.Histogram(addon.DURATION_BUCKETS).summary()
+    assert summary == {"count": 0, "avg": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+
+
+def test_values_land_in_the_bucket_of_their_upper_edge():
+    histogram = addon.Histogram((1.0, 2.0, 5.0))
+    for value in (0.5, 1.0, 1.5, 5.0, 7.0):
+        histogram.record(value)
+    # Edges are inclusive; the last bucket collects everything above the top edge
+    assert histogram.buckets == [2, 1, 1, 1]
+    assert histogram.count == 5
+    assert histogram.total == 15.0
+    assert histogram.max == 7.0
+
+
+def test_quantiles_report_bucket_edges_capped_at_max():
+    histogram = addon.Histogram((1.0, 2.0, 5.0))
+    for _ in range(90):
+        histogram.record(0.4)
+    for _ in range(10):
+        histogram.record(3.0)
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(0.9) == 1.0
+    # The 99th percentile is in the (2, 5] bucket, but nothing above 3.0 was seen
+    assert histogram.quantile(0.99) == 3.0
+
+
+def test_overflow_quantile_is_the_max():
+    histogram = addon.Histogram((1.0,))
+    histogram.record(0.5)
+    histogram.record(42.0)
+    assert histogram.quantile(0.99) == 42.0
+
+
+def test_summary_scales_to_milliseconds():
+    histogram = addon.Histogram(addon.DURATION_BUCKETS)
+    histogram.record(0.002)
+    histogram.record(0.004)
+    summary = histogram.summary(scale=1000.0)
+    assert summary["count"] == 2
+    assert summary["avg"] == 3.0
+    assert summary["max"] == 4.0
+    assert summary["p50"] == 2.0
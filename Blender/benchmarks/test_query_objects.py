@@ -0,0 +1,68 @@
+"""query_objects: paging with cursors while objects come and go, and ObjectOrder staying current."""
+from __future__ import annotations
+
+from fake_bpy import FakeObject, populate
+from harness import bpy
+
+
+def add_object(name: str) -> FakeObject:
+    obj = FakeObject(name)
+    bpy.data.objects.new(obj)
+    bpy.context.scene.objects.append(obj)
+    return obj
+
+
+def remove_object(obj: FakeObject) -> None:
+    del bpy.data.objects[obj.name]
+    bpy.context.scene.objects.remove(obj)
+
+
+def names(page: dict) -> list[str]:
+    return [info["name"] for info in page["objects"]]
+
+
+def test_pages_cover_every_object_once(server):
+    objects = populate(25)
+    seen = []
+    cursor = None
+    while True:
+        page = server.query_objects(fields=["name"], cursor=cursor, limit=10)
+        seen += names(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [obj.name for obj in objects]
+
+
+def test_cursor_resumes_after_objects_are_added_and_removed(server):
+    objects = populate(10)
+    page = server.query_objects(fields=["name"], limit=4)
+    assert names(page) == [obj.name for obj in objects[:4]]
+    # Drop objects on both sides of the cursor and add one at the end
+    remove_object(objects[1])
+    remove_object(objects[6])
+    added = add_object("Added")
+    page = server.query_objects(fields=["name"], cursor=page["next_cursor"], limit=100)
+    assert names(page) == [obj.name for obj in objects[4:] if obj is not objects[6]] + [added.name]
+
+
+def test_cursor_resumes_after_its_own_object_is_removed(server):
+    objects = populate(6)
+    page = server.query_objects(fields=["name"], limit=3)
+    remove_object(objects[2])
+    remove_object(objects[0])
+    page = server.query_objects(fields=["name"], cursor=page["next_cursor"], limit=100)
+    # The last object returned is gone and the index has shifted; go on from the one after it
+    assert names(page) == [obj.name for obj in objects[3:]]
+
+
+def test_replacing_an_object_without_a_depsgraph_update_is_seen(server):
+    # A batch can delete one object and add another before depsgraph_update_post
+    # fires, leaving the journal's version unchanged and the count the same.
+    objects = populate(3)
+    server.query_objects(fields=["name"])
+    remove_object(objects[1])
+    added = add_object("Replacement")
+    page = server.query_objects(fields=["name"])
+    assert names(page) == [objects[0].name, objects[2].name, added.name]
+
@@ -0,0 +1,138 @@
+"""SpatialIndex behind raycast, objects_in_box and nearest_object, checked against brute force."""
+from __future__ import annotations
+
+import math
+import random
+
+import pytest
+
+from fake_bpy import FakeObject, Vector, populate
+from harness import bpy
+
+# The index reads transforms in bulk as float32, the precision Blender stores them in
+TOLERANCE = 1e-4
+
+
+def add_object(name: str, location=(0.0, 0.0, 0.0), obj_type: str = "MESH") -> FakeObject:
+    obj = FakeObject(name, location=location, obj_type=obj_type)
+    bpy.data.objects.new(obj)
+    bpy.context.scene.objects.append(obj)
+    return obj
+
+
+def remove_object(obj: FakeObject) -> None:
+    del bpy.data.objects[obj.name]
+    bpy.context.scene.objects.remove(obj)
+
+
+def world_box(obj) -> tuple[list[float], list[float]]:
+    corners = [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
+    return [min(c[i] for c in corners) for i in range(3)], [max(c[i] for c in corners) for i in range(3)]
+
+
+def ray_distance(origin, direction, box) -> float | None:
+    """Distance along a normalized ray to where it enters a box that contains no origin"""
+    enter, leave = -math.inf, math.inf
+    for o, d, lo, hi in zip(origin, direction, *box):
+        t1, t2 = sorted(((lo - o) / d, (hi - o) / d))
+        enter, leave = max(enter, t1), min(leave, t2)
+    return enter if 0 <= enter <= leave else None
+
+
+def point_distance(point, box) -> float:
+    """Distance from a point to the surface of a box, also from inside it"""
+    lo, hi = box
+    if all(l <= p <= h for p, l, h in zip(point, lo, hi)):
+        return min(min(p - l, h - p) for p, l, h in zip(point, lo, hi))
+    return math.dist(point, [min(max(p, l), h) for p, l, h in zip(point, lo, hi)])
+
+
+@pytest.fixture
+def scene_objects() -> list[FakeObject]:
+    """Meshes scaled evenly, so object-space nearest points are the world-space ones, plus empties"""
+    objects = populate(300, extent=50.0)
+    for obj in objects:
+        obj.scale = Vector([obj.scale.x] * 3)
+    for i in range(20):
+        objects.append(add_object(f"Empty.{i}", location=objects[i].location, obj_type="EMPTY"))
+    return objects
+
+
+def test_objects_in_box_match_brute_force(server, scene_objects):
+    rng = random.Random(2)
+    boxes = {obj.name: world_box(obj) for obj in scene_objects}
+    for _ in range(50):
+        a = [rng.uniform(-60, 60) for _ in range(3)]
+        b = [rng.uniform(-60, 60) for _ in range(3)]
+        lo, hi = [min(p, q) for p, q in zip(a, b)], [max(p, q) for p, q in zip(a, b)]
+        for contained in (False, True):
+            expected = []
+            for obj in scene_objects:
+                box_lo, box_hi = boxes[obj.name]
+                if contained:
+                    inside = all(l <= bl and bh <= h for l, h, bl, bh in zip(lo, hi, box_lo, box_hi))
+                else:
+                    inside = all(bl <= h and bh >= l for l, h, bl, bh in zip(lo, hi, box_lo, box_hi))
+                if inside:
+                    expected.append(obj.name)
+            found = server.objects_in_box(lo, hi, contained=contained)
+            assert found == {"objects": expected, "count": len(expected)}
+    assert server.objects_in_box([-60] * 3, [60] * 3, limit=5)["objects"] == [
+        obj.name for obj in scene_objects[:5]]
+
+
+def test_raycast_matches_brute_force(server, scene_objects):
+    rng = random.Random(3)
+    boxes = {obj.name: world_box(obj) for obj in scene_objects if obj.type == "MESH"}
+    hits = 0
+    for _ in range(100):
+        # From outside every box towards a point among them
+        theta, phi = rng.uniform(0, 2 * math.pi), rng.uniform(0.1, math.pi - 0.1)
+        origin = [300 * math.sin(phi) * math.cos(theta), 300 * math.sin(phi) * math.sin(theta), 300 * math.cos(phi)]
+        target = [rng.uniform(-50, 50) for _ in range(3)]
+        direction = [t - o for t, o in zip(target, origin)]
+        length = math.hypot(*direction)
+        unit = [d / length for d in direction]
+        distances = [(ray_distance(origin, unit, box), name) for name, box in boxes.items()]
+        distances = sorted(d for d in distances if d[0] is not None)
+        result = server.raycast(origin, direction)
+        if not distances:
+            assert result == {"hit": False}
+            continue
+        hits += 1
+        assert result["hit"]
+        assert result["distance"] == pytest.approx(distances[0][0], abs=TOLERANCE)
+        assert result["object"] in {name for d, name in distances if d == pytest.approx(distances[0][0], abs=TOLERANCE)}
+        assert result["location"] == pytest.approx([o + u * distances[0][0] for o, u in zip(origin, unit)], abs=TOLERANCE)
+        # Nothing past max_distance
+        assert server.raycast(origin, direction, max_distance=distances[0][0] * 0.99) == {"hit": False}
+    assert hits > 10
+
+
+def test_nearest_object_matches_brute_force(server, scene_objects):
+    rng = random.Random(4)
+    boxes = {obj.name: world_box(obj) for obj in scene_objects if obj.type == "MESH"}
+    for _ in range(100):
+        point = [rng.uniform(-70, 70) for _ in range(3)]
+        distances = {name: point_distance(point, box) for name, box in boxes.items()}
+        closest = min(distances.values())
+        result = server.nearest_object(point)
+        assert result["found"]
+        assert result["distance"] == pytest.approx(closest, abs=TOLERANCE)
+        assert distances[result["object"]] == pytest.approx(closest, abs=TOLERANCE)
+        assert math.dist(point, result["location"]) == pytest.approx(closest, abs=TOLERANCE)
+    assert server.nearest_object([500.0] * 3, max_distance=1.0) == {"found": False}
+
+
+def test_replacing_an_object_without_a_depsgraph_update_is_seen(server):
+    # A batch can delete one object and add another before depsgraph_update_post
+    # fires, leaving the journal's version unchanged and the count the same.
+    objects = populate(20)
+    server.spatial.refresh()
+    remove_object(objects[5])
+    added = add_object("Replacement", location=(500.0, 500.0, 500.0))
+    found = server.objects_in_box([490.0] * 3, [510.0] * 3)
+    assert found["objects"] == [added.name]
+    hit = server.raycast([500.0, 500.0, 400.0], [0.0, 0.0, 1.0])
+    assert hit["hit"] and hit["object"] == added.name
+    assert objects[5].name not in server.objects_in_box([-1000.0] * 3, [1000.0] * 3)["objects"]
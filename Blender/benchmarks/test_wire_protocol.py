@@ -0,0 +1,180 @@
+"""FrameDecoder and encode_message: every framing mode, split reads, attachments and compression."""
+from __future__ import annotations
+
+import json
+import zlib
+
+import pytest
+
+from harness import Client, addon
+
+
+def frames(decoder: addon.FrameDecoder) -> list[bytes]:
+    out = []
+    while (frame := decoder.next_frame()) is not None:
+        out.append(frame)
+    return out
+
+
+def decode_chunks(chunks: list[bytes], framing: str, compression=None) -> list[bytes]:
+    decoder = addon.FrameDecoder(framing)
+    decoder.compression = compression
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return frames(decoder)
+
+
+@pytest.mark.parametrize("framing", addon.FRAMING_MODES)
+def test_messages_survive_one_byte_reads(framing):
+    messages = [{"type": "a", "code": 'print("}{ \\" ]")'}, {"type": "b", "params": {"x": [1, {"y": 2}]}}]
+    # Bare JSON documents may have whitespace between them
+    separator = b" \n " if framing == addon.FRAMING_JSON else b""
+    stream = separator.join(addon.encode_frame(json.dumps(m).encode(), framing) for m in messages)
+    decoder = addon.FrameDecoder(framing)
+    received = []
+    for i in range(len(stream)):
+        decoder.feed(stream[i:i + 1])
+        received.extend(frames(decoder))
+    assert [json.loads(frame) for frame in received] == messages
+    assert decoder.pending == 0
+
+
+def test_bare_json_escaped_backslash_before_quote_ends_string():
+    decoder = addon.FrameDecoder()
+    decoder.feed(b'{"path": "C:\\\\"}{"n": 1}')
+    assert [json.loads(frame) for frame in frames(decoder)] == [{"path": "C:\\"}, {"n": 1}]
+
+
+def test_bare_json_rejects_non_object():
+    decoder = addon.FrameDecoder()
+    decoder.feed(b"hello")
+    with pytest.raises(addon.FrameError):
+        decoder.next_frame()
+
+
+def test_ndjson_skips_blank_lines():
+    decoder = addon.FrameDecoder(addon.FRAMING_NDJSON)
+    decoder.feed(b'\n{"a": 1}\n\n{"b": 2}\n')
+    assert frames(decoder) == [b'{"a": 1}', b'{"b": 2}']
+
+
+@pytest.mark.parametrize("framing", addon.FRAMING_MODES)
+def test_oversized_frame_is_rejected_before_it_is_complete(framing):
+    decoder = addon.FrameDecoder(framing, max_frame_size=16)
+    payload = json.dumps({"data": "x" * 64}).encode()
+    decoder.feed(addon.encode_frame(payload, framing)[:40])
+    with pytest.raises(addon.FrameError):
+        decoder.next_frame()
+
+
+def test_set_framing_parses_buffered_bytes_in_new_mode():
+    decoder = addon.FrameDecoder()
+    first = json.dumps({"type": "negotiate_protocol"}).encode()
+    decoder.feed(first + addon.encode_frame(b'{"n": 1}', addon.FRAMING_LENGTH))
+    assert decoder.next_frame() == first
+    decoder.set_framing(addon.FRAMING_LENGTH)
+    assert decoder.next_frame() == b'{"n": 1}'
+
+
+def test_unknown_framing_is_rejected():
+    with pytest.raises(ValueError):
+        addon.FrameDecoder("xml")
+
+
+def test_compressed_frame_needs_negotiated_compression():
+    zlib_ = addon.COMPRESSIONS["zlib"]
+    frame = addon.encode_frame(zlib_.compress(b'{"n": 1}'), addon.FRAMING_LENGTH, compressed=True)
+    assert decode_chunks([frame], addon.FRAMING_LENGTH, zlib_) == [b'{"n": 1}']
+    with pytest.raises(addon.FrameError):
+        decode_chunks([frame], addon.FRAMING_LENGTH)
+
+
+def test_decompression_bomb_is_rejected():
+    decoder = addon.FrameDecoder(addon.FRAMING_LENGTH, max_frame_size=1024)
+    decoder.compression = addon.COMPRESSIONS["zlib"]
+    decoder.feed(addon.encode_frame(zlib.compress(b"0" * 1_000_000), addon.FRAMING_LENGTH, compressed=True))
+    with pytest.raises(addon.FrameError):
+        decoder.next_frame()
+
+
+def test_attachments_follow_the_body_as_frames():
+    image = addon.Attachment(b"\x89PNG" + bytes(100), "image/png")
+    raw = bytes(range(256))
+    chunks = addon.encode_message(
+        {"status": "success", "result": {"image": image, "again": image, "raw": raw}},
+        addon.FRAMING_LENGTH, binary_attachments=True,
+    )
+    body, *blobs = decode_chunks(chunks, addon.FRAMING_LENGTH)
+    message = json.loads(body)
+    assert [a["id"] for a in message["attachments"]] == ["a0", "a1"]
+    assert message["attachments"][0]["content_type"] == "image/png"
+    # The same Attachment referenced twice is sent once
+    assert message["result"]["image"] == message["result"]["again"]
+    resolved = addon.resolve_attachments(message["result"], dict(zip(("a0", "a1"), blobs)))
+    assert resolved == {"image": image.data, "again": image.data, "raw": raw}
+
+
+def attachment_client(server, max_frame_size: int) -> Client:
+    client = Client.unix(server.socket_path)
+    client.sock.settimeout(5)
+    params = {"framing": "length", "attachments": True, "max_frame_size": max_frame_size}
+    agreed = client.call({"type": "negotiate_protocol", "params": params})["result"]
+    assert agreed["attachments"]
+    client.framing = agreed["framing"]
+    client.decoder.set_framing(client.framing)
+    return client
+
+
+@pytest.mark.parametrize("sizes", [[3000, 3000], [1] * (addon.MAX_ATTACHMENTS + 1)])
+def test_manifest_over_the_limits_is_refused_and_its_frames_skipped(start_server, sizes):
+    server = start_server()
+    client = attachment_client(server, max_frame_size=4096)
+    try:
+        manifest = [{"id": f"a{i}", "size": size} for i, size in enumerate(sizes)]
+        client.send({"type": "get_scene_info", "id": 1, "attachments": manifest})
+        for size in sizes:
+            client.sock.sendall(size.to_bytes(addon.FRAME_HEADER_SIZE, "big") + bytes(size))
+        response = client.receive()
+        assert response["id"] == 1 and response["status"] == "error"
+        assert "exceed the limit" in response["message"]
+        # The refused frames were read past, so the next command is understood
+        assert client.call({"type": "get_scene_info", "id": 2})["status"] == "success"
+    finally:
+        client.close()
+
+
+def test_manifest_entries_need_a_size(start_server):
+    server = start_server()
+    client = attachment_client(server, max_frame_size=4096)
+    try:
+        response = client.call({"type": "get_scene_info", "id": 1, "attachments": [{"id": "a0"}]})
+        assert response["status"] == "error"
+        assert client.call({"type": "get_scene_info", "id": 2})["status"] == "success"
+    finally:
+        client.close()
+
+
+def test_attachments_fall_back_to_base64_inline():
+    chunks = addon.encode_message({"result": {"raw": b"\x00\x01"}}, addon.FRAMING_NDJSON)
+    assert len(chunks) == 1
+    assert json.loads(decode_chunks(chunks, addon.FRAMING_NDJSON)[0]) == {"result": {"raw": "AAE="}}
+
+
+def test_large_frames_are_compressed_and_small_ones_are_not():
+    zlib_ = addon.COMPRESSIONS["zlib"]
+    big = {"result": "x" * 100_000}
+    small = {"result": "x"}
+    for message, compressed in ((big, True), (small, False)):
+        (chunk,) = addon.encode_message(message, addon.FRAMING_LENGTH, compression=zlib_, compress_threshold=1024)
+        header = int.from_bytes(chunk[:addon.FRAME_HEADER_SIZE], "big")
+        assert bool(header & addon.FRAME_COMPRESSED_FLAG) == compressed
+        assert json.loads(decode_chunks([chunk], addon.FRAMING_LENGTH, zlib_)[0]) == message
+
+
+def test_precompressed_attachments_are_sent_as_is():
+    zlib_ = addon.COMPRESSIONS["zlib"]
+    png = addon.Attachment(bytes(100_000), "image/png")
+    chunks = addon.encode_message({"result": png}, addon.FRAMING_LENGTH, binary_attachments=True,
+                                  compression=zlib_, compress_threshold=1024)
+    header = int.from_bytes(chunks[1], "big")
+    assert header == 100_000